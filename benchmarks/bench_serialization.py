@@ -0,0 +1,152 @@
+"""
+Benchmark: serialización por bloques (`loader.serialization.BatchSerializer`) frente al
+`model_dump()` por registro que usaban los writers.
+
+Uso (desde la raíz del proyecto):
+
+    python -m benchmarks.bench_serialization --records 500000
+
+Se generan variantes de Shopify sintéticas (`ShopifyProductVariant`), el modelo con más campos.
+"""
+
+import argparse
+import json
+import time
+from datetime import date, datetime, timezone
+
+from loader.loader_writers import _db_rows
+from loader.serialization import BatchSerializer
+from transformer.input_mappers_pydantic.shopify import ShopifyProductVariant
+
+
+def synthetic_records(count: int) -> list[ShopifyProductVariant]:
+    product = {"id": 1, "title": "Producto", "vendor": "Marca", "product_type": "Tipo", "handle": "producto"}
+    return [
+        ShopifyProductVariant.from_json(
+            product,
+            {
+                "id": i,
+                "title": f"Variante {i}",
+                "price": "9.99",
+                "weight": 1.5,
+                "weight_unit": "kg",
+                "inventory_quantity": i % 50,
+                "requires_shipping": True,
+                "created_at": "2024-01-01T00:00:00+00:00",
+                "updated_at": "2024-06-01T00:00:00+00:00",
+            },
+            "https://cdn.example.com/producto.jpg",
+        )
+        for i in range(count)
+    ]
+
+
+# === Enfoque anterior: un model_dump() por registro ===
+
+def to_db_value(value, dialect: str):
+    "Per-value conversion the writers used before `db_column_converters` (kept as the baseline)"
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return value if dialect == "postgres" else int(value)
+    if isinstance(value, datetime):
+        if dialect == "sqlite":
+            return value.isoformat()
+        if dialect == "mysql" and value.tzinfo is not None:
+            # DATETIME no guarda zona horaria: se normaliza a UTC
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, date):
+        return value.isoformat() if dialect == "sqlite" else value
+    if isinstance(value, (int, float)):
+        return value
+    return str(value)
+
+
+def legacy_db_rows(records, chunk_size):
+    for start in range(0, len(records), chunk_size):
+        [tuple(to_db_value(v, "postgres") for v in r.model_dump(mode="python").values()) for r in records[start:start + chunk_size]]
+
+
+def legacy_json_rows(records, chunk_size):
+    for start in range(0, len(records), chunk_size):
+        [list(r.model_dump(mode="json").values()) for r in records[start:start + chunk_size]]
+
+
+def legacy_columns(records, chunk_size):
+    for start in range(0, len(records), chunk_size):
+        columns = {}
+        for r in records[start:start + chunk_size]:
+            for name, value in r.model_dump(mode="python").items():
+                columns.setdefault(name, []).append(value)
+
+
+def legacy_json_lines(records, chunk_size):
+    for r in records:
+        json.dumps(r.model_dump(mode="json"), ensure_ascii=False)
+
+
+# === Capa de serialización por bloques ===
+
+def batch_db_rows(records, chunk_size, serializer):
+    for start in range(0, len(records), chunk_size):
+        _db_rows(records[start:start + chunk_size], "postgres")
+
+
+def batch_json_rows(records, chunk_size, serializer):
+    for start in range(0, len(records), chunk_size):
+        serializer.json_rows(records[start:start + chunk_size])
+
+
+def batch_columns(records, chunk_size, serializer):
+    for start in range(0, len(records), chunk_size):
+        serializer.columns(records[start:start + chunk_size])
+
+
+def batch_json_lines(records, chunk_size, serializer):
+    for start in range(0, len(records), chunk_size):
+        serializer.json_lines(records[start:start + chunk_size])
+
+
+def _timeit(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de modelos para los writers")
+    parser.add_argument("--records", type=int, default=200_000, help="Número de registros sintéticos")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Tamaño de bloque")
+    args = parser.parse_args()
+
+    records = synthetic_records(args.records)
+    serializer = BatchSerializer(ShopifyProductVariant)
+
+    # Comprobación de equivalencia sobre el primer bloque
+    sample = records[: args.chunk_size]
+    assert serializer.rows(sample) == [tuple(r.model_dump(mode="python").values()) for r in sample]
+    for dialect in ("sqlite", "mysql", "postgres"):
+        assert _db_rows(tuple(sample), dialect) == [
+            tuple(to_db_value(v, dialect) for v in r.model_dump(mode="python").values()) for r in sample
+        ]
+    assert serializer.json_rows(sample) == [tuple(r.model_dump(mode="json").values()) for r in sample]
+    assert [json.loads(line) for line in serializer.json_lines(sample)] == [r.model_dump(mode="json") for r in sample]
+
+    print(f"Registros: {args.records} (bloques de {args.chunk_size})")
+    for name, legacy, batch in [
+        ("Filas BBDD (PostgreSQL)", legacy_db_rows, batch_db_rows),
+        ("Filas JSON (Excel)", legacy_json_rows, batch_json_rows),
+        ("Columnas (Parquet)", legacy_columns, batch_columns),
+        ("Líneas JSON (JSONL)", legacy_json_lines, batch_json_lines),
+    ]:
+        legacy_seconds = _timeit(legacy, records, args.chunk_size)
+        batch_seconds = _timeit(batch, records, args.chunk_size, serializer)
+        print(
+            f"{name}: model_dump {legacy_seconds:.3f}s, por bloques {batch_seconds:.3f}s "
+            f"(x{legacy_seconds / batch_seconds:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
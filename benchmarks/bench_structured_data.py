@@ -0,0 +1,145 @@
+"""
+Benchmark: extracción de datos estructurados con el escaneo rápido (`scraper.structured_data`)
+frente a los parseos con BeautifulSoup que usaban las estrategias.
+
+Uso (desde la raíz del proyecto):
+
+    python -m benchmarks.bench_structured_data --pages-dir result_files/recorded_pages
+
+`--pages-dir` debe contener páginas de producto grabadas (`*.html`). Si no se indica, se generan
+páginas sintéticas con la estructura típica de WooCommerce, Wix y BigCommerce.
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from scraper.structured_data import extract_structured_data, parse_structured_data_with_soup, scan_structured_data
+
+
+# === Parsers originales (una BeautifulSoup completa por página) ===
+
+def legacy_parse(html_source: str) -> dict:
+    soup = BeautifulSoup(html_source, "html.parser")
+
+    ld_json_script = soup.find("script", type="application/ld+json")
+    rich_snippet = soup.find("script", {"type": "application/ld+json", "class": "y-rich-snippet-script"})
+    pys_script = soup.find("script", {"id": "pys-js-extra"})
+
+    var_item = None
+    pattern = re.compile(r"var item\s*=\s*(\{.*?\})\s*;", re.DOTALL)
+    for script in soup.find_all("script"):
+        if script.string:
+            match = pattern.search(script.string)
+            if match:
+                var_item = match.group(1)
+                break
+
+    container = soup.find("div", class_="product-page-container")
+    product_id = container["data-product-id"] if container and container.has_attr("data-product-id") else None
+
+    return {
+        "ld_json": ld_json_script.text if ld_json_script else None,
+        "rich_snippet": rich_snippet.text if rich_snippet else None,
+        "pys_js_extra": pys_script.text if pys_script else None,
+        "var_item": var_item,
+        "product_id": product_id,
+    }
+
+
+def fast_parse(html_source: bytes) -> dict:
+    data = extract_structured_data(html_source)
+    rich_snippet = next((s for s in data.ld_json if "y-rich-snippet-script" in s.classes), None)
+    return {
+        "ld_json": data.ld_json[0].text if data.ld_json else None,
+        "rich_snippet": rich_snippet.text if rich_snippet else None,
+        "pys_js_extra": data.pys_js_extra,
+        "var_item": data.var_item,
+        "product_id": data.product_page_product_id,
+    }
+
+
+# === Páginas sintéticas ===
+
+def _filler(n: int) -> str:
+    return "".join(
+        f'<div class="row"><a href="/c/{i}">Categoría {i}</a><img src="/i/{i}.jpg" alt="x"></div>'
+        f'<script src="/static/chunk-{i}.js"></script>'
+        for i in range(n)
+    )
+
+
+def synthetic_pages() -> list[str]:
+    product = {"@type": "Product", "name": "Producto", "offers": {"price": "9.99", "priceCurrency": "EUR"}}
+    pys = {"staticEvents": {"facebook": {"woo_view_content": [{"params": {"post_id": "42"}}]}}}
+
+    woocommerce = (
+        f"<html><head><script id=\"pys-js-extra\">var pysOptions = {json.dumps(pys)};</script>"
+        f"<script type=\"application/ld+json\" class=\"y-rich-snippet-script\">{json.dumps(product)}</script>"
+        f"</head><body>{_filler(400)}</body></html>"
+    )
+    wix = (
+        f"<html><head><script type=\"application/ld+json\">{json.dumps(product)}</script></head>"
+        f"<body>{_filler(600)}</body></html>"
+    )
+    bigcommerce = (
+        f"<html><head></head><body>{_filler(300)}"
+        f"<div class=\"product-page-container\" data-product-id=\"1234\">{_filler(100)}</div>"
+        f"<script>var item = {{ProductID: 1234, Name: 'Producto'}};</script></body></html>"
+    )
+    # Tema con bloques antiguos comentados, que no deben tomarse por los vigentes
+    commented = (
+        f"<html><head><!-- <script type=\"application/ld+json\">{json.dumps({'@type': 'Product', 'name': 'Antiguo'})}</script> -->"
+        f"<script type=\"application/ld+json\">{json.dumps(product)}</script></head><body>{_filler(200)}"
+        "<!-- <script>var item = {\"ProductID\": 99};</script> -->"
+        "<script>var item = {ProductID: 42};</script></body></html>"
+    )
+    return [woocommerce, wix, bigcommerce, commented]
+
+
+def _timeit(func, pages, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            func(page)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de extracción de datos estructurados")
+    parser.add_argument("--pages-dir", type=Path, default=None, help="Carpeta con páginas de producto grabadas (*.html)")
+    parser.add_argument("--repeat", type=int, default=20, help="Número de repeticiones sobre el conjunto de páginas")
+    args = parser.parse_args()
+
+    if args.pages_dir is not None:
+        raw_pages = [path.read_bytes() for path in sorted(args.pages_dir.glob("*.html"))]
+    else:
+        raw_pages = [page.encode("utf-8") for page in synthetic_pages()]
+
+    text_pages = [page.decode("utf-8", "replace") for page in raw_pages]
+
+    # El escaneo rápido debe dar lo mismo que el parseo completo al que sustituye
+    for raw_page in raw_pages:
+        assert scan_structured_data(raw_page) == parse_structured_data_with_soup(raw_page)
+
+    mismatches = sum(
+        legacy_parse(text_page) != fast_parse(raw_page) for text_page, raw_page in zip(text_pages, raw_pages)
+    )
+
+    legacy_seconds = _timeit(legacy_parse, text_pages, args.repeat)
+    fast_seconds = _timeit(fast_parse, raw_pages, args.repeat)
+    total_pages = len(raw_pages) * args.repeat
+
+    print(f"Páginas: {len(raw_pages)} x {args.repeat} repeticiones")
+    print(f"BeautifulSoup: {legacy_seconds:.3f}s ({1000 * legacy_seconds / total_pages:.2f} ms/página)")
+    print(f"Escaneo rápido: {fast_seconds:.3f}s ({1000 * fast_seconds / total_pages:.2f} ms/página)")
+    print(f"Aceleración: x{legacy_seconds / fast_seconds:.1f}")
+    print(f"Páginas con resultados distintos: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
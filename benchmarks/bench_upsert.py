@@ -0,0 +1,109 @@
+"""
+Benchmark: recarga completa (`--load-mode replace`) frente a carga incremental (`--load-mode upsert`)
+de un catálogo que apenas ha cambiado, en SQLite.
+
+Uso (desde la raíz del proyecto):
+
+    python -m benchmarks.bench_upsert --records 100000
+
+Se generan productos de WooCommerce sintéticos (`WooCommerceProduct`). Antes de medir se comprueba
+que una carga incremental a la que le faltan productos (p.ej. por descargas fallidas) no borra sus
+filas salvo con `delete_missing`.
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from loader.loader_writers import write_batch_sqlite
+from transformer.input_mappers_pydantic.woocommerce import WooCommerceProduct
+
+
+def synthetic_records(count: int, changed_every: int = 0) -> list[WooCommerceProduct]:
+    return [
+        WooCommerceProduct(
+            product_id=str(i),
+            product_name=f"Producto {i}",
+            description="Descripción del producto",
+            rating="",
+            review_count=i % 20,
+            image_link=f"https://example.com/{i}.jpg",
+            availability="InStock",
+            # Cambia el precio de uno de cada `changed_every` productos
+            price=9.99 + (1 if changed_every and i % changed_every == 0 else 0),
+            price_currency="EUR",
+            sku=f"SKU-{i}",
+            product_url=f"https://example.com/producto-{i}",
+            brand_name="Marca",
+        )
+        for i in range(count)
+    ]
+
+
+def _count(db_path: Path) -> int:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM Products").fetchone()[0]
+
+
+def check_missing_records(db_path: Path) -> None:
+    "A record missing from an upsert load (e.g. a failed fetch) keeps its row unless `delete_missing` is set"
+    records = synthetic_records(10)
+    write_batch_sqlite(records, table="Products", db_path=db_path, upsert=True, store="tienda")
+
+    fetched = [record for i, record in enumerate(records) if i not in (3, 7)]
+    write_batch_sqlite(fetched, table="Products", db_path=db_path, upsert=True, store="tienda")
+    assert _count(db_path) == 10
+
+    write_batch_sqlite(fetched, table="Products", db_path=db_path, upsert=True, store="tienda", delete_missing=True)
+    assert _count(db_path) == 8
+
+
+def _timeit(func, *args, **kwargs) -> float:
+    started = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga completa frente a carga incremental en SQLite")
+    parser.add_argument("--records", type=int, default=50_000, help="Número de productos sintéticos")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Tamaño de bloque")
+    parser.add_argument("--changed-every", type=int, default=100, help="Uno de cada N productos cambia de precio")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_missing_records(Path(tmp) / "check.db")
+
+        original = synthetic_records(args.records)
+        updated = synthetic_records(args.records, args.changed_every)
+        replace_db, upsert_db = Path(tmp) / "replace.db", Path(tmp) / "upsert.db"
+
+        write_batch_sqlite(original, table="Products", db_path=replace_db, chunk_size=args.chunk_size)
+        write_batch_sqlite(
+            original, table="Products", db_path=upsert_db, chunk_size=args.chunk_size, upsert=True, store="tienda"
+        )
+
+        replace_seconds = _timeit(
+            write_batch_sqlite, updated, table="Products", db_path=replace_db, chunk_size=args.chunk_size
+        )
+        upsert_seconds = _timeit(
+            write_batch_sqlite,
+            updated,
+            table="Products",
+            db_path=upsert_db,
+            chunk_size=args.chunk_size,
+            upsert=True,
+            store="tienda",
+        )
+
+    print(f"Productos: {args.records} (uno de cada {args.changed_every} modificado, bloques de {args.chunk_size})")
+    print(
+        f"Recarga: replace {replace_seconds:.3f}s, upsert {upsert_seconds:.3f}s "
+        f"(x{replace_seconds / upsert_seconds:.2f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from psycopg2 import OperationalError as PostgresError
 
 
 class MySQLDB:
-    def __init__(self, conn_params: dict):
+    def __init__(self, conn_params: dict, allow_local_infile: bool = False):
 
         host = conn_params.get("host", "")
         user = conn_params.get("user", "")
@@ -19,7 +19,9 @@ class MySQLDB:
             "user": user,
             "password": password,
             "database": dbname,
-            "port": port
+            "port": port,
+            # Necesario para `LOAD DATA LOCAL INFILE` (el servidor debe tener `local_infile=ON`)
+            "allow_local_infile": allow_local_infile,
         }
         self.conn = None
         self.cursor = None
@@ -76,8 +78,19 @@ class PostgreSQLDB:
 
 
 class SQLiteDB:
-    def __init__(self, db_file):
+    # Ajustes para cargas masivas. En modo WAL los lectores (p.ej. un dashboard) pueden consultar
+    # la BBDD mientras se escribe, y con `synchronous=NORMAL` cada commit no fuerza un fsync
+    BULK_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64 * 1024,  # KiB (64 MB)
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms
+    }
+
+    def __init__(self, db_file, bulk: bool = False):
         self.db_file = db_file
+        self.bulk = bulk
         self.conn = None
         self.cursor = None
 
@@ -85,6 +98,9 @@ class SQLiteDB:
         try:
             self.conn = sqlite3.connect(self.db_file)
             self.cursor = self.conn.cursor()
+            if self.bulk:
+                for pragma, value in self.BULK_PRAGMAS.items():
+                    self.cursor.execute(f"PRAGMA {pragma} = {value}")
             return self.conn, self.cursor
         except sqlite3.Error as e:
             print(f"SQLite Connection Error: {e}")
@@ -0,0 +1,116 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+# Bloques de registros que puede acumular cada destino antes de frenar la lectura del flujo
+DEFAULT_SINK_BUFFER = 8
+
+# Marcadores de fin del flujo: completo, o interrumpido por un error aguas arriba
+_DONE = object()
+_ABORT = object()
+
+
+@dataclass
+class SinkResult:
+    name: str
+    records: int = 0
+    seconds: float = 0.0
+    error: BaseException | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Sink:
+    def __init__(self, name: str, write: Callable[[Iterable], None], buffer_chunks: int) -> None:
+        self.name = name
+        self.write = write
+        self.buffer: queue.Queue = queue.Queue(maxsize=buffer_chunks)
+        self.result = SinkResult(name)
+        # Si ya se ha leído el marcador de fin del buffer
+        self.finished = False
+        self.thread = threading.Thread(target=self._run, name=f"sink-{name}", daemon=True)
+
+    def _iter_records(self) -> Iterator:
+        while True:
+            chunk = self.buffer.get()
+            if chunk is _DONE or chunk is _ABORT:
+                self.finished = True
+                if chunk is _ABORT:
+                    raise Exception("Carga cancelada: ha fallado la extracción o la transformación")
+                return
+            self.result.records += len(chunk)
+            yield from chunk
+
+    def _run(self) -> None:
+        started_at = time.perf_counter()
+        try:
+            self.write(self._iter_records())
+        except BaseException as e:
+            self.result.error = e
+        finally:
+            self.result.seconds = time.perf_counter() - started_at
+            # Un destino que falla (o que termina sin leerlo todo) sigue vaciando su buffer, para no bloquear al resto
+            while not self.finished:
+                self.finished = self.buffer.get() in (_DONE, _ABORT)
+
+
+class FanOut:
+    """
+    Reparte un mismo flujo de registros entre varios destinos (writers) que escriben a la vez, cada uno
+    en su propio hilo y con su propio buffer acotado de bloques.
+
+    El buffer absorbe las diferencias de ritmo entre destinos: un destino lento (una BBDD remota) no
+    frena a los ficheros mientras le quede hueco, y la memoria usada está acotada en todo momento.
+    Si un destino falla, el resto sigue cargando; el resultado de cada uno se devuelve al final.
+    """
+
+    def __init__(
+        self,
+        sinks: dict[str, Callable[[Iterable], None]],
+        chunk_size: int,
+        buffer_chunks: int = DEFAULT_SINK_BUFFER,
+    ) -> None:
+        self.sinks = sinks
+        self.chunk_size = chunk_size
+        self.buffer_chunks = buffer_chunks
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def run(self, records: Iterable) -> list[SinkResult]:
+        sinks = [_Sink(name, write, self.buffer_chunks) for name, write in self.sinks.items()]
+        for sink in sinks:
+            sink.thread.start()
+
+        try:
+            for chunk in itertools.batched(records, self.chunk_size):
+                active_sinks = [sink for sink in sinks if sink.result.ok]
+                if not active_sinks:
+                    break
+                for sink in active_sinks:
+                    sink.buffer.put(chunk)
+        except BaseException:
+            # Los writers reciben un error en lugar de un fin de flujo, para no dar por buena una carga parcial
+            self._finish(sinks, _ABORT)
+            raise
+
+        self._finish(sinks, _DONE)
+
+        for sink in sinks:
+            result = sink.result
+            if result.ok:
+                self.logger.info("Destino '%s': %d registros cargados en %.2fs", result.name, result.records, result.seconds)
+            else:
+                self.logger.error("Destino '%s': error tras %.2fs: '%s'", result.name, result.seconds, result.error)
+
+        return [sink.result for sink in sinks]
+
+    def _finish(self, sinks: list[_Sink], marker: object) -> None:
+        for sink in sinks:
+            sink.buffer.put(marker)
+        for sink in sinks:
+            sink.thread.join()
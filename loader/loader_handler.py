@@ -1,9 +1,13 @@
 import ast
+import functools
 from pathlib import Path
 from transformer.transformer_handler import Product
 from typing import Iterable
 
+from loader.fan_out import DEFAULT_SINK_BUFFER, FanOut
 from loader.loader_writers import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MYSQL_INSERT_ROWS,
     write_batch_csv,
     write_batch_excel,
     write_batch_jsonl,
@@ -18,11 +22,21 @@ class LoaderHandler:
     def __init__(
         self,
         data: Iterable[Product],
-        destination_format: str,
+        destination_format: str | list[str],
         destination_path: Path,
         vendor: str,
         db_config: dict | str | None = None,
         db_path: str | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        mysql_insert_rows: int = DEFAULT_MYSQL_INSERT_ROWS,
+        mysql_load_data: bool = False,
+        load_mode: str = "replace",
+        db_indexes: list[str] | None = None,
+        upsert_delete_missing: bool = False,
+        store: str | None = None,
+        parquet_compression: str = "snappy",
+        parquet_partition: bool = False,
+        sink_buffer: int = DEFAULT_SINK_BUFFER,
     ):
         self.data = data
         self.destination_format = destination_format
@@ -34,25 +48,103 @@ class LoaderHandler:
             # json.loads(db_config) if isinstance(db_config, str) else db_config
         )
         self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.mysql_insert_rows = mysql_insert_rows
+        self.mysql_load_data = mysql_load_data
+        # "replace": se vacía y recarga la tabla; "upsert": carga incremental por clave natural (solo BBDD)
+        self.load_mode = load_mode
+        # Campos con índice secundario en BBDD (None: los que define cada modelo)
+        self.db_indexes = db_indexes
+        # En la carga incremental, borrar los registros de la tienda que no han llegado en esta carga
+        self.upsert_delete_missing = upsert_delete_missing
+        # Tienda de origen: partición de la salida Parquet y parte de la clave de la carga incremental
+        self.store = store
+        self.parquet_compression = parquet_compression
+        self.parquet_partition = parquet_partition
+        # Bloques que puede acumular cada destino cuando se carga en varios a la vez
+        self.sink_buffer = sink_buffer
+
+    @property
+    def destination_formats(self) -> list[str]:
+        if isinstance(self.destination_format, str):
+            return [self.destination_format]
+        return list(dict.fromkeys(self.destination_format))
 
     def load(self) -> None:
-        if self.destination_format == "csv":
-            write_batch_csv(self.data, path=Path(self.destination_path))
+        destination_formats = self.destination_formats
+
+        if len(destination_formats) == 1:
+            self._write(destination_formats[0], self.data)
+            return
+
+        # Varios destinos: el mismo flujo de modelos se reparte entre todos, que cargan a la vez
+        fan_out = FanOut(
+            {destination_format: functools.partial(self._write, destination_format) for destination_format in destination_formats},
+            chunk_size=self.chunk_size,
+            buffer_chunks=self.sink_buffer,
+        )
+        failed = [result for result in fan_out.run(self.data) if not result.ok]
+
+        if failed:
+            raise Exception(
+                f"Ha fallado la carga en {len(failed)} de {len(destination_formats)} destinos: "
+                + ", ".join(f"{result.name} ({result.error})" for result in failed)
+            )
+
+    def _write(self, destination_format: str, data: Iterable[Product]) -> None:
+        if destination_format == "csv":
+            write_batch_csv(data, path=Path(self.destination_path))
 
-        elif self.destination_format == "jsonl":
-            write_batch_jsonl(self.data, path=Path(self.destination_path))
+        elif destination_format == "jsonl":
+            write_batch_jsonl(data, path=Path(self.destination_path))
 
-        elif self.destination_format == "excel":
-            write_batch_excel(self.data, path=Path(self.destination_path))
+        elif destination_format == "excel":
+            write_batch_excel(data, path=Path(self.destination_path))
 
-        elif self.destination_format == "parquet":
-            write_batch_parquet(self.data, path=Path(self.destination_path))
+        elif destination_format == "parquet":
+            write_batch_parquet(
+                data,
+                path=Path(self.destination_path),
+                chunk_size=self.chunk_size,
+                compression=self.parquet_compression,
+                store=self.store,
+                partition=self.parquet_partition,
+            )
 
-        elif self.destination_format == "sqlite":
-            write_batch_sqlite(self.data, table="Products", db_path=self.db_path)
+        elif destination_format == "sqlite":
+            write_batch_sqlite(
+                data,
+                table="Products",
+                db_path=self.db_path,
+                chunk_size=self.chunk_size,
+                upsert=self.load_mode == "upsert",
+                indexes=self.db_indexes,
+                store=self.store or "",
+                delete_missing=self.upsert_delete_missing,
+            )
 
-        elif self.destination_format == "mysql":
-            write_batch_mysql(self.data, table="Products", conn_params=self.db_config)
+        elif destination_format == "mysql":
+            write_batch_mysql(
+                data,
+                table="Products",
+                conn_params=self.db_config,
+                chunk_size=self.chunk_size,
+                insert_rows=self.mysql_insert_rows,
+                load_data=self.mysql_load_data,
+                upsert=self.load_mode == "upsert",
+                indexes=self.db_indexes,
+                store=self.store or "",
+                delete_missing=self.upsert_delete_missing,
+            )
 
-        elif self.destination_format == "postgres":
-            write_batch_postgres(self.data, table="Products", conn_params=self.db_config)
+        elif destination_format == "postgres":
+            write_batch_postgres(
+                data,
+                table="Products",
+                conn_params=self.db_config,
+                chunk_size=self.chunk_size,
+                upsert=self.load_mode == "upsert",
+                indexes=self.db_indexes,
+                store=self.store or "",
+                delete_missing=self.upsert_delete_missing,
+            )
@@ -1,148 +1,409 @@
 import csv
+import hashlib
+import io
+import itertools
 import json
-from typing import Iterable
+import logging
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator
+from urllib.parse import quote
 from openpyxl import Workbook
+import mysql.connector
+import psycopg2
+import psycopg2.extras
 import pyarrow as pa
 import pyarrow.parquet as pq
 
 from database.databases import MySQLDB, PostgreSQLDB, SQLiteDB
+from loader.schema import (
+    MYSQL_KEY_TYPE,
+    MYSQL_STORE_KEY_TYPE,
+    arrow_schema,
+    create_index_sql,
+    create_table_sql,
+    db_column_converters,
+)
+from loader.serialization import serializer_for
+
+logger = logging.getLogger("LoaderWriters")
+
+# Número de registros que se materializan a la vez al escribir en Parquet o en BBDD
+DEFAULT_CHUNK_SIZE = 1000
+
+# Límite de filas por hoja de Excel (incluida la cabecera)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Filas por sentencia `INSERT ... VALUES (...), (...)` en MySQL
+DEFAULT_MYSQL_INSERT_ROWS = 500
+
+
+def _peek(records: Iterable) -> tuple[object | None, Iterator]:
+    "Returns the first record (or None) and an iterator that still yields every record"
+    iterator = iter(records)
+    first_record = next(iterator, None)
+    if first_record is None:
+        return None, iterator
+    return first_record, itertools.chain([first_record], iterator)
+
+
+def _db_rows(chunk: tuple, dialect: str) -> list[tuple]:
+    "Rows of a chunk of records, with each value adapted to the database driver (column by column)"
+    model = type(chunk[0])
+    columns = serializer_for(model).columns(chunk).values()
+    return list(
+        zip(
+            *(
+                column if converter is None else converter(column)
+                for converter, column in zip(db_column_converters(model, dialect), columns)
+            )
+        )
+    )
+
+
+def _index_fields(model, indexes: Iterable[str] | None, include_natural_key: bool) -> list[str]:
+    "Fields to index: the configured ones (or the model's defaults), plus its natural key if requested"
+    fields = list(getattr(model, "indexed_fields", ()) if indexes is None else indexes)
+    natural_key = getattr(model, "natural_key", None)
+    if include_natural_key and natural_key is not None and natural_key not in fields:
+        fields.insert(0, natural_key)
+    return fields
+
+
+def _create_indexes(cursor, dialect: str, model, table: str, fields: list[str]) -> None:
+    for statement in create_index_sql(model, table, dialect, fields):
+        try:
+            cursor.execute(statement)
+        except mysql.connector.Error as e:
+            # MySQL no tiene `CREATE INDEX IF NOT EXISTS`: el índice ya existe (ER_DUP_KEYNAME)
+            if e.errno != 1061:
+                raise
 
 
 def write_batch_csv(records: Iterable, path: str):
-    list_records = records
-    if not list_records:
+    first_record, list_records = _peek(records)
+    if first_record is None:
         return
 
-    headers = list(list_records[0].__fields__.keys())
+    serializer = serializer_for(type(first_record))
 
     with open(f"{path}/Productos.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f, fieldnames=headers, quotechar='"', lineterminator="\n", quoting=csv.QUOTE_STRINGS,
+        writer = csv.writer(
+            f, quotechar='"', lineterminator="\n", quoting=csv.QUOTE_STRINGS,
         )
-        writer.writeheader()
-        for record in list_records:
-            row_dict = record.model_dump(mode="python")
-            writer.writerow(row_dict)
+        writer.writerow(serializer.fields)
+        for chunk in itertools.batched(list_records, DEFAULT_CHUNK_SIZE):
+            writer.writerows(serializer.rows(chunk))
 
 
 def write_batch_jsonl(records: Iterable, path: str):
-    with open(f"{path}/Productos.jsonl", "w", encoding="utf-8") as f:
-        for record in records:
-            f.write(
-                json.dumps(record.model_dump(mode="json"), ensure_ascii=False) + "\n"
-            )
+    with open(f"{path}/Productos.jsonl", "wb") as f:
+        for chunk in itertools.batched(records, DEFAULT_CHUNK_SIZE):
+            for line in serializer_for(type(chunk[0])).json_lines(chunk):
+                f.write(line + b"\n")
 
 
 def write_batch_excel(records: Iterable, path: str):
-    list_records = records
-    if not list_records:
+    first_record, list_records = _peek(records)
+    if first_record is None:
         return
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Products"
 
-    first_dict = list_records[0].model_dump(mode="python")
-    headers = list(first_dict.keys())
-    ws.append(headers)
+    # Modo write-only: las filas se escriben en streaming, sin mantener las celdas en memoria
+    wb = Workbook(write_only=True)
+    serializer = serializer_for(type(first_record))
+    headers = list(serializer.fields)
+
+    ws = None
+    sheet_rows = EXCEL_MAX_ROWS
+
+    for chunk in itertools.batched(list_records, DEFAULT_CHUNK_SIZE):
+        for row in serializer.json_rows(chunk):
+            # Al llenar una hoja se continúa en otra ("Products", "Products_2", ...)
+            if sheet_rows >= EXCEL_MAX_ROWS:
+                ws = wb.create_sheet("Products" if ws is None else f"Products_{len(wb.worksheets) + 1}")
+                ws.append(headers)
+                sheet_rows = 1
 
-    for record in list_records:
-        row_dict = record.model_dump(mode="json")
-        row_values = [row_dict[field] for field in headers]
-        ws.append(row_values)
+            ws.append(row)
+            sheet_rows += 1
 
     wb.save(f"{path}/Productos.xlsx")
 
 
-def write_batch_parquet(records: Iterable, path: str):
-    dict_records: list[dict] = [r.model_dump(mode="python") for r in records]
-    table = pa.Table.from_pylist(dict_records)
-    pq.write_table(table, f"{path}/Productos.parquet")
+def _parquet_path(path: str, store: str | None, partition: bool) -> Path:
+    "Destination file, inside `store=<store>/crawl_date=<date>` (Hive-style) when partitioning"
+    directory = Path(path)
+    if partition:
+        if not store:
+            raise Exception("Se requiere la tienda para particionar la salida Parquet por tienda y fecha")
+        directory = directory / f"store={quote(store, safe='')}" / f"crawl_date={date.today().isoformat()}"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / "Productos.parquet"
+
+
+def _records_to_arrow(records: tuple, schema: pa.Schema) -> pa.Table:
+    columns = serializer_for(type(records[0])).columns(records)
 
+    # Los tipos que Arrow no conoce (HttpUrl...) se guardan como texto
+    for field in schema:
+        if pa.types.is_string(field.type):
+            columns[field.name] = [None if v is None else str(v) for v in columns[field.name]]
 
-def write_batch_sqlite(records: Iterable, table: str, db_path: str):
-    list_records = records
-    if not list_records:
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def write_batch_parquet(
+    records: Iterable,
+    path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    compression: str = "snappy",
+    store: str | None = None,
+    partition: bool = False,
+):
+    first_record, list_records = _peek(records)
+    if first_record is None:
+        return
+
+    # Esquema fijo por modelo, en lugar de inferirlo de los datos en cada ejecución
+    schema = arrow_schema(type(first_record))
+    string_columns = [field.name for field in schema if pa.types.is_string(field.type)]
+
+    with pq.ParquetWriter(
+        _parquet_path(path, store, partition),
+        schema,
+        compression=compression,
+        use_dictionary=string_columns,
+    ) as writer:
+        # Cada bloque se escribe como un row group, sin materializar el catálogo completo
+        for chunk in itertools.batched(list_records, chunk_size):
+            writer.write_table(_records_to_arrow(chunk, schema), row_group_size=chunk_size)
+
+
+def write_batch_sqlite(
+    records: Iterable,
+    table: str,
+    db_path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    upsert: bool = False,
+    indexes: Iterable[str] | None = None,
+    store: str = "",
+    delete_missing: bool = False,
+):
+    first_record, list_records = _peek(records)
+    if first_record is None:
         return
 
-    first_dict = list_records[0].model_dump(mode="python")
-    fields = list(first_dict.keys())
+    # Modo de carga masiva (WAL, `synchronous=NORMAL`...): ver `SQLiteDB.BULK_PRAGMAS`
+    if upsert:
+        with SQLiteDB(db_path, bulk=True) as (conn, cursor):
+            _upsert_records(
+                conn,
+                cursor,
+                "sqlite",
+                table,
+                store,
+                first_record,
+                list_records,
+                chunk_size,
+                indexes=indexes,
+                delete_missing=delete_missing,
+            )
+            cursor.execute("PRAGMA optimize")
+        return
+
+    fields = list(serializer_for(type(first_record)).fields)
     field_list = ", ".join(fields)
     placeholders = ", ".join("?" for _ in fields)
+    started_at = time.perf_counter()
+    rows = 0
 
-    values = [
-        tuple(None if v ==  '' else str(v) for v in rec.model_dump(mode="python").values())
-        for rec in list_records
-    ]
-
-    with SQLiteDB(db_path) as (conn, cursor):
+    with SQLiteDB(db_path, bulk=True) as (conn, cursor):
 
         cursor.execute(
             f"DROP TABLE IF EXISTS {table};"
         )
         
         cursor.execute(
-            f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(f'{f} TEXT' for f in fields)})"
+            create_table_sql(type(first_record), table, "sqlite")
         )
+        conn.commit()
 
-        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
-        if cursor.fetchone():
-            cursor.execute(f"DELETE FROM {table}")
-        
-        cursor.executemany(
-            f"INSERT INTO {table} ({field_list}) VALUES ({placeholders})", values
-        )
+        # Una transacción por bloque: memoria acotada, y los lectores ven las filas según se cargan
+        for chunk in itertools.batched(list_records, chunk_size):
+            cursor.executemany(
+                f"INSERT INTO {table} ({field_list}) VALUES ({placeholders})",
+                _db_rows(chunk, "sqlite"),
+            )
+            conn.commit()
+            rows += len(chunk)
+
+        # Los índices se construyen una vez cargados los datos
+        _create_indexes(cursor, "sqlite", type(first_record), table, _index_fields(type(first_record), indexes, True))
         conn.commit()
+        cursor.execute("PRAGMA optimize")
+
+    _log_load_rate("SQLite", table, rows, started_at)
+
+
+def _log_load_rate(destination: str, table: str, rows: int, started_at: float) -> None:
+    elapsed = time.perf_counter() - started_at
+    logger.info(
+        "Cargadas %d filas en %s (tabla '%s') en %.2fs (%.0f filas/s)",
+        rows,
+        destination,
+        table,
+        elapsed,
+        rows / elapsed if elapsed > 0 else 0.0,
+    )
+
+
+def _insert_mysql_rows(
+    cursor, table: str, field_list: str, rows: list[tuple], insert_rows: int, on_duplicate: str = ""
+) -> None:
+    "Multi-row INSERT statements of up to `insert_rows` rows each"
+    row_placeholders = f"({', '.join('%s' for _ in rows[0])})"
+    for batch in itertools.batched(rows, insert_rows):
+        cursor.execute(
+            f"INSERT INTO {table} ({field_list}) VALUES {', '.join(row_placeholders for _ in batch)}{on_duplicate}",
+            [value for row in batch for value in row],
+        )
+
 
+def _mysql_load_data_line(row: tuple) -> str:
+    # Todos los valores van entre comillas; NULL se escribe como la palabra NULL sin comillas
+    return ",".join("NULL" if v is None else '"' + str(v).replace('"', '""') + '"' for v in row) + "\n"
 
-def write_batch_mysql(records: Iterable, table: str, conn_params: dict):
-    list_records = records
-    if not list_records:
+
+def _load_data_mysql_rows(cursor, table: str, field_list: str, rows: list[tuple]) -> None:
+    "Spools the rows to a temporary file and loads it with `LOAD DATA LOCAL INFILE`"
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8", newline="") as spool:
+        spool.writelines(_mysql_load_data_line(row) for row in rows)
+        spool.flush()
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            f"LINES TERMINATED BY '\\n' ({field_list})",
+            (spool.name,),
+        )
+
+
+def write_batch_mysql(
+    records: Iterable,
+    table: str,
+    conn_params: dict,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    insert_rows: int = DEFAULT_MYSQL_INSERT_ROWS,
+    load_data: bool = False,
+    upsert: bool = False,
+    indexes: Iterable[str] | None = None,
+    store: str = "",
+    delete_missing: bool = False,
+):
+    first_record, list_records = _peek(records)
+    if first_record is None:
         return
 
-    first_dict = list_records[0].model_dump(mode="python")
-    fields = list(first_dict.keys())
-    field_list = ", ".join(fields)
-    placeholders = ", ".join("%s" for _ in fields)
+    if upsert:
+        with MySQLDB(conn_params) as (conn, cursor):
+            _upsert_records(
+                conn,
+                cursor,
+                "mysql",
+                table,
+                store,
+                first_record,
+                list_records,
+                chunk_size,
+                insert_rows,
+                indexes=indexes,
+                delete_missing=delete_missing,
+            )
+        return
 
-    values = [
-        tuple(None if v ==  '' else str(v) for v in rec.model_dump(mode="python").values())
-        for rec in list_records
-    ]
+    fields = list(serializer_for(type(first_record)).fields)
+    field_list = ", ".join(fields)
 
-    with MySQLDB(conn_params) as (conn, cursor):
+    with MySQLDB(conn_params, allow_local_infile=load_data) as (conn, cursor):
 
         cursor.execute(
             f"DROP TABLE IF EXISTS {table};"
         )
 
         cursor.execute(
-            f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(f'{f} TEXT' for f in fields)})"
+            create_table_sql(type(first_record), table, "mysql")
         )
+        conn.commit()
 
-        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
-        if cursor.fetchone():
-            cursor.execute(f"TRUNCATE TABLE {table}")
-        
-        cursor.executemany(
-            f"INSERT INTO {table} ({field_list}) VALUES ({placeholders})", values
-        )
+        loaded_rows = 0
+        started_at = time.perf_counter()
+
+        # Commit por bloques: memoria y tamaño de transacción acotados
+        for chunk in itertools.batched(list_records, chunk_size):
+            rows = _db_rows(chunk, "mysql")
+
+            if load_data:
+                try:
+                    _load_data_mysql_rows(cursor, table, field_list, rows)
+                except mysql.connector.Error as e:
+                    logger.warning("No se puede usar LOAD DATA LOCAL INFILE en MySQL (%s). Se usan INSERT multi-fila", e)
+                    load_data = False
+
+            if not load_data:
+                _insert_mysql_rows(cursor, table, field_list, rows, insert_rows)
+
+            conn.commit()
+            loaded_rows += len(rows)
+
+        _log_load_rate("MySQL", table, loaded_rows, started_at)
+
+        # Los índices se construyen una vez cargados los datos
+        _create_indexes(cursor, "mysql", type(first_record), table, _index_fields(type(first_record), indexes, True))
         conn.commit()
 
 
-def write_batch_postgres(records: Iterable, table: str, conn_params: dict):
-    list_records = records
-    if not list_records:
+def _copy_postgres_chunk(cursor, table: str, field_list: str, rows: list[tuple]) -> None:
+    "Streams one chunk through `COPY ... FROM STDIN` as CSV from an in-memory buffer"
+    buffer = io.StringIO()
+    # En CSV de COPY, un campo vacío sin comillas es NULL (`db_column_converters` ya convierte '' en None)
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({field_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def write_batch_postgres(
+    records: Iterable,
+    table: str,
+    conn_params: dict,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    upsert: bool = False,
+    indexes: Iterable[str] | None = None,
+    store: str = "",
+    delete_missing: bool = False,
+):
+    first_record, list_records = _peek(records)
+    if first_record is None:
         return
 
-    first_dict = list_records[0].model_dump(mode="python")
-    fields = list(first_dict.keys())
-    field_list = ", ".join(fields)
-    placeholders = ", ".join("%s" for _ in fields)
+    if upsert:
+        with PostgreSQLDB(conn_params) as (conn, cursor):
+            _upsert_records(
+                conn,
+                cursor,
+                "postgres",
+                table,
+                store,
+                first_record,
+                list_records,
+                chunk_size,
+                indexes=indexes,
+                delete_missing=delete_missing,
+            )
+        return
 
-    values = [
-        tuple(None if v ==  '' else str(v) for v in rec.model_dump(mode="python").values())
-        for rec in list_records
-    ]
+    fields = list(serializer_for(type(first_record)).fields)
+    field_list = ", ".join(fields)
 
     with PostgreSQLDB(conn_params) as (conn, cursor):
 
@@ -151,16 +412,225 @@ def write_batch_postgres(records: Iterable, table: str, conn_params: dict):
         )
 
         cursor.execute(
-            f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(f'{f} TEXT' for f in fields)})"
+            create_table_sql(type(first_record), table, "postgres")
+        )
+
+        # Toda la carga va en una única transacción: COPY por bloques, con `execute_values` como
+        # alternativa si el servidor (o un pooler intermedio) no admite COPY
+        use_copy = True
+        loaded_rows = 0
+        started_at = time.perf_counter()
+
+        for chunk in itertools.batched(list_records, chunk_size):
+            rows = _db_rows(chunk, "postgres")
+
+            if use_copy:
+                cursor.execute("SAVEPOINT copy_chunk")
+                try:
+                    _copy_postgres_chunk(cursor, table, field_list, rows)
+                    cursor.execute("RELEASE SAVEPOINT copy_chunk")
+                except psycopg2.Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT copy_chunk")
+                    logger.warning("No se puede usar COPY en PostgreSQL (%s). Se usa `execute_values`", e)
+                    use_copy = False
+
+            if not use_copy:
+                psycopg2.extras.execute_values(
+                    cursor,
+                    f"INSERT INTO {table} ({field_list}) VALUES %s",
+                    rows,
+                    page_size=len(rows),
+                )
+
+            loaded_rows += len(rows)
+
+        # Los índices se construyen una vez cargados los datos, en la misma transacción
+        _create_indexes(cursor, "postgres", type(first_record), table, _index_fields(type(first_record), indexes, True))
+        conn.commit()
+        _log_load_rate("PostgreSQL", table, loaded_rows, started_at)
+
+
+# === Carga incremental (upsert por clave natural) ===
+
+_DIALECT_NAMES = {"sqlite": "SQLite", "mysql": "MySQL", "postgres": "PostgreSQL"}
+
+# Columnas que la carga incremental añade a las del modelo: la clave compuesta (tienda, clave del
+# registro) y el hash de contenido de la fila
+_UPSERT_KEY_COLUMNS = ("store", "record_key")
+
+
+def _upsert_extra_columns(dialect: str) -> dict[str, str]:
+    if dialect == "mysql":
+        return {"store": MYSQL_STORE_KEY_TYPE, "record_key": MYSQL_KEY_TYPE, "content_hash": "CHAR(64)"}
+    return {"store": "TEXT", "record_key": "TEXT", "content_hash": "CHAR(64)"}
+
+
+def _create_upsert_table(cursor, dialect: str, table: str, model, fields: list[str]) -> None:
+    "Creates the table keyed by (store, record key), recreating it if it has another schema"
+    create_table = create_table_sql(
+        model, table, dialect, primary_key=", ".join(_UPSERT_KEY_COLUMNS), extra_columns=_upsert_extra_columns(dialect)
+    )
+
+    cursor.execute(create_table)
+    cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+    cursor.fetchall()
+    existing_columns = [column[0].lower() for column in cursor.description]
+
+    # Tabla creada por una carga completa (sin clave primaria ni `content_hash`), con otro modelo o
+    # con la clave de una versión anterior
+    if existing_columns != [c.lower() for c in [*fields, *_upsert_extra_columns(dialect)]]:
+        logger.warning("La tabla '%s' no tiene el esquema de la carga incremental. Se vuelve a crear", table)
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(create_table)
+
+
+def _write_upsert_rows(cursor, dialect: str, table: str, columns: list[str], rows: list[tuple], insert_rows: int) -> None:
+    column_list = ", ".join(columns)
+    conflict_columns = ", ".join(_UPSERT_KEY_COLUMNS)
+    updated_columns = [c for c in columns if c not in _UPSERT_KEY_COLUMNS]
+
+    if dialect == "sqlite":
+        cursor.executemany(
+            f"INSERT INTO {table} ({column_list}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({conflict_columns}) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in updated_columns)}",
+            rows,
+        )
+    elif dialect == "postgres":
+        psycopg2.extras.execute_values(
+            cursor,
+            f"INSERT INTO {table} ({column_list}) VALUES %s "
+            f"ON CONFLICT ({conflict_columns}) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in updated_columns)}",
+            rows,
+            page_size=len(rows),
+        )
+    else:
+        _insert_mysql_rows(
+            cursor,
+            table,
+            column_list,
+            rows,
+            insert_rows,
+            on_duplicate=f" ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in updated_columns)}",
+        )
+
+
+def _create_seen_keys_table(cursor, dialect: str) -> None:
+    "Temporary table (private to the connection) with the record keys received in this load"
+    if dialect == "mysql":
+        cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS upsert_seen_keys (record_key {MYSQL_KEY_TYPE})")
+    else:
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS upsert_seen_keys (record_key TEXT)")
+    cursor.execute("DELETE FROM upsert_seen_keys")
+
+
+def _record_key(row: tuple, key_index: int, fallback_indexes: list[int]) -> str | None:
+    "The row's natural key or, if it is empty, its fallback key (e.g. the product URL); None if both are"
+    if row[key_index] is not None:
+        return str(row[key_index])
+    fallback_values = [row[index] for index in fallback_indexes]
+    if all(value is None for value in fallback_values):
+        return None
+    return "|".join("" if value is None else str(value) for value in fallback_values)
+
+
+def _upsert_records(
+    conn,
+    cursor,
+    dialect: str,
+    table: str,
+    store: str,
+    first_record,
+    records: Iterable,
+    chunk_size: int,
+    insert_rows: int = DEFAULT_MYSQL_INSERT_ROWS,
+    indexes: Iterable[str] | None = None,
+    delete_missing: bool = False,
+) -> None:
+    """
+    Carga incremental: en lugar de vaciar la tabla, inserta o actualiza (`ON CONFLICT` /
+    `ON DUPLICATE KEY UPDATE`) por la clave (tienda, clave natural del registro), y solo las filas
+    nuevas o cuyo hash de contenido ha cambiado desde la carga anterior.
+
+    Por defecto no se borra nada: un registro que no llega en esta carga puede ser un producto
+    retirado, pero también uno cuya descarga ha fallado. Con `delete_missing` se eliminan al terminar
+    los registros de la tienda que no han llegado, así que solo debe usarse con cargas completas.
+
+    Si la clave natural de un registro está vacía se usa la clave alternativa del modelo
+    (`fallback_key`, p.ej. la URL del producto); si tampoco la tiene, la carga falla.
+    """
+    model = type(first_record)
+    natural_key = getattr(model, "natural_key", None)
+    if natural_key is None:
+        raise Exception(f"El modelo '{model.__name__}' no define una clave natural para la carga incremental")
+
+    fields = list(serializer_for(model).fields)
+    columns = [*fields, *_upsert_extra_columns(dialect)]
+    key_index = fields.index(natural_key)
+    fallback_indexes = [fields.index(field) for field in getattr(model, "fallback_key", ())]
+    placeholder = "?" if dialect == "sqlite" else "%s"
+
+    _create_upsert_table(cursor, dialect, table, model, fields)
+    _create_indexes(cursor, dialect, model, table, _index_fields(model, indexes, True))
+    _create_seen_keys_table(cursor, dialect)
+    conn.commit()
+
+    written_rows = unchanged_rows = 0
+    started_at = time.perf_counter()
+
+    for chunk in itertools.batched(records, chunk_size):
+        # Una sola fila por clave dentro del bloque (un upsert no puede tocar dos veces la misma fila)
+        keyed_rows: dict[str, tuple] = {}
+
+        for row in _db_rows(chunk, dialect):
+            record_key = _record_key(row, key_index, fallback_indexes)
+            if record_key is None:
+                raise Exception(
+                    f"Registro de '{store}' sin '{natural_key}' ni clave alternativa para la carga incremental "
+                    f"en '{table}'"
+                )
+            keyed_rows[record_key] = row
+
+        # Hashes guardados solo de las claves del bloque, para no cargar en memoria los de toda la tabla
+        cursor.execute(
+            f"SELECT record_key, content_hash FROM {table} "
+            f"WHERE store = {placeholder} AND record_key IN ({', '.join(placeholder for _ in keyed_rows)})",
+            (store, *keyed_rows),
         )
+        stored_hashes: dict[str, str] = dict(cursor.fetchall())
 
-        # Comprobamos si hay datos, y ejecutamos una operación de TRUNCATE para vaciar la tabla si los hay
-        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
-        if cursor.fetchone():
-            cursor.execute(f"TRUNCATE TABLE {table}")
+        changed_rows = []
+        for record_key, row in keyed_rows.items():
+            content_hash = hashlib.sha256(json.dumps(row, default=str).encode()).hexdigest()
+            if stored_hashes.get(record_key) == content_hash:
+                unchanged_rows += 1
+            else:
+                changed_rows.append((*row, store, record_key, content_hash))
 
         cursor.executemany(
-            f"INSERT INTO {table} ({field_list}) VALUES ({placeholders})",
-            values
+            f"INSERT INTO upsert_seen_keys (record_key) VALUES ({placeholder})", [(key,) for key in keyed_rows]
+        )
+        if changed_rows:
+            _write_upsert_rows(cursor, dialect, table, columns, changed_rows, insert_rows)
+            written_rows += len(changed_rows)
+        conn.commit()
+
+    deleted_rows = 0
+    if delete_missing:
+        # Los productos de la tienda que no han llegado en esta carga ya no están en su catálogo
+        cursor.execute(
+            f"DELETE FROM {table} WHERE store = {placeholder} "
+            "AND record_key NOT IN (SELECT record_key FROM upsert_seen_keys)",
+            (store,),
         )
-        conn.commit()
\ No newline at end of file
+        deleted_rows = cursor.rowcount
+        conn.commit()
+
+    logger.info(
+        "Carga incremental de '%s' en '%s': %d filas nuevas o modificadas, %d sin cambios, %d eliminadas",
+        store,
+        table,
+        written_rows,
+        unchanged_rows,
+        deleted_rows,
+    )
+    _log_load_rate(_DIALECT_NAMES[dialect], table, written_rows, started_at)
@@ -0,0 +1,147 @@
+import functools
+import types
+import typing
+from datetime import date, datetime, timezone
+
+import pyarrow as pa
+from pydantic import BaseModel
+
+# Tipo SQL nativo de cada tipo Python, por BBDD. SQLite guarda fechas como texto ISO 8601
+SQL_TYPES: dict[str, dict[type, str]] = {
+    "sqlite": {bool: "INTEGER", int: "INTEGER", float: "REAL", datetime: "TEXT", date: "TEXT", str: "TEXT"},
+    "mysql": {bool: "BOOLEAN", int: "BIGINT", float: "DOUBLE", datetime: "DATETIME(6)", date: "DATE", str: "TEXT"},
+    "postgres": {
+        bool: "BOOLEAN",
+        int: "BIGINT",
+        float: "DOUBLE PRECISION",
+        datetime: "TIMESTAMP WITH TIME ZONE",
+        date: "DATE",
+        str: "TEXT",
+    },
+}
+
+# Tipo Arrow (Parquet) de cada tipo Python
+ARROW_TYPES: dict[type, pa.DataType] = {
+    bool: pa.bool_(),
+    int: pa.int64(),
+    float: pa.float64(),
+    datetime: pa.timestamp("us", tz="UTC"),
+    date: pa.date32(),
+    str: pa.string(),
+}
+
+# En MySQL las columnas TEXT no pueden ser clave primaria, y solo se indexa un prefijo
+MYSQL_KEY_TYPE = "VARCHAR(512)"
+# Tienda de origen en la clave compuesta (tienda, clave) de la carga incremental: junto con
+# `MYSQL_KEY_TYPE` cabe en el límite de 3072 bytes de una clave InnoDB en utf8mb4
+MYSQL_STORE_KEY_TYPE = "VARCHAR(255)"
+MYSQL_INDEX_PREFIX = 191
+
+
+def _python_type(annotation) -> type:
+    "Python type behind a field annotation, unwrapping `Optional[...]` / `X | None`"
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    # `bool` antes que `int` (es subclase); cualquier otro tipo (HttpUrl...) se guarda como texto
+    for python_type in (bool, int, float, datetime, date):
+        if isinstance(annotation, type) and issubclass(annotation, python_type):
+            return python_type
+    return str
+
+
+def column_types(model: type[BaseModel], dialect: str, key: str | None = None) -> dict[str, str]:
+    "SQL column type of each field of `model`"
+    sql_types = SQL_TYPES[dialect]
+    columns = {}
+    for name, field in model.model_fields.items():
+        python_type = _python_type(field.annotation)
+        if dialect == "mysql" and name == key and python_type is str:
+            columns[name] = MYSQL_KEY_TYPE
+        else:
+            columns[name] = sql_types[python_type]
+    return columns
+
+
+def arrow_schema(model: type[BaseModel]) -> pa.Schema:
+    "Fixed Arrow schema of `model`, so every file of a vendor has the same column types"
+    return pa.schema(
+        [
+            pa.field(name, ARROW_TYPES[_python_type(field.annotation)], nullable=True)
+            for name, field in model.model_fields.items()
+        ]
+    )
+
+
+def create_table_sql(
+    model: type[BaseModel],
+    table: str,
+    dialect: str,
+    primary_key: str | None = None,
+    extra_columns: dict[str, str] | None = None,
+) -> str:
+    "`CREATE TABLE` with native column types derived from the model's field annotations"
+    columns = {**column_types(model, dialect, key=primary_key), **(extra_columns or {})}
+    definitions = [f"{name} {sql_type}" for name, sql_type in columns.items()]
+    if primary_key is not None:
+        definitions.append(f"PRIMARY KEY ({primary_key})")
+    return f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)})"
+
+
+def create_index_sql(model: type[BaseModel], table: str, dialect: str, fields: typing.Iterable[str]) -> list[str]:
+    """
+    Sentencias `CREATE INDEX` para los campos indicados. MySQL no admite `IF NOT EXISTS`, así que
+    quien las ejecute debe ignorar los índices ya existentes.
+    """
+    columns = column_types(model, dialect)
+    statements = []
+
+    for field in fields:
+        if field not in columns:
+            raise Exception(f"El modelo '{model.__name__}' no tiene el campo '{field}' para crear un índice")
+
+        indexed = field
+        if dialect == "mysql" and columns[field] == "TEXT":
+            indexed = f"{field}({MYSQL_INDEX_PREFIX})"
+
+        if_not_exists = "" if dialect == "mysql" else "IF NOT EXISTS "
+        statements.append(f"CREATE INDEX {if_not_exists}idx_{table}_{field} ON {table} ({indexed})")
+
+    return statements
+
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+@functools.cache
+def db_column_converters(model: type[BaseModel], dialect: str) -> tuple[typing.Callable[[list], list] | None, ...]:
+    """
+    Conversores por campo que adaptan una columna entera de una vez a lo que espera cada driver
+    (y la vía de carga masiva), según el tipo declarado del campo: las cadenas vacías pasan a NULL,
+    los booleanos a enteros salvo en PostgreSQL y las fechas a texto ISO 8601 en SQLite o a UTC sin
+    zona en MySQL (None: la columna se usa tal cual).
+    """
+    converters = []
+
+    for field in model.model_fields.values():
+        annotation = field.annotation
+        if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+            annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+        python_type = _python_type(annotation)
+
+        if annotation is str:
+            converters.append(lambda column: [v or None for v in column])
+        elif python_type is str:
+            converters.append(lambda column: [None if v is None else str(v) or None for v in column])
+        elif python_type is bool and dialect != "postgres":
+            converters.append(lambda column: [None if v is None else int(v) for v in column])
+        elif python_type is datetime and dialect == "sqlite":
+            converters.append(lambda column: [None if v is None else v.isoformat() for v in column])
+        elif python_type is datetime and dialect == "mysql":
+            converters.append(lambda column: [None if v is None else _naive_utc(v) for v in column])
+        elif python_type is date and dialect == "sqlite":
+            converters.append(lambda column: [None if v is None else v.isoformat() for v in column])
+        else:
+            converters.append(None)
+
+    return tuple(converters)
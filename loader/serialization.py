@@ -0,0 +1,61 @@
+import functools
+import operator
+import typing
+from typing import Iterable
+
+from pydantic import BaseModel, TypeAdapter
+
+
+def _is_flat(model: type[BaseModel]) -> bool:
+    "Whether every field is a scalar, so attribute values are already what `model_dump()` returns"
+    for field in model.model_fields.values():
+        for annotation in (field.annotation, *typing.get_args(field.annotation)):
+            if typing.get_origin(annotation) in (list, dict, tuple, set):
+                return False
+            if isinstance(annotation, type) and issubclass(annotation, (BaseModel, list, dict, tuple, set)):
+                return False
+    return True
+
+
+class BatchSerializer:
+    """
+    Serialización por bloques de modelos Pydantic de una misma clase, compartida por todos los
+    writers: filas (tuplas en el orden de los campos), columnas o líneas JSON.
+
+    Los valores "python" de modelos planos se leen directamente de los atributos con un
+    `attrgetter` precompilado; el modo "json" pasa el bloque entero de una vez por el serializador
+    de pydantic-core (`TypeAdapter(list[Model])`), en lugar de llamar a `model_dump()` por registro.
+    """
+
+    def __init__(self, model: type[BaseModel]) -> None:
+        self.model = model
+        self.fields: tuple[str, ...] = tuple(model.model_fields)
+        self._adapter = TypeAdapter(list[model])
+        self._getter = operator.attrgetter(*self.fields) if _is_flat(model) and len(self.fields) > 1 else None
+
+    def rows(self, batch: Iterable[BaseModel]) -> list[tuple]:
+        "Python-mode values of each record (same as `model_dump(mode='python')`), as tuples"
+        if self._getter is not None:
+            return list(map(self._getter, batch))
+        return [tuple(d.values()) for d in self._adapter.dump_python(list(batch), mode="python")]
+
+    def json_rows(self, batch: Iterable[BaseModel]) -> list[tuple]:
+        "JSON-mode values of each record (same as `model_dump(mode='json')`), as tuples"
+        return [tuple(d.values()) for d in self._adapter.dump_python(list(batch), mode="json")]
+
+    def columns(self, batch: Iterable[BaseModel]) -> dict[str, list]:
+        "Python-mode values of the batch, one list per field"
+        rows = self.rows(batch)
+        if not rows:
+            return {field: [] for field in self.fields}
+        return {field: list(values) for field, values in zip(self.fields, zip(*rows))}
+
+    def json_lines(self, batch: Iterable[BaseModel]) -> list[bytes]:
+        "One compact JSON document per record, straight from pydantic-core's compiled serializer"
+        to_json = self.model.__pydantic_serializer__.to_json
+        return [to_json(record) for record in batch]
+
+
+@functools.cache
+def serializer_for(model: type[BaseModel]) -> BatchSerializer:
+    return BatchSerializer(model)
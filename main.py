@@ -1,10 +1,17 @@
 import argparse
+import json
 from pathlib import Path
+from urllib.parse import quote
 
+from scraper.distributed import DEFAULT_LEASE_SIZE, DEFAULT_VISIBILITY_TIMEOUT, QueueCoordinator, run_worker
 from scraper.extraction_handler import ExtractionHandler
+from scraper.work_queue import SQLiteWorkQueue
 from scraper.logging_config import configure_logging
 from transformer.transformer_handler import Product, TransformerHandler
 from loader.loader_handler import LoaderHandler
+from pipeline.batch_runner import BatchRunner, ManifestEntry, load_manifest, write_report
+from pipeline.pipeline_runner import PipelineRunner
+from scraper.raw_spool import RawSpool
 from typing import Iterable
 import logging
 
@@ -15,15 +22,15 @@ def parse_args():
     parser = argparse.ArgumentParser(description="Web Scraping ETL por Vendor")
     parser.add_argument(
         "--url",
-        required=True,
+        default=None,
         help="URL del la tienda a scrapear (sin https://)",
         type=str,
     )
     parser.add_argument(
         "--vendor",
-        required=True,
-        choices=["shopify", "prestashop", "bigcommerce", "woocommerce", "wix"],
-        help="Vendor (plataforma) a scrapear",
+        default=None,
+        choices=["auto", "shopify", "prestashop", "bigcommerce", "woocommerce", "wix"],
+        help="Vendor (plataforma) a scrapear ('auto': se detecta a partir de la propia tienda)",
         type=str,
     )
 
@@ -37,9 +44,16 @@ def parse_args():
     # Database handling
     parser.add_argument(
         "--destination-format",
-        default="csv",
+        default=["csv"],
+        nargs="+",
         choices=["csv", "jsonl", "excel", "parquet", "sqlite", "mysql", "postgres"],
-        help="Formato de destino",
+        help="Formato(s) de destino; con varios, la misma extracción se carga en todos a la vez",
+    )
+    parser.add_argument(
+        "--sink-buffer",
+        default=8,
+        help="Bloques de registros que puede acumular cada destino cuando se carga en varios a la vez",
+        type=int,
     )
     parser.add_argument(
         "--db-type",
@@ -58,22 +72,257 @@ def parse_args():
         "--db-path", default=None, help="Ruta del archivo de BBDD sqlite", type=Path
     )
 
+    # Detección automática de la plataforma
+    parser.add_argument(
+        "--vendor-cache",
+        default=None,
+        help="Ruta del índice dominio -> plataforma de '--vendor auto' (si se indica, no se repite la detección)",
+        type=Path,
+    )
+    parser.add_argument(
+        "--vendor-cache-ttl-days",
+        default=30,
+        help="Días que se da por buena la plataforma detectada de un dominio",
+        type=float,
+    )
+
+    # Orden de las estrategias aprendido por tienda
+    parser.add_argument(
+        "--strategy-stats",
+        default=None,
+        help="Ruta de las estadísticas de aciertos por tienda y estrategia (si se indica, el orden en que se prueban se adapta a ellas)",
+        type=Path,
+    )
+    parser.add_argument(
+        "--strategy-reprobe-hours",
+        default=24,
+        help="Horas tras las que se vuelve a probar una estrategia descartada por no acertar en una tienda",
+        type=float,
+    )
+
+    # Concurrencia de la extracción
+    parser.add_argument(
+        "--max-in-flight",
+        default=32,
+        help="Número máximo de peticiones HTTP simultáneas (global)",
+        type=int,
+    )
+    parser.add_argument(
+        "--per-host-limit",
+        default=8,
+        help="Número máximo de peticiones HTTP simultáneas por host",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--parse-workers",
+        default=0,
+        help="Número de procesos dedicados a parsear las páginas de producto (0 = en el proceso principal)",
+        type=int,
+    )
+
+    # Caché HTTP persistente
+    parser.add_argument(
+        "--http-cache",
+        default=None,
+        help="Ruta del fichero de caché HTTP (si se indica, las respuestas se reutilizan entre ejecuciones)",
+        type=Path,
+    )
+    parser.add_argument(
+        "--http-cache-max-mb",
+        default=1024,
+        help="Tamaño máximo de la caché HTTP en MB (se descartan las entradas menos usadas)",
+        type=int,
+    )
+
+    # Extracción incremental
+    parser.add_argument(
+        "--crawl-state",
+        default=None,
+        help="Ruta del fichero de estado de extracción (si se indica, solo se descargan los productos cuyo lastmod ha cambiado)",
+        type=Path,
+    )
+
+    # Checkpoint y reanudación
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Ruta del diario de URLs ya extraídas (si se indica, se escribe durante la extracción y permite '--resume')",
+        type=Path,
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reanuda una extracción interrumpida desde el checkpoint de '--checkpoint', sin volver a descargar las URLs completadas",
+    )
+
+    # Modo por lotes (varias tiendas en un mismo proceso)
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help="Fichero JSON con la lista de tiendas a extraer: [{\"url\": ..., \"vendor\": ..., \"destination_format\": ...}, ...]",
+        type=Path,
+    )
+    parser.add_argument(
+        "--batch-concurrency",
+        default=8,
+        help="Número de tiendas del manifiesto que se extraen a la vez",
+        type=int,
+    )
+    parser.add_argument(
+        "--batch-report",
+        default=None,
+        help="Ruta del informe JSON con el resultado de cada tienda del manifiesto",
+        type=Path,
+    )
+
+    # Extracción distribuida mediante una cola de trabajo
+    parser.add_argument(
+        "--work-queue",
+        default=None,
+        help="Ruta de la cola de trabajo SQLite: la extracción de la tienda se reparte entre workers",
+        type=Path,
+    )
+    parser.add_argument(
+        "--queue-workers",
+        default=2,
+        help="Workers locales que lanza el coordinador (0: solo workers externos lanzados con '--worker')",
+        type=int,
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Ejecuta este proceso como worker de la cola de trabajo indicada en '--work-queue'",
+    )
+    parser.add_argument(
+        "--worker-idle-timeout",
+        default=60.0,
+        help="Segundos sin jobs abiertos tras los que termina un worker lanzado con '--worker'",
+        type=float,
+    )
+    parser.add_argument(
+        "--lease-size",
+        default=DEFAULT_LEASE_SIZE,
+        help="URLs de producto que toma un worker de la cola de una vez",
+        type=int,
+    )
+    parser.add_argument(
+        "--visibility-timeout",
+        default=DEFAULT_VISIBILITY_TIMEOUT,
+        help="Segundos que tiene un worker para completar su lote antes de que otro pueda tomarlo",
+        type=float,
+    )
+
+    # Spool de datos en bruto
+    parser.add_argument(
+        "--spool",
+        default=None,
+        help="Ruta del spool donde se guardan los datos en bruto de la extracción (JSONL comprimido con zstd)",
+        type=Path,
+    )
+    parser.add_argument(
+        "--from-spool",
+        default=None,
+        help="Repite la transformación y la carga desde un spool, sin volver a extraer la tienda",
+        type=Path,
+    )
+
+    # Streaming extracción -> transformación -> carga
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Procesa los productos en streaming (memoria constante) en lugar de materializar listas completas",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Ejecuta extracción, transformación y carga como etapas concurrentes unidas por colas acotadas",
+    )
+    parser.add_argument(
+        "--pipeline-queue-size",
+        default=256,
+        help="Elementos que puede acumular cada cola entre etapas del pipeline",
+        type=int,
+    )
+    parser.add_argument(
+        "--chunk-size",
+        default=1000,
+        help="Número de registros por bloque al escribir en Parquet o en BBDD",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--load-mode",
+        default="replace",
+        choices=["replace", "upsert"],
+        help="Carga en BBDD: 'replace' recarga la tabla completa; 'upsert' solo inserta o actualiza las filas nuevas o modificadas",
+    )
+
+    parser.add_argument(
+        "--db-indexes",
+        default=None,
+        help="Campos con índice secundario en BBDD, separados por comas (por defecto, los de cada modelo; '' para ninguno)",
+        type=lambda value: [field.strip() for field in value.split(",") if field.strip()],
+    )
+    parser.add_argument(
+        "--upsert-delete-missing",
+        action="store_true",
+        help="Con '--load-mode upsert', borrar los productos de la tienda que no lleguen en esta carga (también los de descargas fallidas)",
+    )
+
+    # Salida Parquet
+    parser.add_argument(
+        "--parquet-compression",
+        default="snappy",
+        choices=["snappy", "zstd", "gzip", "brotli", "lz4", "none"],
+        help="Códec de compresión de los ficheros Parquet",
+    )
+    parser.add_argument(
+        "--parquet-partition",
+        action="store_true",
+        help="Particiona la salida Parquet al estilo Hive por tienda y fecha de extracción (store=.../crawl_date=...)",
+    )
+
+    # Carga en MySQL
+    parser.add_argument(
+        "--mysql-insert-rows",
+        default=500,
+        help="Número de filas por sentencia INSERT multi-fila en MySQL",
+        type=int,
+    )
+    parser.add_argument(
+        "--mysql-load-data",
+        action="store_true",
+        help="Carga en MySQL con LOAD DATA LOCAL INFILE (requiere local_infile=ON en el servidor)",
+    )
+
     args = parser.parse_args()
 
     # Validaciones de dominio
+    if args.worker and args.work_queue is None:
+        parser.error("Se requiere especificar '--work-queue' cuando se usa '--worker'")
+
+    if args.resume and args.checkpoint is None:
+        parser.error("Se requiere especificar '--checkpoint' (el mismo de la ejecución interrumpida) cuando se usa '--resume'")
+
+    if not args.worker and args.from_spool is None and args.manifest is None and (args.url is None or args.vendor is None):
+        parser.error("Se requiere especificar '--url' y '--vendor' (salvo que se use '--from-spool', '--manifest' o '--worker')")
+
     file_formats = {"csv", "jsonl", "excel", "parquet"}
 
-    if args.destination_format in file_formats and not args.destination_path:
+    destination_formats = set(args.destination_format)
+
+    if destination_formats & file_formats and not args.destination_path:
         parser.error(
             f"Se requiere especificar '--destination-path' is cuando 'destination_format' es {file_formats}"
         )
 
-    if args.destination_format == "sqlite" and not args.db_path:
+    if "sqlite" in destination_formats and not args.db_path:
         parser.error(
             "Se requiere especificar '--db_path' cuando 'destination_format' is sqlite"
         )
 
-    if args.destination_format in {"mysql", "postgres"} and not args.db_config:
+    if destination_formats & {"mysql", "postgres"} and not args.db_config:
         parser.error(
             "Se requiere especificar '--db_config' cuando 'destination_format' es 'mysql' o 'postgres'"
         )
@@ -81,33 +330,241 @@ def parse_args():
     return args
 
 
+def build_loader(args, data: Iterable[Product]) -> LoaderHandler:
+    return LoaderHandler(
+        vendor=args.vendor,
+        data=data,
+        destination_path=args.destination_path,
+        destination_format=args.destination_format,
+        db_config=args.db_config,
+        db_path=args.db_path,
+        chunk_size=args.chunk_size,
+        mysql_insert_rows=args.mysql_insert_rows,
+        mysql_load_data=args.mysql_load_data,
+        load_mode=args.load_mode,
+        db_indexes=args.db_indexes,
+        upsert_delete_missing=args.upsert_delete_missing,
+        store=args.url,
+        parquet_compression=args.parquet_compression,
+        parquet_partition=args.parquet_partition,
+        sink_buffer=args.sink_buffer,
+    )
+
+
+def replay_spool(args) -> None:
+    "Transforms and loads the raw items of a spool, without crawling the store again"
+    spool = RawSpool(args.from_spool)
+    header = spool.read_header()
+
+    if args.vendor is not None and args.vendor != header["vendor"]:
+        raise Exception(f"El spool '{args.from_spool}' es de '{header['vendor']}', no de '{args.vendor}'")
+    args.vendor = header["vendor"]
+    args.url = args.url or header["store"]
+
+    logger.info("Transformando y cargando '%s' desde el spool '%s'", args.url, args.from_spool)
+
+    transformer = TransformerHandler(args.vendor, header["extraction_strategy"])
+    build_loader(args, transformer.iter_transform(spool.replay())).load()
+
+    logger.info(
+        "Proceso de ETL completado. Resultados guardados en '%s'", args.destination_path
+    )
+
+
+def entry_args(args, entry: ManifestEntry) -> argparse.Namespace:
+    "Arguments of one manifest entry: its own values over the command line ones"
+    return argparse.Namespace(
+        **{
+            **vars(args),
+            "url": entry.url,
+            "vendor": entry.vendor,
+            "destination_format": entry.destination_format or args.destination_format,
+            # Cada tienda escribe sus ficheros en su propia carpeta
+            "destination_path": entry.destination_path or args.destination_path / quote(entry.url, safe=""),
+            "db_path": entry.db_path or args.db_path,
+            "db_config": entry.db_config or args.db_config,
+        }
+    )
+
+
+def check_batch_destinations(args, entries: list[ManifestEntry]) -> None:
+    "Rejects manifest entries whose database destination would overwrite another store's data"
+    owners = {}
+
+    for entry in entries:
+        store_args = entry_args(args, entry)
+        destination_formats = set(store_args.destination_format)
+
+        if "sqlite" in destination_formats and not store_args.db_path:
+            raise Exception(f"La tienda '{entry.url}' del manifiesto carga en SQLite pero no tiene 'db_path'")
+        if destination_formats & {"mysql", "postgres"} and not store_args.db_config:
+            raise Exception(f"La tienda '{entry.url}' del manifiesto carga en MySQL/PostgreSQL pero no tiene 'db_config'")
+
+        for destination_format in destination_formats & {"sqlite", "mysql", "postgres"}:
+            connection = Path(store_args.db_path).resolve() if destination_format == "sqlite" else store_args.db_config
+            destination = (destination_format, json.dumps(connection, sort_keys=True, default=str))
+            owner = owners.setdefault(destination, entry)
+            if owner is entry:
+                continue
+
+            # Un fichero SQLite admite un solo escritor: varias tiendas cargando a la vez chocarían
+            # con `database is locked`
+            if destination_format == "sqlite":
+                raise Exception(
+                    f"Las tiendas '{owner.url}' y '{entry.url}' cargan en el mismo fichero SQLite ('{connection}'): "
+                    "cada tienda necesita su propio 'db_path' (o una BBDD MySQL/PostgreSQL compartida)"
+                )
+
+            # Varias tiendas en una misma tabla: solo en modo upsert y con el mismo modelo (vendor)
+            if args.load_mode != "upsert" or owner.vendor != entry.vendor or entry.vendor == "auto":
+                raise Exception(
+                    f"Las tiendas '{owner.url}' y '{entry.url}' cargan en la misma BBDD ({destination_format}): "
+                    "solo se admite con '--load-mode upsert' y el mismo vendor, indicado en el manifiesto"
+                )
+
+
+def run_batch(args) -> None:
+    "Crawls every store of the manifest concurrently, sharing one extraction handler"
+    entries = load_manifest(args.manifest)
+    if not entries:
+        raise Exception(f"El manifiesto '{args.manifest}' no tiene tiendas")
+    check_batch_destinations(args, entries)
+
+    # Handler de base sin plataforma: cada tienda usa el suyo (`for_vendor`), con su vendor o "auto"
+    handler = ExtractionHandler(
+        vendor="auto",
+        max_in_flight=args.max_in_flight,
+        per_host_limit=args.per_host_limit,
+        http_cache_path=args.http_cache,
+        http_cache_max_bytes=args.http_cache_max_mb * 1024**2,
+        crawl_state_path=args.crawl_state,
+        parse_workers=args.parse_workers,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+        vendor_cache_path=args.vendor_cache,
+        vendor_cache_ttl=args.vendor_cache_ttl_days * 24 * 3600,
+        strategy_stats_path=args.strategy_stats,
+        strategy_reprobe_interval=args.strategy_reprobe_hours * 3600,
+    )
+
+    def loader_factory(entry: ManifestEntry, data: Iterable[Product]) -> LoaderHandler:
+        store_args = entry_args(args, entry)
+        if set(store_args.destination_format) & {"csv", "jsonl", "excel", "parquet"}:
+            Path(store_args.destination_path).mkdir(parents=True, exist_ok=True)
+        return build_loader(store_args, data)
+
+    try:
+        results = BatchRunner(handler, loader_factory, concurrency=args.batch_concurrency).run(entries)
+    finally:
+        handler.close()
+
+    if args.batch_report is not None:
+        write_report(results, args.batch_report)
+
+    failed = [result for result in results if not result.ok]
+    if failed:
+        raise Exception(f"Han fallado {len(failed)} de {len(results)} tiendas del manifiesto")
+
+
+def worker_options(args) -> dict:
+    "Arguments of `run_worker` taken from the command line"
+    return {
+        "handler_options": {
+            "max_in_flight": args.max_in_flight,
+            "per_host_limit": args.per_host_limit,
+            "http_cache_path": args.http_cache,
+            "http_cache_max_bytes": args.http_cache_max_mb * 1024**2,
+            "parse_workers": args.parse_workers,
+        },
+        "lease_size": args.lease_size,
+        "visibility_timeout": args.visibility_timeout,
+    }
+
+
 def main():
     configure_logging("INFO")
     logging.info("==== INICIO DEL PROGRAMA ETL ====")
 
     args = parse_args()
 
+    handler = None
     try:
-        handler = ExtractionHandler(vendor=args.vendor)
-        raw_products, used_strategy_name = handler.extract(args.url)
+        if args.from_spool is not None:
+            replay_spool(args)
+            return
 
-        transformer = TransformerHandler(args.vendor, used_strategy_name)
+        if args.manifest is not None:
+            run_batch(args)
+            return
 
-        iterable_pydantic_models: Iterable[Product] = transformer.transform(
-            raw_products=raw_products
-        )
+        if args.worker:
+            run_worker(args.work_queue, idle_timeout=args.worker_idle_timeout, **worker_options(args))
+            return
 
-        # transformer.write_to_file()
-
-        loader = LoaderHandler(
+        handler = ExtractionHandler(
             vendor=args.vendor,
-            data=iterable_pydantic_models,
-            destination_path=args.destination_path,
-            destination_format=args.destination_format,
-            db_config=args.db_config,
-            db_path=args.db_path,
+            max_in_flight=args.max_in_flight,
+            per_host_limit=args.per_host_limit,
+            http_cache_path=args.http_cache,
+            http_cache_max_bytes=args.http_cache_max_mb * 1024**2,
+            crawl_state_path=args.crawl_state,
+            parse_workers=args.parse_workers,
+            checkpoint_path=args.checkpoint,
+            resume=args.resume,
+            vendor_cache_path=args.vendor_cache,
+            vendor_cache_ttl=args.vendor_cache_ttl_days * 24 * 3600,
+            strategy_stats_path=args.strategy_stats,
+            strategy_reprobe_interval=args.strategy_reprobe_hours * 3600,
         )
-        loader.load()
+
+        if args.vendor == "auto":
+            args.vendor = handler.detect_vendor(args.url)
+
+        # Con cola de trabajo, las URLs de producto las descargan los workers y aquí solo se recogen
+        extractor = handler
+        if args.work_queue is not None:
+            extractor = QueueCoordinator(
+                handler,
+                SQLiteWorkQueue(args.work_queue),
+                local_workers=args.queue_workers,
+                worker_options=worker_options(args),
+            )
+
+        if args.pipeline:
+            # Las tres etapas corren a la vez, cada una a su ritmo
+            PipelineRunner(
+                extractor,
+                vendor=args.vendor,
+                loader_factory=lambda data: build_loader(args, data),
+                queue_size=args.pipeline_queue_size,
+                spool=RawSpool(args.spool) if args.spool is not None else None,
+            ).run(args.url)
+
+        else:
+            if args.streaming:
+                # Todas las etapas son perezosas: el loader va tirando de la extracción según escribe
+                raw_products, used_strategy_name = extractor.iter_extract(args.url)
+            else:
+                raw_products, used_strategy_name = extractor.extract(args.url)
+
+            if args.spool is not None:
+                raw_products = RawSpool(args.spool).record(raw_products, args.vendor, args.url, used_strategy_name)
+
+            transformer = TransformerHandler(args.vendor, used_strategy_name)
+
+            if args.streaming:
+                iterable_pydantic_models: Iterable[Product] = transformer.iter_transform(
+                    raw_products=raw_products
+                )
+            else:
+                iterable_pydantic_models: Iterable[Product] = transformer.transform(
+                    raw_products=raw_products
+                )
+
+            build_loader(args, iterable_pydantic_models).load()
+
+        # Los datos ya están cargados: la siguiente ejecución empieza de cero
+        handler.complete(args.url)
 
         logger.info(
             "Proceso de ETL completado. Resultados guardados en '%s'", args.destination_path
@@ -117,6 +574,10 @@ def main():
         logger.error("Error en la ejecución de la ETL: '%s'", e)
         logger.error("Ejecución abortada")
 
+    finally:
+        if handler is not None:
+            handler.close()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,150 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from loader.loader_handler import LoaderHandler
+from scraper.extraction_handler import ExtractionHandler
+from transformer.transformer_handler import Product, TransformerHandler
+
+# Tiendas que se extraen a la vez
+DEFAULT_BATCH_CONCURRENCY = 8
+
+
+@dataclass
+class ManifestEntry:
+    url: str
+    # "auto": se detecta a partir de la propia tienda
+    vendor: str = "auto"
+    # Destino propio de la tienda; lo que no se indique se toma de la línea de comandos
+    destination_format: list[str] | None = None
+    destination_path: Path | None = None
+    db_path: Path | None = None
+    db_config: dict | str | None = None
+
+
+@dataclass
+class StoreResult:
+    url: str
+    vendor: str
+    strategy: str | None = None
+    products: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def load_manifest(path: str | Path) -> list[ManifestEntry]:
+    "Reads a JSON manifest: a list of `{url, vendor?, destination_format?, destination_path?, db_path?, db_config?}`"
+    with open(path, encoding="utf-8") as f:
+        raw_entries = json.load(f)
+
+    entries = []
+    for position, raw_entry in enumerate(raw_entries, start=1):
+        if not raw_entry.get("url"):
+            raise Exception(f"La entrada {position} del manifiesto '{path}' no tiene 'url'")
+
+        destination_format = raw_entry.get("destination_format")
+        if isinstance(destination_format, str):
+            destination_format = [destination_format]
+
+        entries.append(
+            ManifestEntry(
+                url=raw_entry["url"],
+                vendor=raw_entry.get("vendor") or "auto",
+                destination_format=destination_format,
+                destination_path=Path(raw_entry["destination_path"]) if raw_entry.get("destination_path") else None,
+                db_path=Path(raw_entry["db_path"]) if raw_entry.get("db_path") else None,
+                db_config=raw_entry.get("db_config"),
+            )
+        )
+    return entries
+
+
+class BatchRunner:
+    """
+    Extrae, transforma y carga muchas tiendas a la vez en un único proceso.
+
+    Todas las tiendas comparten el mismo `ExtractionHandler` de base: una sola sesión HTTP (y su pool
+    de conexiones), la caché HTTP, el estado de extracción, el checkpoint y el pool de parseo. El
+    fetcher compartido marca el techo global de peticiones en vuelo y el reparto justo entre hosts
+    (cada petición ocupa primero un hueco de su host y después uno global, por orden de llegada).
+    El fallo de una tienda no detiene al resto; cada una tiene su propio resultado.
+    """
+
+    def __init__(
+        self,
+        extraction_handler: ExtractionHandler,
+        loader_factory: Callable[[ManifestEntry, Iterable[Product]], LoaderHandler],
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> None:
+        self.extraction_handler = extraction_handler
+        # Construye el LoaderHandler de cada tienda a partir de su entrada y su flujo de modelos
+        self.loader_factory = loader_factory
+        self.concurrency = concurrency
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def run(self, entries: list[ManifestEntry]) -> list[StoreResult]:
+        started_at = time.perf_counter()
+        self.logger.info("Iniciando la extracción de %d tiendas (%d a la vez)", len(entries), self.concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="store") as executor:
+            results = list(executor.map(self._run_store, entries))
+
+        failed = [result for result in results if not result.ok]
+        self.logger.info(
+            "Lote completado en %.2fs: %d tiendas correctas, %d con error, %d productos",
+            time.perf_counter() - started_at,
+            len(results) - len(failed),
+            len(failed),
+            sum(result.products for result in results),
+        )
+        for result in failed:
+            self.logger.error("Tienda '%s' (%s): '%s'", result.url, result.vendor, result.error)
+
+        return results
+
+    def _run_store(self, entry: ManifestEntry) -> StoreResult:
+        result = StoreResult(url=entry.url, vendor=entry.vendor)
+        started_at = time.perf_counter()
+
+        try:
+            handler = self.extraction_handler.for_vendor(entry.vendor)
+            raw_products, result.strategy = handler.iter_extract(entry.url)
+            # Con vendor "auto", la plataforma ya se ha detectado (o leído del índice) al extraer
+            result.vendor = handler.vendor
+            models = TransformerHandler(handler.vendor, result.strategy).iter_transform(raw_products)
+
+            self.loader_factory(entry, self._count(models, result)).load()
+
+            # Los datos ya están cargados: la siguiente ejecución de la tienda empieza de cero
+            handler.complete(entry.url)
+        except Exception as e:
+            result.error = str(e)
+        finally:
+            result.seconds = time.perf_counter() - started_at
+
+        if result.ok:
+            self.logger.info(
+                "Tienda '%s' completada: %d productos en %.2fs ('%s')", entry.url, result.products, result.seconds, result.strategy
+            )
+        return result
+
+    @staticmethod
+    def _count(models: Iterable[Product], result: StoreResult) -> Iterator[Product]:
+        for model in models:
+            result.products += 1
+            yield model
+
+
+def write_report(results: list[StoreResult], path: str | Path) -> None:
+    "Writes the per-store results as a JSON list"
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{**asdict(result), "ok": result.ok} for result in results], f, ensure_ascii=False, indent=2)
@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+from loader.loader_handler import LoaderHandler
+from scraper.distributed import QueueCoordinator
+from scraper.extraction_handler import ExtractionHandler
+from scraper.raw_spool import RawSpool
+from transformer.transformer_handler import Product, TransformerHandler
+
+# Elementos que puede acumular cada cola entre etapas antes de frenar a la etapa anterior
+DEFAULT_QUEUE_SIZE = 256
+
+# Cada cuánto comprueba una etapa bloqueada si el pipeline se ha detenido (segundos)
+_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class _StageFailed:
+    "Marker sent downstream when a stage raises, carrying its exception"
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+class _Stopped(Exception):
+    "The pipeline was stopped by a failure in a later stage"
+
+
+class PipelineRunner:
+    """
+    Ejecuta extracción, transformación y carga como etapas concurrentes, unidas por colas acotadas:
+    la extracción y la transformación corren cada una en su hilo y la carga en el hilo llamante.
+
+    Así la BBDD ya escribe mientras la red sigue descargando, y el tiempo total se acerca al de la
+    etapa más lenta en lugar de a la suma de las tres. Una etapa rápida se bloquea cuando su cola de
+    salida está llena (contrapresión), y si una etapa falla el resto se detiene y el error se propaga.
+    """
+
+    def __init__(
+        self,
+        extraction_handler: ExtractionHandler | QueueCoordinator,
+        vendor: str,
+        loader_factory: Callable[[Iterable[Product]], LoaderHandler],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        spool: RawSpool | None = None,
+    ) -> None:
+        self.extraction_handler = extraction_handler
+        self.vendor = vendor
+        # Construye el LoaderHandler a partir del flujo de modelos ya transformados
+        self.loader_factory = loader_factory
+        self.queue_size = queue_size
+        # Si se indica, los ítems en bruto se guardan además en disco según se extraen
+        self.spool = spool
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def run(self, url: str) -> None:
+        started_at = time.perf_counter()
+        stop = threading.Event()
+
+        # La estrategia se elige antes de arrancar las etapas: la transformación depende de ella
+        raw_products, used_strategy_name = self.extraction_handler.iter_extract(url)
+        transformer = TransformerHandler(self.vendor, used_strategy_name)
+        if self.spool is not None:
+            raw_products = self.spool.record(raw_products, self.vendor, url, used_strategy_name)
+
+        raw_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        model_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            threading.Thread(
+                target=self._run_stage,
+                args=("extracción", lambda: raw_products, raw_queue, stop),
+                name="pipeline-extract",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=("transformación", lambda: transformer.iter_transform(self._iter_queue(raw_queue, stop)), model_queue, stop),
+                name="pipeline-transform",
+                daemon=True,
+            ),
+        ]
+        for stage in stages:
+            stage.start()
+
+        try:
+            self.loader_factory(self._iter_queue(model_queue, stop)).load()
+        finally:
+            # Si la carga falla, las etapas anteriores dejan de producir y terminan
+            stop.set()
+            for stage in stages:
+                stage.join()
+
+        self.logger.info("Pipeline de '%s' completado en %.2fs", url, time.perf_counter() - started_at)
+
+    def _run_stage(self, name: str, source: Callable[[], Iterable], output: queue.Queue, stop: threading.Event) -> None:
+        started_at = time.perf_counter()
+        count = 0
+        try:
+            for item in source():
+                self._put(output, item, stop)
+                count += 1
+        except _Stopped:
+            self.logger.warning("Etapa de %s detenida tras %d elementos", name, count)
+            return
+        except BaseException as e:
+            self.logger.error("Ha fallado la etapa de %s: '%s'", name, e)
+            marker = _StageFailed(e)
+        else:
+            self.logger.info("Etapa de %s terminada: %d elementos en %.2fs", name, count, time.perf_counter() - started_at)
+            marker = _DONE
+
+        try:
+            self._put(output, marker, stop)
+        except _Stopped:
+            pass
+
+    @staticmethod
+    def _put(output: queue.Queue, item, stop: threading.Event) -> None:
+        try:
+            output.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+
+        # Cola llena: se espera a la etapa siguiente, salvo que el pipeline se haya detenido
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+        raise _Stopped()
+
+    @staticmethod
+    def _iter_queue(source: queue.Queue, stop: threading.Event) -> Iterator:
+        while True:
+            try:
+                item = source.get_nowait()
+            except queue.Empty:
+                item = None
+                while item is None:
+                    if stop.is_set():
+                        raise _Stopped()
+                    try:
+                        item = source.get(timeout=_POLL_INTERVAL)
+                    except queue.Empty:
+                        pass
+
+            if item is _DONE:
+                return
+            if isinstance(item, _StageFailed):
+                raise item.error
+            yield item
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+from urllib.parse import urlsplit
+
+import curl_cffi.requests
+
+from scraper.http_cache import ResponseCache
+from scraper.rate_limiter import THROTTLING_STATUS_CODES, HostRateLimiter
+
+proxy_host = os.getenv("PROXY_HOST", "localhost")
+
+# Marca de fin de stream entre el event loop y el consumidor síncrono
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class FetchRequest:
+    url: str
+    method: str = "GET"
+    headers: dict | None = None
+    data: str | None = None
+    # Valor opaco que se devuelve junto a la respuesta (p.ej. la URL de producto original)
+    context: Any = None
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    request: FetchRequest
+    response: curl_cffi.requests.Response | None
+    error: Exception | None = None
+
+
+class AsyncFetcher:
+    """
+    Motor de descarga concurrente basado en `curl_cffi.requests.AsyncSession`.
+
+    El event loop vive en un hilo propio, de forma que las estrategias (síncronas) pueden
+    consumir los resultados con un iterador normal, en el orden en que se completan.
+    La concurrencia se limita por host (`per_host_limit`) y de forma global (`max_in_flight`), y el
+    ritmo de cada host lo marca un `HostRateLimiter` adaptativo. Las respuestas 429/503 se reintentan
+    (hasta `max_retries` veces) respetando `Retry-After`. Opcionalmente, las respuestas se sirven
+    y revalidan desde una `ResponseCache` en disco.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        per_host_limit: int = 8,
+        timeout: float = 30,
+        max_retries: int = 3,
+        rate_limiter: HostRateLimiter | None = None,
+        cache: ResponseCache | None = None,
+        **session_kwargs,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or HostRateLimiter(max_concurrency=per_host_limit)
+        self.cache = cache
+        self.session_kwargs = session_kwargs or {
+            "impersonate": "chrome",
+            "proxies": {
+                "http": f"http://{proxy_host}:8888",
+                "https": f"http://{proxy_host}:8888",
+            },
+        }
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._session: curl_cffi.requests.AsyncSession | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name=self.__class__.__name__, daemon=True)
+            thread.start()
+
+            self._loop, self._thread = loop, thread
+            self._session = self._submit(self._open_session()).result()
+
+    async def _open_session(self) -> curl_cffi.requests.AsyncSession:
+        # Los semáforos se crean dentro del loop, que es el único que los utiliza
+        self._global_slots = asyncio.Semaphore(self.max_in_flight)
+        self._host_slots = defaultdict(lambda: asyncio.Semaphore(self.per_host_limit))
+        return curl_cffi.requests.AsyncSession(max_clients=self.max_in_flight, **self.session_kwargs)
+
+    async def _shutdown(self) -> None:
+        # Cancela los streams que sigan abiertos (p.ej. una extracción interrumpida) antes de cerrar la sesión
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._session.close()
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._loop is None:
+                return
+            self._submit(self._shutdown()).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = self._session = None
+        if self.cache is not None:
+            self.cache.close()
+
+    def request(self, method: str, url: str, **kwargs) -> curl_cffi.requests.Response:
+        "Petición individual y bloqueante, sujeta a los mismos límites de concurrencia"
+        self._start()
+        result = self._submit(self._fetch(FetchRequest(url=url, method=method, **kwargs))).result()
+        if result.error is not None:
+            raise result.error
+        return result.response
+
+    def get(self, url: str, **kwargs) -> curl_cffi.requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def iter_fetch(self, requests: Iterable[FetchRequest]) -> Iterator[FetchResult]:
+        """
+        Descarga todas las peticiones de forma concurrente y devuelve los resultados a medida que
+        se completan (no en el orden de entrada). Los errores de transporte no se lanzan, sino que
+        se devuelven en `FetchResult.error`.
+        """
+        self._start()
+
+        loop = self._loop
+        results: queue.Queue = queue.Queue(maxsize=self.max_in_flight)
+        stop = threading.Event()
+        future = self._submit(self._produce(iter(requests), results, stop))
+
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            stop.set()
+            # Vaciamos la cola para que el productor no quede bloqueado en `put`. Si el fetcher ya se
+            # ha cerrado (p.ej. una extracción interrumpida), el productor no va a terminar nunca
+            while not future.done() and not loop.is_closed():
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            if future.done() and not future.cancelled():
+                future.result()
+
+    async def _produce(self, requests: Iterator[FetchRequest], results: queue.Queue, stop: threading.Event) -> None:
+        # Limita cuántas peticiones de este stream están en vuelo o pendientes de consumir
+        window = asyncio.Semaphore(self.max_in_flight)
+        tasks: set[asyncio.Task] = set()
+
+        try:
+            while not stop.is_set():
+                await window.acquire()
+                # El iterador de entrada puede ser perezoso (y hacer I/O), así que no bloqueamos el loop
+                request = await asyncio.to_thread(next, requests, _DONE)
+                if request is _DONE:
+                    break
+
+                task = asyncio.create_task(self._fetch_and_put(request, results, window, stop))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # El fetcher se está cerrando con el stream abierto: ya nadie espera su final
+            raise
+        except BaseException:
+            await self._put(results, _DONE, stop, force=True)
+            raise
+        else:
+            await self._put(results, _DONE, stop, force=True)
+
+    async def _fetch_and_put(self, request: FetchRequest, results: queue.Queue, window: asyncio.Semaphore, stop: threading.Event) -> None:
+        try:
+            result = await self._fetch(request)
+            await self._put(results, result, stop)
+        finally:
+            window.release()
+
+    @staticmethod
+    async def _put(results: queue.Queue, item, stop: threading.Event, force: bool = False) -> None:
+        while force or not stop.is_set():
+            try:
+                results.put_nowait(item)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.01)
+
+    async def _fetch(self, request: FetchRequest) -> FetchResult:
+        if self.cache is None:
+            return await self._fetch_from_network(request, request.headers)
+
+        cached = await asyncio.to_thread(self.cache.lookup, request.method, request.url, request.data)
+        if cached is not None and cached.fresh:
+            return FetchResult(request=request, response=cached.to_response())
+
+        headers = request.headers
+        if cached is not None:
+            headers = {**(request.headers or {}), **cached.validators()}
+
+        result = await self._fetch_from_network(request, headers)
+        response = result.response
+
+        if response is not None and response.status_code == 304 and cached is not None:
+            cached = await asyncio.to_thread(self.cache.refresh, cached)
+            return FetchResult(request=request, response=cached.to_response())
+
+        if response is not None and response.status_code == 200:
+            await asyncio.to_thread(self.cache.store, request.method, request.url, request.data, response)
+
+        return result
+
+    async def _fetch_from_network(self, request: FetchRequest, headers: dict | None) -> FetchResult:
+        host = urlsplit(request.url).hostname or ""
+
+        # Primero el límite por host y el ritmo del host, para no ocupar un hueco global mientras se espera
+        async with self._host_slots[host]:
+            attempt = 0
+            while True:
+                await self.rate_limiter.acquire(host)
+                started_at = time.monotonic()
+                # El hueco del host se libera siempre, también si la petición se cancela (cierre del
+                # fetcher o `iter_fetch` abandonado): sin respuesta ni error, no cuenta para el ritmo
+                response = error = None
+                try:
+                    async with self._global_slots:
+                        response = await self._session.request(
+                            request.method,
+                            request.url,
+                            headers=headers,
+                            data=request.data,
+                            timeout=self.timeout,
+                        )
+                except Exception as e:
+                    error = e
+                finally:
+                    if response is not None:
+                        self.rate_limiter.release(
+                            host,
+                            response.status_code,
+                            time.monotonic() - started_at,
+                            response.headers.get("Retry-After"),
+                        )
+                    elif error is not None:
+                        self.rate_limiter.release(host, None, time.monotonic() - started_at)
+                    else:
+                        self.rate_limiter.cancel(host)
+
+                if error is not None:
+                    self.logger.error("Error de red solicitando la URL '%s'. Error: '%s'", request.url, error)
+                    return FetchResult(request=request, response=None, error=error)
+
+                if response.status_code in THROTTLING_STATUS_CODES and attempt < self.max_retries:
+                    attempt += 1
+                    self.logger.warning(
+                        "Respuesta %d para la URL '%s'. Reintento %d de %d",
+                        response.status_code,
+                        request.url,
+                        attempt,
+                        self.max_retries,
+                    )
+                    continue
+
+                return FetchResult(request=request, response=response)
@@ -0,0 +1,116 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator
+
+
+class CrawlCheckpoint:
+    """
+    Diario persistente de las URLs de producto ya extraídas en la ejecución en curso, con su
+    contenido en bruto (comprimido), en un fichero SQLite que se va escribiendo durante la extracción.
+
+    Si la ejecución se interrumpe, al relanzarla con `resume=True` las URLs ya completadas no se
+    vuelven a descargar: su contenido se lee del diario y pasa directamente a transformación y carga.
+    """
+
+    COMMIT_EVERY = 20
+
+    def __init__(self, path: str | Path, resume: bool = False) -> None:
+        self.path = Path(path)
+        self.resume = resume
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending_writes = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoint (
+                store TEXT NOT NULL,
+                url TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                extraction_strategy_used TEXT,
+                payload BLOB NOT NULL,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (store, url)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def start(self, store: str) -> None:
+        "Discards the previous journal of `store`, unless the crawl is being resumed"
+        if self.resume:
+            with self._lock:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM checkpoint WHERE store = ?", (store,)).fetchone()
+            self.logger.info("Reanudando la extracción de '%s' desde el último checkpoint (%d URLs completadas)", store, count)
+        else:
+            self.clear(store)
+
+    def clear(self, store: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoint WHERE store = ?", (store,))
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def split(self, store: str, strategy: str, product_urls: dict[str, str | None]) -> tuple[dict[str, str | None], Iterator[dict]]:
+        """
+        Separa las URLs de producto (URL -> lastmod) en las que faltan por extraer y un iterador con
+        los ítems ya guardados en el diario por la misma estrategia.
+        """
+        with self._lock:
+            completed = {
+                url
+                for (url,) in self._conn.execute(
+                    "SELECT url FROM checkpoint WHERE store = ? AND strategy = ?", (store, strategy)
+                )
+            }
+
+        pending = {url: lastmod for url, lastmod in product_urls.items() if url not in completed}
+        done = [url for url in product_urls if url in completed]
+
+        if done:
+            self.logger.info(
+                "Checkpoint de '%s': %d productos ya extraídos, %d pendientes", store, len(done), len(pending)
+            )
+        return pending, self._iter_completed_items(store, done)
+
+    def _iter_completed_items(self, store: str, urls: list[str]) -> Iterator[dict]:
+        for url in urls:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT extraction_strategy_used, payload FROM checkpoint WHERE store = ? AND url = ?",
+                    (store, url),
+                ).fetchone()
+            if row is None:
+                continue
+
+            extraction_strategy_used, payload = row
+            yield {
+                "url": url,
+                "data": json.loads(zlib.decompress(payload)),
+                "extraction_strategy_used": extraction_strategy_used,
+            }
+
+    def record(self, store: str, strategy: str, item: dict) -> None:
+        payload = zlib.compress(json.dumps(item["data"], default=str).encode())
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoint VALUES (?, ?, ?, ?, ?, ?)",
+                (store, item["url"], strategy, item.get("extraction_strategy_used"), payload, time.time()),
+            )
+            self._pending_writes += 1
+            if self._pending_writes >= self.COMMIT_EVERY:
+                self._conn.commit()
+                self._pending_writes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
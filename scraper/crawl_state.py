@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+
+def parse_lastmod(value: str | None) -> datetime | None:
+    "Parses a sitemap `<lastmod>` (W3C datetime, date-only or full timestamp) as an aware datetime"
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+class CrawlState:
+    """
+    Estado persistente de las extracciones, por tienda y URL de producto, en un fichero SQLite:
+    `lastmod` del sitemap, hash del contenido extraído, fecha de la última descarga y el propio
+    contenido (comprimido).
+
+    En modo incremental, los productos cuyo `lastmod` no ha avanzado desde la última ejecución no se
+    vuelven a descargar: se reutiliza el contenido guardado, de modo que el resultado sigue siendo
+    el catálogo completo.
+    """
+
+    COMMIT_EVERY = 100
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending_writes = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS crawl_state (
+                store TEXT NOT NULL,
+                url TEXT NOT NULL,
+                lastmod TEXT,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                extraction_strategy_used TEXT,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (store, url)
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def content_hash(data) -> str:
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def split(self, store: str, product_urls: dict[str, str | None]) -> tuple[dict[str, str | None], Iterator[dict]]:
+        """
+        Separa las URLs de producto (URL -> lastmod) en las que hay que descargar y un iterador con
+        los ítems guardados de las que no han cambiado.
+        """
+        with self._lock:
+            stored = dict(
+                self._conn.execute("SELECT url, lastmod FROM crawl_state WHERE store = ?", (store,)).fetchall()
+            )
+
+        changed: dict[str, str | None] = {}
+        unchanged: list[str] = []
+
+        for url, lastmod in product_urls.items():
+            current, previous = parse_lastmod(lastmod), parse_lastmod(stored.get(url))
+            if url in stored and current is not None and previous is not None and current <= previous:
+                unchanged.append(url)
+            else:
+                changed[url] = lastmod
+
+        self.logger.info(
+            "Extracción incremental de '%s': %d productos modificados o nuevos, %d sin cambios",
+            store,
+            len(changed),
+            len(unchanged),
+        )
+        return changed, self._iter_stored_items(store, unchanged)
+
+    def _iter_stored_items(self, store: str, urls: list[str]) -> Iterator[dict]:
+        for url in urls:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT extraction_strategy_used, payload FROM crawl_state WHERE store = ? AND url = ?",
+                    (store, url),
+                ).fetchone()
+            if row is None:
+                continue
+
+            extraction_strategy_used, payload = row
+            yield {
+                "url": url,
+                "data": json.loads(zlib.decompress(payload)),
+                "extraction_strategy_used": extraction_strategy_used,
+            }
+
+    def record(self, store: str, item: dict, lastmod: str | None) -> bool:
+        "Saves a freshly extracted item. Returns whether its content changed since the last crawl"
+        content_hash = self.content_hash(item["data"])
+        payload = zlib.compress(json.dumps(item["data"], default=str).encode())
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM crawl_state WHERE store = ? AND url = ?", (store, item["url"])
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crawl_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (store, item["url"], lastmod, content_hash, time.time(), item.get("extraction_strategy_used"), payload),
+            )
+            self._pending_writes += 1
+            if self._pending_writes >= self.COMMIT_EVERY:
+                self._conn.commit()
+                self._pending_writes = 0
+
+        return row is None or row[0] != content_hash
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,304 @@
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from scraper.extraction_handler import ExtractionHandler
+from scraper.logging_config import configure_logging
+from scraper.work_queue import MAX_ATTEMPTS, JobInfo, SQLiteWorkQueue, WorkItem, WorkQueue
+
+# URLs que toma prestadas un worker de una vez, y tiempo que tiene para completarlas (segundos)
+DEFAULT_LEASE_SIZE = 50
+DEFAULT_VISIBILITY_TIMEOUT = 300.0
+
+# Cada cuánto se consulta la cola cuando no hay nada que hacer (segundos)
+POLL_INTERVAL = 0.5
+
+
+class QueueCoordinator:
+    """
+    Extracción distribuida de una tienda: el coordinador lee los sitemaps, publica las URLs de
+    producto en la cola de trabajo y recoge los ítems que van dejando los workers (procesos propios
+    o lanzados con `--worker` en la misma máquina), que se transforman y cargan como en una
+    extracción normal.
+
+    Expone `extract` / `iter_extract` igual que `ExtractionHandler`, de modo que puede usarse en su
+    lugar en cualquier modo de ejecución. El estado de extracción y el checkpoint se actualizan aquí,
+    con los ítems recibidos.
+    """
+
+    RESULTS_PER_POLL = 500
+    PROGRESS_LOG_INTERVAL = 10.0
+
+    def __init__(
+        self,
+        extraction_handler: ExtractionHandler,
+        work_queue: SQLiteWorkQueue,
+        local_workers: int = 0,
+        worker_options: dict | None = None,
+        stall_timeout: float | None = None,
+    ) -> None:
+        self.extraction_handler = extraction_handler
+        self.work_queue = work_queue
+        # Workers que se lanzan en esta misma máquina (0: solo workers externos, con `--worker`)
+        self.local_workers = local_workers
+        # Argumentos de `run_worker` para los workers locales (límites de concurrencia, tamaño de lote...)
+        self.worker_options = worker_options or {}
+        # Segundos sin progreso, una vez terminados los workers locales, tras los que las URLs que
+        # quedan se dan por fallidas (por defecto, el tiempo de visibilidad de los préstamos)
+        self.stall_timeout = (
+            stall_timeout
+            if stall_timeout is not None
+            else self.worker_options.get("visibility_timeout", DEFAULT_VISIBILITY_TIMEOUT)
+        )
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def extract(self, url: str) -> tuple[list, str]:
+        items, used_strategy_name = self.iter_extract(url)
+        return list(items), used_strategy_name
+
+    def iter_extract(self, url: str) -> tuple[Iterator[dict], str]:
+        handler = self.extraction_handler
+        if handler.vendor == "auto":
+            handler.detect_vendor(url)
+        if handler.checkpoint is not None:
+            handler.checkpoint.start(url)
+
+        # Solo las estrategias basadas en URLs de producto se pueden repartir entre workers
+        strategy = next((s for s in handler.strategy_chain if hasattr(s, "iter_extract_products")), None)
+        if strategy is None:
+            raise Exception(f"El vendor '{handler.vendor}' no tiene una estrategia por URLs de producto que se pueda distribuir")
+        used_strategy_name = strategy.__class__.__name__
+
+        product_urls = strategy.find_product_urls(url)
+        if not product_urls:
+            raise Exception(f"No se han encontrado URLs de producto en '{url}'")
+
+        local_items: list[Iterable[dict]] = []
+        if handler.crawl_state is not None:
+            product_urls, unchanged_items = handler.crawl_state.split(url, product_urls)
+            local_items.append(unchanged_items)
+        if handler.checkpoint is not None:
+            product_urls, completed_items = handler.checkpoint.split(url, used_strategy_name, product_urls)
+            local_items.append(completed_items)
+
+        # La cola se publica ya, para que los workers empiecen mientras se prepara la carga
+        self.work_queue.create_job(url, handler.vendor, used_strategy_name, product_urls)
+        self.logger.info("Publicadas %d URLs de producto de '%s' en la cola de trabajo", len(product_urls), url)
+        workers = self._start_local_workers()
+
+        return self._iter_items(url, used_strategy_name, product_urls, local_items, workers), used_strategy_name
+
+    def _start_local_workers(self) -> list[multiprocessing.Process]:
+        # "spawn": el proceso actual ya tiene hilos (el del fetcher), que `fork` no copiaría bien
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(
+                target=run_worker,
+                args=(self.work_queue.path,),
+                kwargs={**self.worker_options, "idle_timeout": 0.0},
+                name=f"queue-worker-{index}",
+                daemon=True,
+            )
+            for index in range(1, self.local_workers + 1)
+        ]
+        for worker in workers:
+            worker.start()
+        return workers
+
+    def _iter_items(
+        self,
+        url: str,
+        used_strategy_name: str,
+        product_urls: dict[str, str | None],
+        local_items: list[Iterable[dict]],
+        workers: list[multiprocessing.Process],
+    ) -> Iterator[dict]:
+        handler = self.extraction_handler
+        last_log = last_change = time.monotonic()
+        last_progress = None
+        # Los workers locales han terminado con URLs pendientes: solo quedan los externos, si los hay
+        orphaned = False
+
+        try:
+            for items in local_items:
+                yield from items
+
+            while True:
+                # Sin esto, las URLs de un worker caído solo caducarían al pedir otro worker un préstamo
+                reaped = self.work_queue.reap(url)
+                if reaped:
+                    self.logger.warning(
+                        "%d URLs de '%s' dadas por fallidas: su préstamo ha caducado %d veces", reaped, url, MAX_ATTEMPTS
+                    )
+
+                # El progreso se lee antes que los resultados: una URL completada ya tiene su ítem en la cola
+                progress = self.work_queue.progress(url)
+                if progress != last_progress:
+                    last_progress, last_change = progress, time.monotonic()
+                finished = progress["pending"] == 0 and progress["leased"] == 0
+
+                items = self.work_queue.pop_results(url, self.RESULTS_PER_POLL)
+                for item in items:
+                    if handler.crawl_state is not None:
+                        handler.crawl_state.record(url, item, product_urls.get(item["url"]))
+                    if handler.checkpoint is not None:
+                        handler.checkpoint.record(url, used_strategy_name, item)
+                    yield item
+
+                if finished and not items:
+                    break
+
+                if time.monotonic() - last_log >= self.PROGRESS_LOG_INTERVAL:
+                    last_log = time.monotonic()
+                    self.logger.info(
+                        "Progreso de '%s': %d pendientes, %d en curso, %d completadas, %d fallidas",
+                        url,
+                        progress["pending"],
+                        progress["leased"],
+                        progress["done"],
+                        progress["failed"],
+                    )
+                if workers and not any(worker.is_alive() for worker in workers) and not finished:
+                    self.logger.warning(
+                        "Los workers locales han terminado con URLs pendientes; se esperan workers externos "
+                        "durante %.0f segundos sin progreso",
+                        self.stall_timeout,
+                    )
+                    workers = []
+                    orphaned = True
+                if orphaned and not finished and time.monotonic() - last_change >= self.stall_timeout:
+                    abandoned = self.work_queue.abandon(url, "Sin workers")
+                    self.logger.error(
+                        "Sin progreso en '%s' durante %.0f segundos y sin workers locales: %d URLs dadas por fallidas",
+                        url,
+                        self.stall_timeout,
+                        abandoned,
+                    )
+                    continue
+
+                if not items:
+                    time.sleep(POLL_INTERVAL)
+
+            self.logger.info(
+                "Extracción distribuida de '%s' completada: %d URLs, %d fallidas",
+                url,
+                progress["done"] + progress["failed"],
+                progress["failed"],
+            )
+        finally:
+            # Los workers sin trabajo terminan al cerrarse el job
+            self.work_queue.close_job(url)
+            for worker in workers:
+                worker.join()
+
+
+class QueueWorker:
+    """
+    Worker de la cola de trabajo: toma prestados lotes de URLs de producto de los jobs abiertos, los
+    descarga y parsea con la estrategia del job, y deja los ítems en la cola para el coordinador.
+    """
+
+    def __init__(
+        self,
+        work_queue: WorkQueue,
+        handler_options: dict | None = None,
+        lease_size: int = DEFAULT_LEASE_SIZE,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+        idle_timeout: float = 60.0,
+    ) -> None:
+        self.work_queue = work_queue
+        # Argumentos de `ExtractionHandler` (sin estado de extracción ni checkpoint, que lleva el coordinador)
+        self.handler_options = handler_options or {}
+        self.lease_size = lease_size
+        self.visibility_timeout = visibility_timeout
+        # Segundos sin jobs abiertos tras los que el worker termina
+        self.idle_timeout = idle_timeout
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._handlers: dict[str, ExtractionHandler] = {}
+
+    def run(self) -> int:
+        "Processes leased URLs until there are no open jobs for `idle_timeout` seconds; returns how many it completed"
+        completed = 0
+        idle_since = time.monotonic()
+        self.logger.info("Worker '%s' esperando trabajo", self.name)
+
+        try:
+            while True:
+                jobs = self.work_queue.open_jobs()
+
+                for job in jobs:
+                    items = self.work_queue.lease(job.job, self.name, self.lease_size, self.visibility_timeout)
+                    if items:
+                        completed += self._process(job, items)
+                        idle_since = time.monotonic()
+                        break
+                else:
+                    if not jobs and time.monotonic() - idle_since >= self.idle_timeout:
+                        break
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            root = next(iter(self._handlers.values()), None)
+            if root is not None:
+                root.close()
+
+        self.logger.info("Worker '%s' terminado: %d URLs completadas", self.name, completed)
+        return completed
+
+    def _handler(self, vendor: str) -> ExtractionHandler:
+        handler = self._handlers.get(vendor)
+        if handler is None:
+            root = next(iter(self._handlers.values()), None)
+            # Todos los vendors comparten el fetcher del primero (solo se cierra ese)
+            handler = root.for_vendor(vendor) if root is not None else ExtractionHandler(vendor, **self.handler_options)
+            self._handlers[vendor] = handler
+        return handler
+
+    def _process(self, job: JobInfo, items: list[WorkItem]) -> int:
+        strategy = next(s for s in self._handler(job.vendor).strategy_chain if s.__class__.__name__ == job.strategy)
+        pending = {item.url: item for item in items}
+        # El préstamo se renueva mientras lleguen resultados, para que un lote lento (p.ej. con el
+        # limitador de ritmo frenando al host) no caduque y pase a otro worker a mitad de descarga
+        extend_every = self.visibility_timeout / 3
+        last_extended = time.monotonic()
+
+        try:
+            for result in strategy.iter_extract_products(job.job, {item.url: item.lastmod for item in items}):
+                item = pending.pop(result["url"], None)
+                if item is not None:
+                    self.work_queue.complete(item, self.name, result)
+
+                if pending and time.monotonic() - last_extended >= extend_every:
+                    self.work_queue.extend(list(pending.values()), self.name, self.visibility_timeout)
+                    last_extended = time.monotonic()
+
+            # URLs sin datos (error HTTP, página sin producto...): se dan por hechas, igual que en local
+            for item in pending.values():
+                self.work_queue.complete(item, self.name, None)
+        except Exception as e:
+            self.logger.error("Error procesando un lote de '%s': '%s'", job.job, e)
+            self.work_queue.release(list(pending.values()), self.name, str(e))
+            return len(items) - len(pending)
+
+        return len(items)
+
+
+def run_worker(
+    queue_path: str | Path,
+    handler_options: dict | None = None,
+    lease_size: int = DEFAULT_LEASE_SIZE,
+    visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+    idle_timeout: float = 60.0,
+    log_level: str = "INFO",
+) -> int:
+    "Entry point of a worker process over an SQLite work queue"
+    configure_logging(log_level)
+    work_queue = SQLiteWorkQueue(queue_path)
+    try:
+        return QueueWorker(work_queue, handler_options, lease_size, visibility_timeout, idle_timeout).run()
+    finally:
+        work_queue.close()
@@ -1,4 +1,14 @@
+import copy
+import itertools
 import logging
+from pathlib import Path
+from scraper.async_fetcher import AsyncFetcher
+from scraper.checkpoint import CrawlCheckpoint
+from scraper.crawl_state import CrawlState
+from scraper.http_cache import ResponseCache
+from scraper.parse_pool import ParsePool
+from scraper.strategy_stats import DEFAULT_REPROBE_INTERVAL, StrategyStats
+from scraper.vendor_detection import DEFAULT_VENDOR_CACHE_TTL, VendorCache, VendorDetector
 from scraper.strategies.shopify.api_strategy import ShopifyAPIBulkStategy
 from scraper.strategies.shopify.sitemap_single_product_strategy import (
     ShopifySitemapSingleProductStrategy,
@@ -7,47 +17,183 @@ from scraper.strategies.shopify.sitemap_single_product_strategy import (
 from scraper.strategies.bigcommerce.sitemap_single_product_strategy import BigCommerceSitemapSingleProductStrategy
 from scraper.strategies.wix.sitemap_single_product_strategy import WixSitemapSingleProductStrategy
 
-from typing import Callable
+from typing import Callable, Iterator
 
 from scraper.strategies.woocommerce.sitemap_single_product_strategy import WooCommerceSitemapSingleProductStrategy
 
 
 
 class ExtractionHandler:
-    def __init__(self, vendor: str) -> None:
+    def __init__(
+        self,
+        vendor: str,
+        max_in_flight: int = 32,
+        per_host_limit: int = 8,
+        http_cache_path: Path | None = None,
+        http_cache_max_bytes: int = 1024**3,
+        crawl_state_path: Path | None = None,
+        parse_workers: int = 0,
+        checkpoint_path: Path | None = None,
+        resume: bool = False,
+        vendor_cache_path: Path | None = None,
+        vendor_cache_ttl: float = DEFAULT_VENDOR_CACHE_TTL,
+        strategy_stats_path: Path | None = None,
+        strategy_reprobe_interval: float = DEFAULT_REPROBE_INTERVAL,
+    ) -> None:
+        # "auto": la plataforma se detecta a partir de la propia tienda (ver `detect_vendor`)
         self.vendor = vendor.lower()
+        # Un único motor de descarga compartido por todas las estrategias de la cadena
+        self.fetcher = AsyncFetcher(
+            max_in_flight=max_in_flight,
+            per_host_limit=per_host_limit,
+            cache=(
+                ResponseCache(http_cache_path, max_bytes=http_cache_max_bytes)
+                if http_cache_path is not None
+                else None
+            ),
+        )
+        # Estado de extracción persistente para el modo incremental (basado en `lastmod` del sitemap)
+        self.crawl_state = CrawlState(crawl_state_path) if crawl_state_path is not None else None
+        # Procesos dedicados al parseo de las páginas (con 0 se parsea en el propio proceso)
+        self.parse_pool = ParsePool(parse_workers) if parse_workers > 0 else None
+        # Diario de URLs completadas durante la ejecución (`resume=True` continúa desde él)
+        self.checkpoint = CrawlCheckpoint(checkpoint_path, resume=resume) if checkpoint_path is not None else None
+        # Detección de plataforma, con el índice dominio -> plataforma persistente si se indica
+        self.vendor_detector = VendorDetector(
+            self.fetcher,
+            VendorCache(vendor_cache_path, ttl=vendor_cache_ttl) if vendor_cache_path is not None else None,
+        )
+        # Aciertos y fallos de cada estrategia por dominio, para adaptar el orden en que se prueban
+        self.strategy_stats = (
+            StrategyStats(strategy_stats_path, reprobe_interval=strategy_reprobe_interval)
+            if strategy_stats_path is not None
+            else None
+        )
         self.strategy_chain = self.get_strategy_chain()
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def get_strategy_chain(self) -> list[Callable]:
-        if self.vendor == "shopify":
-            return [ShopifySitemapSingleProductStrategy(), ShopifyAPIBulkStategy()]
+        if self.vendor == "auto":
+            # Se resuelve al detectar la plataforma de la tienda
+            return []
+        elif self.vendor == "shopify":
+            return [ShopifySitemapSingleProductStrategy(self.fetcher, self.crawl_state, self.parse_pool, self.checkpoint), ShopifyAPIBulkStategy(self.fetcher)]
         # elif self.vendor == "prestashop":
         #     return [PrestashopSingleProductStrategy()]
         elif self.vendor == "bigcommerce":
-            return [BigCommerceSitemapSingleProductStrategy()]
+            return [BigCommerceSitemapSingleProductStrategy(self.fetcher, self.crawl_state, self.parse_pool, self.checkpoint, self.strategy_stats)]
         elif self.vendor == "wix":
-            return [WixSitemapSingleProductStrategy()]
+            return [WixSitemapSingleProductStrategy(self.fetcher, self.crawl_state, self.parse_pool, self.checkpoint)]
         elif self.vendor == "woocommerce":
-            return [WooCommerceSitemapSingleProductStrategy()]
+            return [WooCommerceSitemapSingleProductStrategy(self.fetcher, self.crawl_state, self.parse_pool, self.checkpoint, self.strategy_stats)]
         else:
             raise ValueError(f"Vendor no soportado: {self.vendor}")
 
+    def detect_vendor(self, url: str) -> str:
+        "Detects the platform of `url` and switches the strategy chain to it"
+        self.vendor = self.vendor_detector.detect(url)
+        self.strategy_chain = self.get_strategy_chain()
+        return self.vendor
+
+    def for_vendor(self, vendor: str) -> "ExtractionHandler":
+        """
+        Handler for another store that shares this one's fetcher, HTTP cache, crawl state, parse pool,
+        checkpoint and strategy stats (with its own strategy instances). Only the original handler must be closed.
+        """
+        handler = copy.copy(self)
+        handler.vendor = vendor.lower()
+        handler.strategy_chain = handler.get_strategy_chain()
+        return handler
+
+    def close(self) -> None:
+        "Releases the shared fetcher and parse pool and persists the crawl state, checkpoint and strategy stats"
+        self.fetcher.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        if self.crawl_state is not None:
+            self.crawl_state.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        if self.vendor_detector.cache is not None:
+            self.vendor_detector.cache.close()
+        if self.strategy_stats is not None:
+            self.strategy_stats.close()
+
+    def ordered_strategy_chain(self, url: str) -> list[Callable]:
+        "Strategy chain in the order to try it for `url`, learned from previous runs if there are strategy stats"
+        if self.strategy_stats is None:
+            return self.strategy_chain
+        by_name = {strategy.__class__.__name__: strategy for strategy in self.strategy_chain}
+        order = self.strategy_stats.order(url, "strategy_chain", list(by_name))
+        # Las estrategias descartadas quedan como último recurso: si fallan todas se pierde la tienda entera
+        return [by_name[name] for name in order] + [s for name, s in by_name.items() if name not in order]
+
+    def _record_chain_outcome(self, url: str, attempted: list[Callable], used_strategy_name: str | None) -> None:
+        if self.strategy_stats is not None:
+            self.strategy_stats.record(
+                url, "strategy_chain", [strategy.__class__.__name__ for strategy in attempted], used_strategy_name
+            )
+
+    def complete(self, url: str) -> None:
+        "Discards the checkpoint of `url` once its data has been loaded"
+        if self.checkpoint is not None:
+            self.checkpoint.clear(url)
+
 
     def extract(self, url: str) -> tuple[list, str]:
+        if self.vendor == "auto":
+            self.detect_vendor(url)
+        if self.checkpoint is not None:
+            self.checkpoint.start(url)
+
         last_exception = None
-        for strategy in self.strategy_chain:
+        strategy_chain = self.ordered_strategy_chain(url)
+        for strategy in strategy_chain:
             try:
                 used_strategy_name = strategy.__class__.__name__
                 self.logger.info("Seleccionada estrategia `%s`", strategy.__class__.__name__)
                 data = strategy.extract(url)
                 if data:
                     self.logger.info("Estrategia exitosa: '%s'", used_strategy_name)
+                    self._record_chain_outcome(url, strategy_chain, used_strategy_name)
                     return data, used_strategy_name
             except Exception as e:
                 self.logger.error("¡La estrategia '%s' falló!", used_strategy_name)
                 last_exception = e
 
+        self._record_chain_outcome(url, strategy_chain, None)
+        raise Exception(
+            "Todas las estrategias de extracción fallaron"
+        ) from last_exception
+
+
+    def iter_extract(self, url: str) -> tuple[Iterator[dict], str]:
+        """
+        Versión en streaming de `extract`. Una estrategia se da por buena en cuanto produce su primer
+        producto; a partir de ese momento el resto se consume de forma perezosa por el llamante.
+        """
+        if self.vendor == "auto":
+            self.detect_vendor(url)
+        if self.checkpoint is not None:
+            self.checkpoint.start(url)
+
+        last_exception = None
+        strategy_chain = self.ordered_strategy_chain(url)
+        for strategy in strategy_chain:
+            try:
+                used_strategy_name = strategy.__class__.__name__
+                self.logger.info("Seleccionada estrategia `%s`", strategy.__class__.__name__)
+                items = iter(strategy.iter_extract(url))
+                first_item = next(items, None)
+                if first_item is not None:
+                    self.logger.info("Estrategia exitosa: '%s'", used_strategy_name)
+                    self._record_chain_outcome(url, strategy_chain, used_strategy_name)
+                    return itertools.chain([first_item], items), used_strategy_name
+            except Exception as e:
+                self.logger.error("¡La estrategia '%s' falló!", used_strategy_name)
+                last_exception = e
+
+        self._record_chain_outcome(url, strategy_chain, None)
         raise Exception(
             "Todas las estrategias de extracción fallaron"
         ) from last_exception
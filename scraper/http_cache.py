@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import curl_cffi.requests
+from curl_cffi.requests import Headers
+
+# TTL (en segundos) por clase de URL. Se aplica la primera expresión regular que encaje
+DEFAULT_TTLS: list[tuple[str, float]] = [
+    (r"sitemap|\.xml(\.gz)?$", 6 * 3600),
+    (r"/products\.json", 6 * 3600),
+    (r"/remote/v1/product-attributes/", 12 * 3600),
+    (r".*", 24 * 3600),
+]
+
+# Cabeceras que dejan de ser válidas porque el cuerpo se almacena ya descomprimido
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    key: str
+    url: str
+    status_code: int
+    headers: dict
+    content: bytes
+    stored_at: float
+    fresh: bool
+
+    def validators(self) -> dict:
+        "Headers for a conditional request revalidating this entry"
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def to_response(self) -> curl_cffi.requests.Response:
+        response = curl_cffi.requests.Response()
+        response.url = self.url
+        response.status_code = self.status_code
+        response.headers = Headers(self.headers)
+        response.content = self.content
+        return response
+
+
+class ResponseCache:
+    """
+    Caché HTTP persistente (fichero SQLite) que usa `AsyncFetcher` por debajo de todas las estrategias.
+
+    Las entradas se identifican por método + URL + cuerpo, de forma que las peticiones POST
+    (p.ej. la API de atributos de BigCommerce) también se cachean. Mientras una entrada esté dentro
+    de su TTL se sirve localmente; después se revalida con `If-None-Match`/`If-Modified-Since`.
+    Cuando el tamaño total supera `max_bytes` se descartan las entradas usadas hace más tiempo (LRU).
+    """
+
+    def __init__(
+        self,
+        path: str | Path = "cache/http_cache.db",
+        max_bytes: int = 1024**3,
+        ttls: list[tuple[str, float]] | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or DEFAULT_TTLS)]
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(method: str, url: str, data: str | bytes | None = None) -> str:
+        digest = hashlib.sha256(f"{method.upper()}\n{url}\n".encode())
+        if data:
+            digest.update(data.encode() if isinstance(data, str) else data)
+        return digest.hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return 0.0
+
+    def lookup(self, method: str, url: str, data: str | bytes | None = None) -> CachedResponse | None:
+        key = self.make_key(method, url, data)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status_code, headers, content, stored_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+        url, status_code, headers, content, stored_at = row
+        return CachedResponse(
+            key=key,
+            url=url,
+            status_code=status_code,
+            headers=json.loads(headers),
+            content=content,
+            stored_at=stored_at,
+            fresh=time.time() - stored_at < self.ttl_for(url),
+        )
+
+    def refresh(self, entry: CachedResponse) -> CachedResponse:
+        "Marks an entry as fresh again after a `304 Not Modified`"
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, entry.key))
+            self._conn.commit()
+        return replace(entry, stored_at=now, fresh=True)
+
+    def store(self, method: str, url: str, data: str | bytes | None, response: curl_cffi.requests.Response) -> None:
+        key = self.make_key(method, url, data)
+        headers = {k.lower(): v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        content = response.content
+        now = time.time()
+
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, response.status_code, json.dumps(headers), content, len(content), now, now),
+            )
+            self._total_bytes += len(content) - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+            evicted += 1
+
+        self.logger.info("Caché HTTP llena: se han descartado %d respuestas (LRU)", evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
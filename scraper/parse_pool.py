@@ -0,0 +1,97 @@
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Iterable, Iterator
+
+from scraper.logging_config import configure_logging
+
+# Una instancia de cada estrategia por proceso de trabajo (se crea en la primera tarea)
+_worker_strategies: dict[type, Any] = {}
+
+
+def _init_worker(log_level: int) -> None:
+    configure_logging(logging.getLevelName(log_level))
+
+
+def _parse_in_worker(strategy_cls: type, method_name: str, args: tuple) -> Any:
+    strategy = _worker_strategies.get(strategy_cls)
+    if strategy is None:
+        strategy = _worker_strategies[strategy_cls] = strategy_cls()
+    return getattr(strategy, method_name)(*args)
+
+
+class ParsePool:
+    """
+    Etapa de parseo en procesos separados (`ProcessPoolExecutor`), desacoplada de la descarga.
+
+    Las estrategias envían los cuerpos de las respuestas (bytes, no objetos `Response`) junto con
+    el método de parseo del vendor (`_extract_product_info`, `_get_product_id`...), que se ejecuta
+    en una instancia de la estrategia propia de cada proceso. Los resultados se devuelven a medida
+    que terminan, de modo que la transformación los sigue recibiendo en streaming.
+    """
+
+    def __init__(self, workers: int | None = None, max_pending: int | None = None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        # Tareas enviadas y aún no recogidas; limita la memoria ocupada por cuerpos pendientes
+        self.max_pending = max_pending or 4 * self.workers
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self.logger.info("Iniciando %d procesos de parseo", self.workers)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(logging.getLogger().getEffectiveLevel(),),
+            )
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def iter_parse(self, strategy: Any, method_name: str, jobs: Iterable[tuple[Any, tuple]]) -> Iterator[tuple[Any, Any]]:
+        """
+        Ejecuta `strategy.<method_name>(*args)` para cada `(context, args)` de `jobs` en los procesos
+        de trabajo, y devuelve `(context, resultado)` en el orden en que se completan.
+        """
+        executor = self._start()
+        pending: dict[Future, Any] = {}
+
+        def collect(timeout: float | None) -> Iterator[tuple[Any, Any]]:
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+        try:
+            for context, args in jobs:
+                pending[executor.submit(_parse_in_worker, type(strategy), method_name, args)] = context
+                # Se recoge lo que ya haya terminado sin bloquear, salvo que se haya llegado al límite
+                yield from collect(None if len(pending) >= self.max_pending else 0)
+
+            while pending:
+                yield from collect(None)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_parse(
+    parse_pool: ParsePool | None, strategy: Any, method_name: str, jobs: Iterable[tuple[Any, tuple]]
+) -> Iterator[tuple[Any, Any]]:
+    "Runs the parse jobs in `parse_pool`, or inline in this process when there is no pool"
+    if parse_pool is not None:
+        yield from parse_pool.iter_parse(strategy, method_name, jobs)
+        return
+
+    method = getattr(strategy, method_name)
+    for context, args in jobs:
+        yield context, method(*args)
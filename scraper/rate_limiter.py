@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Respuestas con las que el servidor indica que vamos demasiado rápido
+THROTTLING_STATUS_CODES = {429, 503}
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    "Parses a `Retry-After` header (delta-seconds or HTTP-date) into seconds to wait"
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class _HostState:
+    rate: float
+    concurrency: float
+    tokens: float
+    updated_at: float = field(default_factory=time.monotonic)
+    in_flight: int = 0
+    blocked_until: float = 0.0
+    last_increase: float = 0.0
+    last_decrease: float = 0.0
+    # Arranque rápido (como el "slow start" de TCP): el ritmo se duplica hasta la primera reducción
+    slow_start: bool = True
+    latency: float | None = None
+    min_latency: float | None = None
+
+
+class HostRateLimiter:
+    """
+    Limitador adaptativo por host: token bucket para el ritmo de peticiones y una ventana de
+    concurrencia, ambos controlados con AIMD (aumento aditivo por cada ida y vuelta mientras las
+    respuestas son rápidas y correctas, reducción multiplicativa ante 429/503, errores o `Retry-After`).
+
+    El bucket admite ráfagas de hasta `burst` peticiones, y la concurrencia empieza en el máximo
+    (`per_host_limit` del fetcher): un host sano se recorre a su ritmo desde el principio, y el que
+    no lo tolera lo indica con sus respuestas.
+
+    Todas las llamadas se hacen desde el event loop de `AsyncFetcher`, por lo que no necesita locks.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float = 5.0,
+        min_rate: float = 0.2,
+        max_rate: float = 100.0,
+        initial_concurrency: float | None = None,
+        max_concurrency: float = 8.0,
+        burst: float = 8.0,
+        rate_increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        # Sin valor inicial, se empieza con toda la concurrencia permitida
+        self.initial_concurrency = max_concurrency if initial_concurrency is None else min(initial_concurrency, max_concurrency)
+        self.max_concurrency = max_concurrency
+        # Capacidad del token bucket: peticiones que se pueden lanzar seguidas tras un periodo inactivo
+        self.burst = max(1.0, burst)
+        # Peticiones/segundo (y huecos de concurrencia) que se añaden por cada ida y vuelta correcta
+        self.rate_increase = rate_increase
+        self.decrease_factor = decrease_factor
+        # Solo se acelera mientras la latencia no supere `latency_tolerance` veces la mínima observada
+        self.latency_tolerance = latency_tolerance
+
+        self.hosts: dict[str, _HostState] = {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _state(self, host: str) -> _HostState:
+        if host not in self.hosts:
+            self.hosts[host] = _HostState(rate=self.initial_rate, concurrency=self.initial_concurrency, tokens=self.burst)
+        return self.hosts[host]
+
+    async def acquire(self, host: str) -> None:
+        while True:
+            delay = self._try_acquire(host)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def _try_acquire(self, host: str) -> float:
+        "Takes a token and a concurrency slot, or returns how long to wait before trying again"
+        state = self._state(host)
+        now = time.monotonic()
+
+        if now < state.blocked_until:
+            return state.blocked_until - now
+
+        if state.in_flight >= int(state.concurrency):
+            return 0.05
+
+        state.tokens = min(self.burst, state.tokens + (now - state.updated_at) * state.rate)
+        state.updated_at = now
+        if state.tokens < 1.0:
+            return (1.0 - state.tokens) / state.rate
+
+        state.tokens -= 1.0
+        state.in_flight += 1
+        return 0.0
+
+    def release(self, host: str, status_code: int | None, latency: float, retry_after: str | None = None) -> None:
+        """
+        Registra el resultado de una petición. `status_code=None` indica un error de red.
+        """
+        state = self._state(host)
+        state.in_flight = max(0, state.in_flight - 1)
+
+        state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+        state.min_latency = latency if state.min_latency is None else min(state.min_latency, latency)
+
+        retry_after_seconds = parse_retry_after(retry_after)
+        if retry_after_seconds is not None and status_code in THROTTLING_STATUS_CODES:
+            state.blocked_until = max(state.blocked_until, time.monotonic() + retry_after_seconds)
+
+        if status_code is None or status_code in THROTTLING_STATUS_CODES or status_code >= 500:
+            self._decrease(host, state)
+        elif state.latency <= self.latency_tolerance * state.min_latency:
+            self._increase(state)
+
+    def cancel(self, host: str) -> None:
+        "Frees the slot of a request that was abandoned (cancelled) before it got a result"
+        state = self._state(host)
+        state.in_flight = max(0, state.in_flight - 1)
+
+    def _increase(self, state: _HostState) -> None:
+        now = time.monotonic()
+        # Un aumento por ida y vuelta (como TCP), no por respuesta: con latencias bajas se acelera
+        # deprisa, y el ritmo no depende del número de peticiones en vuelo
+        if now - state.last_increase < (state.latency or 0.0):
+            return
+
+        state.last_increase = now
+        if state.slow_start:
+            state.rate = min(self.max_rate, state.rate * 2)
+        else:
+            state.rate = min(self.max_rate, state.rate + self.rate_increase)
+        state.concurrency = min(self.max_concurrency, state.concurrency + self.rate_increase)
+
+    def _decrease(self, host: str, state: _HostState) -> None:
+        now = time.monotonic()
+        # Como mucho una reducción por "ida y vuelta", para no colapsar con una ráfaga de errores
+        if now - state.last_decrease < max(state.latency or 0.0, 1.0):
+            return
+
+        state.last_decrease = now
+        state.slow_start = False
+        state.rate = max(self.min_rate, state.rate * self.decrease_factor)
+        state.concurrency = max(1.0, state.concurrency * self.decrease_factor)
+        self.logger.warning(
+            "Reduciendo el ritmo contra el host '%s': %.2f peticiones/s, concurrencia %d",
+            host,
+            state.rate,
+            int(state.concurrency),
+        )
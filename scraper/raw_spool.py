@@ -0,0 +1,74 @@
+import io
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pyarrow as pa
+
+SPOOL_FORMAT_VERSION = 1
+
+
+class RawSpool:
+    """
+    Volcado en disco de los ítems en bruto de la extracción (`{url, data, extraction_strategy_used}`),
+    en JSONL comprimido con zstd: una primera línea de cabecera (vendor, tienda, estrategia) y un
+    ítem por línea.
+
+    Permite repetir la transformación y la carga (por ejemplo, tras corregir un mapper) leyendo el
+    fichero a velocidad de disco, sin volver a descargar la tienda.
+    """
+
+    COMPRESSION = "zstd"
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def record(self, items: Iterable[dict], vendor: str, store: str, strategy: str) -> Iterator[dict]:
+        """
+        Devuelve los mismos ítems según se consumen, escribiéndolos a la vez en el spool. El fichero
+        se escribe en `<ruta>.part` y solo ocupa su ruta definitiva si la extracción se completa.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = self.path.with_name(self.path.name + ".part")
+        header = {
+            "version": SPOOL_FORMAT_VERSION,
+            "vendor": vendor,
+            "store": store,
+            "extraction_strategy": strategy,
+            "created_at": time.time(),
+        }
+        count = 0
+
+        with io.BufferedWriter(pa.output_stream(str(part_path), compression=self.COMPRESSION)) as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            for item in items:
+                f.write(json.dumps(item, default=str, ensure_ascii=False).encode() + b"\n")
+                count += 1
+                yield item
+
+        os.replace(part_path, self.path)
+        self.logger.info("Guardados %d ítems en bruto de '%s' en el spool '%s'", count, store, self.path)
+
+    def read_header(self) -> dict:
+        with self._open() as f:
+            header = json.loads(f.readline())
+
+        if header.get("version") != SPOOL_FORMAT_VERSION:
+            raise Exception(f"Versión de spool no soportada en '{self.path}': {header.get('version')}")
+        return header
+
+    def replay(self) -> Iterator[dict]:
+        "Raw items of the spool, in extraction order"
+        with self._open() as f:
+            f.readline()
+            for line in f:
+                yield json.loads(line)
+
+    def _open(self) -> io.BufferedReader:
+        if not self.path.exists():
+            raise Exception(f"No existe el spool '{self.path}'")
+        return io.BufferedReader(pa.input_stream(str(self.path), compression=self.COMPRESSION))
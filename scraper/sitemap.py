@@ -0,0 +1,95 @@
+import gzip
+import io
+import logging
+import xml.etree.ElementTree as ET
+from typing import Callable, Iterator
+
+from scraper.async_fetcher import AsyncFetcher
+
+logger = logging.getLogger("Sitemap")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Profundidad máxima de sitemaps índice anidados que se siguen
+MAX_DEPTH = 5
+
+
+def _local_name(tag: str) -> str:
+    "Tag name without its XML namespace (some stores serve sitemaps with no or a legacy namespace)"
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(elem: ET.Element, name: str) -> str | None:
+    for child in elem:
+        if _local_name(child.tag) == name:
+            return child.text.strip() if child.text else None
+    return None
+
+
+def iter_sitemap_entries(content: bytes) -> Iterator[tuple[str, str, str | None]]:
+    """
+    Parsea un sitemap (urlset o sitemapindex, comprimido con gzip o no) de forma incremental.
+
+    Devuelve tuplas `(tipo, loc, lastmod)`, donde `tipo` es "url" o "sitemap". Los elementos ya
+    procesados se liberan sobre la marcha, así que no se construye nunca el árbol completo.
+    """
+    stream = io.BytesIO(content)
+    if content[:2] == GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=stream)
+
+    context = ET.iterparse(stream, events=("start", "end"))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != "end":
+            continue
+
+        kind = _local_name(elem.tag)
+        if kind not in ("url", "sitemap"):
+            continue
+
+        loc = _child_text(elem, "loc")
+        if loc:
+            yield kind, loc, _child_text(elem, "lastmod")
+        root.clear()
+
+
+def iter_sitemap_urls(
+    fetcher: AsyncFetcher,
+    sitemap_url: str,
+    sitemap_filter: Callable[[str], bool] | None = None,
+    url_filter: Callable[[str], bool] | None = None,
+    depth: int = 0,
+) -> Iterator[tuple[str, str | None]]:
+    """
+    Recorre un sitemap y, recursivamente, los sitemaps índice anidados, devolviendo `(loc, lastmod)`
+    de cada URL de página. `sitemap_filter` decide qué sitemaps anidados se siguen y `url_filter`
+    qué URLs se devuelven.
+
+    Los errores en el sitemap raíz abortan la extracción; los de sitemaps anidados solo se registran.
+    """
+    response = fetcher.get(sitemap_url)
+
+    if response.status_code != 200:
+        logger.error("Error HTTP %s navegando por el sitemap '%s'", response.status_code, sitemap_url)
+        if depth == 0:
+            raise Exception(
+                f"Error al obtener información sobre el sitemap: {sitemap_url} (Error {response.status_code}). Abortando extracción"
+            )
+        return
+
+    try:
+        for kind, loc, lastmod in iter_sitemap_entries(response.content):
+            if kind == "sitemap":
+                if depth >= MAX_DEPTH:
+                    logger.error("Se ha alcanzado la profundidad máxima de sitemaps anidados en '%s'", loc)
+                elif sitemap_filter is None or sitemap_filter(loc):
+                    yield from iter_sitemap_urls(fetcher, loc, sitemap_filter, url_filter, depth + 1)
+
+            elif url_filter is None or url_filter(loc):
+                yield loc, lastmod
+
+    except (ET.ParseError, OSError, EOFError) as e:
+        logger.error("Error parseando XML de %s. (Error: %s)", sitemap_url, e)
+        if depth == 0:
+            raise Exception(f"Error parseando XML de {sitemap_url}. (Error: {e}) Abortando extracción")
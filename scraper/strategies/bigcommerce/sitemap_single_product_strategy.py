@@ -1,14 +1,16 @@
-import curl_cffi.requests
-import xml.etree.ElementTree as ET
 import re
-from bs4 import BeautifulSoup
 import demjson3
 import json
 import itertools
 import logging
-import os
 
-proxy_host = os.getenv("PROXY_HOST", "localhost")
+from scraper.async_fetcher import AsyncFetcher, FetchRequest
+from scraper.checkpoint import CrawlCheckpoint
+from scraper.crawl_state import CrawlState
+from scraper.parse_pool import ParsePool, iter_parse
+from scraper.sitemap import iter_sitemap_urls
+from scraper.strategy_stats import StrategyStats, ordered
+from scraper.structured_data import extract_structured_data
 
 
 class BigCommerceSitemapSingleProductStrategy:
@@ -22,8 +24,6 @@ class BigCommerceSitemapSingleProductStrategy:
     5. Given the IDs of the product variation, target the API endpoint to get the details of each product variation.
     """
 
-    NAMESPACES = {"ns": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-
     # GET REQUEST
     # API_ENDPOINT_GET_PRODUCT_OPTIONS: str = (
     #     "https://{bearpaw}.projectahost.com/api/productoptions/{}"
@@ -34,110 +34,160 @@ class BigCommerceSitemapSingleProductStrategy:
         "https://{}/remote/v1/product-attributes/{}"
     )
 
-    def __init__(self):
-        self.session = curl_cffi.requests.Session(
-            impersonate="chrome", 
-            proxies={
-                "http":  f"http://{proxy_host}:8888",
-                "https": f"http://{proxy_host}:8888",
-            }
-        )
+    # Sub-estrategias de `_get_product_id`, en su orden por defecto
+    PRODUCT_ID_STRATEGIES = ("from_var_item", "from_data_product_id_attr")
+
+    def __init__(
+        self,
+        fetcher: AsyncFetcher | None = None,
+        crawl_state: CrawlState | None = None,
+        parse_pool: ParsePool | None = None,
+        checkpoint: CrawlCheckpoint | None = None,
+        strategy_stats: StrategyStats | None = None,
+    ):
+        self.fetcher = fetcher or AsyncFetcher()
+        # Si se indica, solo se descargan los productos cuyo `lastmod` ha avanzado
+        self.crawl_state = crawl_state
+        # Si se indica, el parseo de las respuestas se hace en procesos separados
+        self.parse_pool = parse_pool
+        # Diario de URLs completadas, para poder reanudar una extracción interrumpida
+        self.checkpoint = checkpoint
+        # Si se indica, el orden de las sub-estrategias de parseo se adapta a lo que funciona en cada tienda
+        self.strategy_stats = strategy_stats
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def extract(self, url):
-        base_sitemap_url = f"https://{url}/xmlsitemap.php"
-        self.logger.info("BigCommerceSitemap: Obteniendo sitemap principal: '%s'", base_sitemap_url)
+        return list(self.iter_extract(url))
 
-        response = self.session.get(base_sitemap_url)
 
-        if response.status_code != 200:
-            self.logger.error(
-                "Error al obtener información sobre el sitemap: '%s' (Error %d). Abortando extracción",
-                base_sitemap_url,
-                response.status_code
-            )
-            raise Exception(
-                f"Error al obtener información sobre el sitemap: {base_sitemap_url} (Error {response.status_code}). Abortando extracción"
-            )
+    def iter_extract(self, url):
+        "Versión en streaming de `extract`: devuelve cada producto en cuanto se ha extraído"
+        product_urls = self.find_product_urls(url)
+
+        if self.crawl_state is not None:
+            # Los productos sin cambios se reutilizan desde el estado guardado, sin volver a descargarlos
+            product_urls, unchanged_items = self.crawl_state.split(url, product_urls)
+            yield from unchanged_items
 
-        try:
-            root = ET.fromstring(response.text)
-        except ET.ParseError as e:
-            self.logger.error("Error parseando XML de %s. (Error: %s). Abortando extracción", base_sitemap_url, e)
-            raise Exception(f"Error parseando XML de {base_sitemap_url}. (Error: {e}) Abortando extracción")
+        if self.checkpoint is not None:
+            # Los productos ya extraídos antes de una interrupción se leen del diario
+            product_urls, completed_items = self.checkpoint.split(url, self.__class__.__name__, product_urls)
+            yield from completed_items
 
+        yield from self.iter_extract_products(url, product_urls)
 
-        sitemap_urls = set()
+    def find_product_urls(self, url) -> dict[str, str | None]:
+        "Product URLs of the store (URL -> lastmod), from its product sitemaps"
+        base_sitemap_url = f"https://{url}/xmlsitemap.php"
+        self.logger.info("BigCommerceSitemap: Obteniendo sitemap principal: '%s'", base_sitemap_url)
 
         # Patrón para MATCH de URL
         pattern = re.compile(
             rf"^https://(www\.)?{re.escape(url)}/xmlsitemap\.php\?type=products"
         )
 
-        for sitemap in root.findall(".//ns:sitemap", namespaces=self.NAMESPACES):
-            loc = sitemap.find("ns:loc", namespaces=self.NAMESPACES)
-            if loc is not None and loc.text and pattern.match(loc.text):
-                sitemap_urls.add(loc.text)
-
-
-
-        self.logger.info("WixSitemap: Encontradas %d posibles URLs de Sitemap de Producto", len(sitemap_urls))
-
-        product_urls = self._get_product_urls(sitemap_urls)
+        # URLs de producto (URL -> lastmod), leídas de forma incremental de los sitemaps de productos
+        product_urls = dict(
+            iter_sitemap_urls(
+                self.fetcher,
+                base_sitemap_url,
+                sitemap_filter=pattern.match,
+            )
+        )
         self.logger.info("Se han obtenido %d URLs de producto", len(product_urls))
 
         # Para hacer pruebas, nos quedamos solamente con las primeras 10 URLs
-        product_urls = list(itertools.islice(product_urls, 10))
+        product_urls = dict(itertools.islice(product_urls.items(), 10))
 
-        # product_ids: set = {self._get_product_id(product) for product in product_urls}
-        product_url_id_dict: dict[str, int] = {
-            product_url: self._get_product_id(product_url)
-            for product_url in product_urls
-        }
+        return product_urls
 
+    def iter_extract_products(self, url, product_urls: dict[str, str | None]):
+        "Fetches and parses the given product URLs, yielding one item per product"
         # We exclude the records where no response was found
-        product_json_contents: list[dict] = []
+        extracted_count = 0
 
-        for product_url, id in product_url_id_dict.items():
-            self.logger.info("Solicitando JSON para URL de producto: '%s'", product_url)
-            response = self.session.post(
-                self.API_ENDPOINT_GET_PRODUCT_ATTRIBUTES.format(url, id),
-                headers={"Content-Type": "application/json"},
-                data=json.dumps({"product_id": id}),
-            )
+        # Las peticiones POST a la API se van generando a medida que llegan las páginas de producto
+        attribute_requests = self._iter_product_attribute_requests(url, product_urls)
 
-            if response.status_code != 200:
-                self.logger.error(
-                    "Código de Error (%d). La petición a la URL '%s' fallo. Error: '%s'",
-                    response.status_code,
-                    self.API_ENDPOINT_GET_PRODUCT_ATTRIBUTES.format(url, id),
-                    response.text,
-                )
-                continue
+        def iter_parse_jobs():
+            for result in self.fetcher.iter_fetch(attribute_requests):
+                product_url, response = result.request.context, result.response
+
+                if response is None:
+                    continue
+
+                if response.status_code != 200:
+                    self.logger.error(
+                        "Código de Error (%d). La petición a la URL '%s' fallo. Error: '%s'",
+                        response.status_code,
+                        result.request.url,
+                        response.text,
+                    )
+                    continue
 
-            # data = response.json()
-            data, extraction_strategy_used = self._extract_product_info(response=response)
+                yield product_url, (response.content,)
 
+        # data = response.json()
+        for product_url, (data, extraction_strategy_used) in iter_parse(
+            self.parse_pool, self, "_extract_product_info", iter_parse_jobs()
+        ):
             if data:
-                product_json_contents.append({
+                extracted_count += 1
+                item = {
                     "url": product_url, 
                     "data": data, 
                     "extraction_strategy_used": extraction_strategy_used
-                })
+                }
+                if self.crawl_state is not None:
+                    self.crawl_state.record(url, item, product_urls.get(item["url"]))
+                if self.checkpoint is not None:
+                    self.checkpoint.record(url, self.__class__.__name__, item)
+                yield item
 
         self.logger.info(
             "Se han obtenido datos de un total de %d productos",
-            len(product_json_contents),
+            extracted_count,
         )
 
-        return product_json_contents
 
+    def _iter_product_attribute_requests(self, url: str, product_urls: dict[str, str | None]):
+        product_page_requests = (FetchRequest(url=product_url) for product_url in product_urls)
+
+        # La búsqueda del ProductID en el HTML se hace en la etapa de parseo
+        def iter_parse_jobs():
+            for result in self.fetcher.iter_fetch(product_page_requests):
+                if result.response is None:
+                    continue
+                order = (
+                    self.strategy_stats.order(url, "_get_product_id", self.PRODUCT_ID_STRATEGIES)
+                    if self.strategy_stats is not None
+                    else None
+                )
+                yield (result.request.url, order), (result.response.content, result.response.encoding, order)
+
+        for (product_url, order), (id, id_strategy_used) in iter_parse(self.parse_pool, self, "_get_product_id", iter_parse_jobs()):
+            if order is not None:
+                self.strategy_stats.record(url, "_get_product_id", order, id_strategy_used or None)
+
+            if id is None:
+                self.logger.error("No se pudo obtener el ProductID de la URL de producto: '%s'", product_url)
+                continue
 
-    def _extract_product_info(self, response: curl_cffi.requests.Response | None = None):
+            self.logger.info("Solicitando JSON para URL de producto: '%s'", product_url)
+            yield FetchRequest(
+                url=self.API_ENDPOINT_GET_PRODUCT_ATTRIBUTES.format(url, id),
+                method="POST",
+                headers={"Content-Type": "application/json"},
+                data=json.dumps({"product_id": id}),
+                context=product_url,
+            )
+
+
+    def _extract_product_info(self, content: bytes | None = None):
         
         def from_hidden_api_post_request():
-            if isinstance(response, curl_cffi.requests.Response):
-                json_response = [response.json()]
+            if content is not None:
+                json_response = [json.loads(content)]
 
                 products = []
                 
@@ -174,33 +224,23 @@ class BigCommerceSitemapSingleProductStrategy:
 
 
 
-    def _get_product_id(self, url: str) -> str | None:
-        html = self.session.get(url).text
-        soup = BeautifulSoup(html, "html.parser")
+    def _get_product_id(self, html: bytes | str, encoding: str = "utf-8", order: list[str] | None = None) -> tuple[str | None, str]:
+        "Product ID of a product page and the name of the sub-strategy that found it (None and '' if none did)"
+        # Escaneo rápido de los bloques de datos estructurados (BeautifulSoup solo como último recurso)
+        structured_data = extract_structured_data(html, encoding)
 
         def from_var_item() -> str | None:
-            # Find script tags
-            script_tags = soup.find_all("script")
-            # Look for variable "var item" using RegEx
-            pattern = re.compile(r"var item\s*=\s*(\{.*?\})\s*;", re.DOTALL)
-
-            for script in script_tags:
-                if script.string:  # skip if the script tag is empty or external
-                    match = pattern.search(script.string)
-                    if match:
-                        item_data = match.group(1)
-                        js_var_content = demjson3.decode(item_data)
-                        return js_var_content.get("ProductID")
-            return None
+            # Literal of the variable "var item", if any script defines it
+            if structured_data.var_item is None:
+                return None
+            js_var_content = demjson3.decode(structured_data.var_item)
+            return js_var_content.get("ProductID")
 
         def from_data_product_id_attr() -> str | None:
-            container = soup.find("div", class_="product-page-container")
-            if container and container.has_attr("data-product-id"):
-                return container["data-product-id"]
-            return None
+            return structured_data.product_page_product_id
 
         # List of strategies to get the id
-        strategies = [from_var_item, from_data_product_id_attr]
+        strategies = ordered([from_var_item, from_data_product_id_attr], order)
 
         for strategy in strategies:
             self.logger.info(
@@ -215,7 +255,7 @@ class BigCommerceSitemapSingleProductStrategy:
                         "Se ha podido extraer el ProductID con la estrategia '%s'",
                         strategy.__name__,
                     )
-                    return str(product_id)
+                    return str(product_id), strategy.__name__
             except Exception as e:
                 self.logger.error(
                     "Error en la extracció de ID de producto para llamada a API Interna. Error: %s",
@@ -223,25 +263,4 @@ class BigCommerceSitemapSingleProductStrategy:
                 )
                 continue
         # In any other case, return None
-        return None
-
-    def _get_product_urls(self, sitemap_urls: set[str]) -> set[str]:
-        product_urls = set()
-
-        # There may be more than 1 page of product URLs (if there are a lot of products)
-        for sitemap_url in sitemap_urls:
-            response = self.session.get(sitemap_url)
-            if response.status_code != 200:
-                print(f"Failed to fetch sitemap: {sitemap_url}")
-                continue
-
-            sitemap_root = ET.fromstring(response.text)
-            urls_in_sitemap = {
-                loc.text
-                for loc in sitemap_root.findall(".//ns:loc", namespaces=self.NAMESPACES)
-                if loc.text
-            }
-
-            product_urls.update(urls_in_sitemap)
-
-        return product_urls
+        return None, ""
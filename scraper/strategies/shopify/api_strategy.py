@@ -1,41 +1,149 @@
-import requests
-import time
+import logging
+from typing import Iterator
+
+from scraper.async_fetcher import AsyncFetcher, FetchRequest
 
 
 class ShopifyAPIBulkStategy:
+    """
+    Extracción a través del endpoint oculto `/products.json` (hasta 250 productos por petición).
+
+    Primero se sondea el número de páginas (búsqueda exponencial + binaria sobre `page`) y después
+    se descargan las páginas restantes de forma concurrente, dentro del ritmo que permita el host.
+    Si la paginación por `page` está limitada en la tienda, se recorre con el cursor `since_id`.
+    Cada página se devuelve como un ítem, listo para `ShopifyProduct.from_json_bulk_api`.
+    """
+
+    PAGE_SIZE = 250
+    # Página máxima que se pide con `page`; por encima se pagina con `since_id`
+    MAX_PAGE = 100
+
+    def __init__(self, fetcher: AsyncFetcher | None = None):
+        # El ritmo entre páginas lo marca el limitador por host del fetcher
+        self.fetcher = fetcher or AsyncFetcher()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
     def extract(self, base_url: str) -> list[dict]:
         "Extracts information from Shopify via a hidden /products.json endpoint"
+        return list(self.iter_extract(base_url))
 
-        page = 1
-        all_products = []
+    def iter_extract(self, base_url: str) -> Iterator[dict]:
+        "Streaming version of `extract`: yields each page of products as soon as it is fetched"
 
-        while True:
-            url = f"https://{base_url}/products.json?limit=250&page={page}"
-            response = requests.get(url)
+        # Páginas ya descargadas durante el sondeo (número de página -> productos)
+        probed_pages: dict[int, list[dict] | None] = {}
+        last_page = self._find_last_page(base_url, probed_pages)
 
+        if last_page is None:
+            self.logger.warning("La paginación por página de '%s' está limitada. Se usa el cursor `since_id`", base_url)
+            yield from self._iter_cursor_pages(base_url)
+            return
+
+        self.logger.info("El endpoint /products.json de '%s' tiene %d páginas", base_url, last_page)
+
+        for page in range(1, last_page + 1):
+            if probed_pages.get(page):
+                yield self._page_item(self._page_url(base_url, page=page), probed_pages[page])
+
+        page_requests = (
+            FetchRequest(url=self._page_url(base_url, page=page))
+            for page in range(1, last_page + 1)
+            if page not in probed_pages
+        )
+
+        for result in self.fetcher.iter_fetch(page_requests):
+            response = result.response
+            if response is None:
+                raise Exception(f"Error al obtener datos desde endpoint /products.json: {result.error}")
             if response.status_code != 200:
-                raise Exception(
-                    f"Error {response.status_code} al obtener datos desde endpoint /products.json"
-                )
+                raise Exception(f"Error {response.status_code} al obtener datos desde endpoint /products.json")
+
+            products = response.json().get("products", [])
+            if products:
+                yield self._page_item(result.request.url, products)
+
+    def _page_url(self, base_url: str, page: int | None = None, since_id: int | None = None) -> str:
+        url = f"https://{base_url}/products.json?limit={self.PAGE_SIZE}"
+        if page is not None:
+            url += f"&page={page}"
+        if since_id is not None:
+            url += f"&since_id={since_id}"
+        return url
 
-            data = response.json()
-            products = data.get("products", [])
+    def _fetch_page(self, url: str) -> list[dict] | None:
+        "Products of one page, or None if the store rejects the request"
+        response = self.fetcher.get(url)
+        if response.status_code != 200:
+            self.logger.warning("Error %d al obtener la página '%s'", response.status_code, url)
+            return None
+        return response.json().get("products", [])
 
+    def _find_last_page(self, base_url: str, probed_pages: dict[int, list[dict] | None]) -> int | None:
+        """
+        Última página no vacía, buscada con pasos exponenciales y después por bisección. Devuelve None
+        si la tienda rechaza páginas altas o la última página que se puede pedir sigue llena.
+        """
+
+        def probe(page: int) -> list[dict] | None:
+            if page not in probed_pages:
+                probed_pages[page] = self._fetch_page(self._page_url(base_url, page=page))
+            return probed_pages[page]
+
+        first_page = probe(1)
+        if first_page is None:
+            raise Exception("Error al obtener datos desde endpoint /products.json")
+        if len(first_page) < self.PAGE_SIZE:
+            return 1 if first_page else 0
+
+        # `low` es siempre una página llena y `high` una incompleta (o vacía)
+        low, high = 1, None
+        while high is None:
+            page = min(2 * low, self.MAX_PAGE)
+            products = probe(page)
+            if products is None:
+                return None
+            if len(products) < self.PAGE_SIZE:
+                high = page
+            elif page == self.MAX_PAGE:
+                return None
+            else:
+                low = page
+
+        while high - low > 1:
+            middle = (low + high) // 2
+            products = probe(middle)
+            if products is None:
+                return None
+            if len(products) == self.PAGE_SIZE:
+                low = middle
+            else:
+                high = middle
+
+        return high if probed_pages[high] else low
+
+    def _iter_cursor_pages(self, base_url: str) -> Iterator[dict]:
+        "Walks /products.json with the `since_id` cursor (products in ascending id order)"
+        since_id = 0
+
+        while True:
+            url = self._page_url(base_url, since_id=since_id)
+            products = self._fetch_page(url)
+
+            if products is None:
+                raise Exception("Error al obtener datos desde endpoint /products.json con `since_id`")
             if not products:
                 break
 
-            for product in products:
-                prod_url = f"https://{base_url}/products/{product.get('handle', 'unknown-handle')}"
-                all_products.append(
-                    {
-                        "url": prod_url,
-                        "data": product,
-                    }
-                )
+            yield self._page_item(url, products)
 
-            print(f"Se han obtenido {len(products)} de la página {page}")
-            page += 1
-
-            time.sleep(1)
+            if len(products) < self.PAGE_SIZE:
+                break
+            since_id = max(product["id"] for product in products)
 
-        return all_products
+    def _page_item(self, url: str, products: list[dict]) -> dict:
+        self.logger.info("Se han obtenido %d productos de '%s'", len(products), url)
+        return {
+            "url": url,
+            "data": {"products": products},
+            "extraction_strategy_used": "from_products_json",
+        }
@@ -1,92 +1,112 @@
-import curl_cffi.requests
-import xml.etree.ElementTree as ET
+import json
 import re
 import logging
-import os
 
-proxy_host = os.getenv("PROXY_HOST", "localhost")
+from scraper.async_fetcher import AsyncFetcher, FetchRequest
+from scraper.checkpoint import CrawlCheckpoint
+from scraper.crawl_state import CrawlState
+from scraper.parse_pool import ParsePool, iter_parse
+from scraper.sitemap import iter_sitemap_urls
 
 
 class ShopifySitemapSingleProductStrategy:
 
-    NAMESPACES = {"ns": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-   
-
-    def __init__(self):
-        self.session = curl_cffi.requests.Session(
-            impersonate="chrome", 
-            proxies={
-                "http":  f"http://{proxy_host}:8888",
-                "https": f"http://{proxy_host}:8888",
-            }
-        )
+    def __init__(
+        self,
+        fetcher: AsyncFetcher | None = None,
+        crawl_state: CrawlState | None = None,
+        parse_pool: ParsePool | None = None,
+        checkpoint: CrawlCheckpoint | None = None,
+    ):
+        self.fetcher = fetcher or AsyncFetcher()
+        # Si se indica, solo se descargan los productos cuyo `lastmod` ha avanzado
+        self.crawl_state = crawl_state
+        # Si se indica, el parseo de las respuestas se hace en procesos separados
+        self.parse_pool = parse_pool
+        # Diario de URLs completadas, para poder reanudar una extracción interrumpida
+        self.checkpoint = checkpoint
         self.logger = logging.getLogger(self.__class__.__name__)
 
 
     def extract(self, url):
+        return list(self.iter_extract(url))
 
-        base_sitemap_url = f"https://{url}/sitemap.xml"
 
-        response = self.session.get(base_sitemap_url)
-
-        if response.status_code != 200:
-            self.logger.error(
-                "Error al obtener información sobre el sitemap: '%s' (Error %d). Abortando extracción",
-                base_sitemap_url,
-                response.status_code
-            )
-            raise Exception(
-                f"Error al obtener información sobre el sitemap: {base_sitemap_url} (Error {response.status_code}). Abortando extracción"
-            )
-        
-        
-        try:
-            root = ET.fromstring(response.text)
-        except ET.ParseError as e:
-            self.logger.error("Error parseando XML de %s. (Error: %s). Abortando extracción", base_sitemap_url, e)
-            raise Exception(f"Error parseando XML de {base_sitemap_url}. (Error: {e}) Abortando extracción")
+    def iter_extract(self, url):
+        "Versión en streaming de `extract`: devuelve cada producto en cuanto se ha extraído"
+        product_urls = self.find_product_urls(url)
 
+        if self.crawl_state is not None:
+            # Los productos sin cambios se reutilizan desde el estado guardado, sin volver a descargarlos
+            product_urls, unchanged_items = self.crawl_state.split(url, product_urls)
+            yield from unchanged_items
 
-        sitemap_urls = []
+        if self.checkpoint is not None:
+            # Los productos ya extraídos antes de una interrupción se leen del diario
+            product_urls, completed_items = self.checkpoint.split(url, self.__class__.__name__, product_urls)
+            yield from completed_items
 
-        for sitemap in root.findall("ns:sitemap", self.NAMESPACES):
-            loc_element = sitemap.find("ns:loc", self.NAMESPACES)
-            if loc_element is not None:
-                loc_text = loc_element.text
-                if re.match(rf"^https://{re.escape(url)}/sitemap_products.*\.xml.*", loc_text):
-                    sitemap_urls.append(loc_element)
+        yield from self.iter_extract_products(url, product_urls)
 
+    def find_product_urls(self, url) -> dict[str, str | None]:
+        "Product URLs of the store (URL -> lastmod), from its product sitemaps"
+        base_sitemap_url = f"https://{url}/sitemap.xml"
 
-        product_urls = self._get_product_urls(url, sitemap_urls)
+        # Product URLs mapped to their `<lastmod>`, read incrementally from the sitemap and its nested indexes
+        product_urls = dict(
+            iter_sitemap_urls(
+                self.fetcher,
+                base_sitemap_url,
+                sitemap_filter=lambda loc: re.match(rf"^https://{re.escape(url)}/sitemap_products.*\.xml.*", loc),
+                url_filter=lambda loc: re.match(rf"^https://{re.escape(url)}/products/.+", loc),
+            )
+        )
         self.logger.info("Se han obtenido %d URLs de producto", len(product_urls))
-        product_json_urls = [f"{prod_url}.json" for prod_url in product_urls]
 
-        product_json_contents: list[dict] = []
+        return product_urls
 
-        for product_url in product_json_urls:
-            data, extraction_strategy_used = self._extract_product_info(product_url)
+    def iter_extract_products(self, url, product_urls: dict[str, str | None]):
+        "Fetches and parses the given product URLs, yielding one item per product"
+        product_json_requests = (
+            FetchRequest(url=f"{prod_url}.json", context=prod_url) for prod_url in product_urls
+        )
+
+        extracted_count = 0
+
+        # El parseo de cada JSON se envía a la etapa de parseo a medida que llegan las respuestas
+        parse_jobs = (
+            (result.request.context, (result.request.url, result.response.status_code, result.response.content))
+            for result in self.fetcher.iter_fetch(product_json_requests)
+            if result.response is not None
+        )
 
+        for product_url, (data, extraction_strategy_used) in iter_parse(
+            self.parse_pool, self, "_extract_product_info", parse_jobs
+        ):
             if data:
-                product_json_contents.append({
-                    "url": product_url[:-5], 
+                extracted_count += 1
+                item = {
+                    "url": product_url, 
                     "data": data, 
                     "extraction_strategy_used": extraction_strategy_used
-                })
-
-        self.logger.info("Se han obtenido datos de un total de %d productos", len(product_json_contents))
-        return product_json_contents
+                }
+                if self.crawl_state is not None:
+                    self.crawl_state.record(url, item, product_urls.get(item["url"]))
+                if self.checkpoint is not None:
+                    self.checkpoint.record(url, self.__class__.__name__, item)
+                yield item
+
+        self.logger.info("Se han obtenido datos de un total de %d productos", extracted_count)
     
 
-    def _extract_product_info(self, url):
+    def _extract_product_info(self, url: str, status_code: int, content: bytes):
 
         def from_json_product_endpoint():
-            response = self.session.get(url)
-
-            if response.status_code != 200:
-                self.logger.error("No se han podido obtener datos JSON de la URL '%s'. (Error: %d)", url, response.status_code)
+            if status_code != 200:
+                self.logger.error("No se han podido obtener datos JSON de la URL '%s'. (Error: %d)", url, status_code)
                 return None, "from_json_product_endpoint"
             
-            json_response = [response.json().get("product")]
+            json_response = [json.loads(content).get("product")]
 
             products = []
 
@@ -118,30 +138,8 @@ class ShopifySitemapSingleProductStrategy:
         return None, ""
 
 
-    def _get_product_urls(self, base_url, sitemap_urls):
-        product_urls = []
-        pattern = rf"^https://{re.escape(base_url)}/products/.+"
-
-        for sitemap_url in sitemap_urls:
-            response = self.session.get(sitemap_url.text)
-            if response.status_code != 200:
-                print(f"Failed to fetch sitemap: {sitemap_url}")
-                continue
-
-            sitemap_root = ET.fromstring(response.text)
-            urls_in_sitemap = [
-                url_tag.find('ns:loc', self.NAMESPACES).text
-                for url_tag in sitemap_root.findall('ns:url', self.NAMESPACES)
-                if re.match(pattern, url_tag.find('ns:loc', self.NAMESPACES).text)
-            ]
-
-            product_urls.extend(urls_in_sitemap)
-
-        return product_urls
-    
-
     def _fetch_json_content(self, json_url):
-        response = self.session.get(json_url)
+        response = self.fetcher.get(json_url)
         if response.status_code != 200:
             print(f"Error fetching JSON data: {json_url}")
             return None
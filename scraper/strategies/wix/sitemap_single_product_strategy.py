@@ -1,13 +1,14 @@
 import html
 import itertools
 import logging
-import curl_cffi.requests
-import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
 import json
-import os
 
-proxy_host = os.getenv("PROXY_HOST", "localhost")
+from scraper.async_fetcher import AsyncFetcher, FetchRequest
+from scraper.checkpoint import CrawlCheckpoint
+from scraper.crawl_state import CrawlState
+from scraper.parse_pool import ParsePool, iter_parse
+from scraper.sitemap import iter_sitemap_urls
+from scraper.structured_data import extract_structured_data
 
 
 
@@ -27,21 +28,30 @@ class WixSitemapSingleProductStrategy:
     que incluya un objeto de producto "Pydantic Model", como "BigCommerceProductVariant".
     """
 
-    NAMESPACES = {"ns": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-
-    def __init__(self):
-        self.session = curl_cffi.requests.Session(
-            impersonate="chrome", 
-            proxies={
-                "http":  f"http://{proxy_host}:8888",
-                "https": f"http://{proxy_host}:8888",
-            }
-        )
+    def __init__(
+        self,
+        fetcher: AsyncFetcher | None = None,
+        crawl_state: CrawlState | None = None,
+        parse_pool: ParsePool | None = None,
+        checkpoint: CrawlCheckpoint | None = None,
+    ):
+        self.fetcher = fetcher or AsyncFetcher()
+        # Si se indica, solo se descargan los productos cuyo `lastmod` ha avanzado
+        self.crawl_state = crawl_state
+        # Si se indica, el parseo de las respuestas se hace en procesos separados
+        self.parse_pool = parse_pool
+        # Diario de URLs completadas, para poder reanudar una extracción interrumpida
+        self.checkpoint = checkpoint
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def extract(self, url):
-        
+        return list(self.iter_extract(url))
+
+
+    def iter_extract(self, url):
         """
+        Versión en streaming de `extract`: devuelve cada producto en cuanto se ha extraído.
+
         NOTA IMPORTANTE: Para los Sitemap, parece ser que incluso el mismo "vendor" puede
         tener diferentes patrones de SiteMaps y SubSitemaps (nos centramos en este caso
         en los productos).
@@ -55,88 +65,97 @@ class WixSitemapSingleProductStrategy:
         Una forma de empezar el hacer parsing al fichero "robots.txt", y a partir de los diferentes "slug" y
         modelos de SiteMap y SubSitemap generar funciones auxiliares para sacar los enlaces de producto.
         """
+        product_urls = self.find_product_urls(url)
+
+        if self.crawl_state is not None:
+            # Los productos sin cambios se reutilizan desde el estado guardado, sin volver a descargarlos
+            product_urls, unchanged_items = self.crawl_state.split(url, product_urls)
+            yield from unchanged_items
+
+        if self.checkpoint is not None:
+            # Los productos ya extraídos antes de una interrupción se leen del diario
+            product_urls, completed_items = self.checkpoint.split(url, self.__class__.__name__, product_urls)
+            yield from completed_items
 
+        yield from self.iter_extract_products(url, product_urls)
+
+    def find_product_urls(self, url) -> dict[str, str | None]:
+        "Product URLs of the store (URL -> lastmod), from its product sitemaps"
         # base_sitemap_url = f"https://{url}/sitemap-index.xml"
         base_sitemap_url = f"https://{url}/sitemap.xml"
         self.logger.info("WixSitemap: Obteniendo sitemap principal: '%s'", base_sitemap_url)
 
-        response = self.session.get(base_sitemap_url)
-
-        if response.status_code != 200:
-            self.logger.error(
-                "Error al obtener información sobre el sitemap: '%s' (Error %d). Abortando extracción",
+        # URLs de producto (URL -> lastmod), leídas de forma incremental de los sitemaps de productos
+        product_urls = dict(
+            iter_sitemap_urls(
+                self.fetcher,
                 base_sitemap_url,
-                response.status_code
+                sitemap_filter=lambda loc: "products" in loc,
             )
-            raise Exception(
-                f"Error al obtener información sobre el sitemap: {base_sitemap_url} (Error {response.status_code}). Abortando extracción"
-            )
-
-        try:
-            root = ET.fromstring(response.text)
-        except ET.ParseError as e:
-            self.logger.error("Error parseando XML de %s. (Error: %s). Abortando extracción", base_sitemap_url, e)
-            raise Exception(f"Error parseando XML de {base_sitemap_url}. (Error: {e}) Abortando extracción")
-
-        sitemap_urls: set[str] = {
-            loc.text
-            for loc in root.findall('.//ns:loc', self.NAMESPACES)
-            if "products" in loc.text
-            # if not "Image" in loc.text
-        }
-
-        self.logger.info("WixSitemap: Encontradas %d posibles URLs de Sitemap de Producto", len(sitemap_urls))
-
-        product_urls = self._get_product_urls(sitemap_urls)
+        )
         self.logger.info("Número total de URLs de producto encontradas: %s", len(product_urls))
 
 
         # Para hacer pruebas, tomamos un slice de 40 enlaces
-        product_urls = list(itertools.islice(product_urls, 40))
+        product_urls = dict(itertools.islice(product_urls.items(), 40))
+
+        return product_urls
 
+    def iter_extract_products(self, url, product_urls: dict[str, str | None]):
+        "Fetches and parses the given product URLs, yielding one item per product"
         # We exclude the records where no response was found
-        product_json_contents: list[dict] = []
+        extracted_count = 0
 
-        for product_url in product_urls:
-            self.logger.info("Solicitando JSON para URL de producto: '%s'", product_url)
-            response = self.session.get(product_url)
+        def iter_parse_jobs():
+            for result in self.fetcher.iter_fetch(FetchRequest(url=product_url) for product_url in product_urls):
+                product_url, response = result.request.url, result.response
+                self.logger.info("Recibida respuesta para URL de producto: '%s'", product_url)
 
-            if response.status_code != 200:
-                self.logger.error("No se pudieron extraer los datos de la URL (%s). Error %d", product_url, response.status_code)
-                continue
-            
-            # Cada producto puede tener más de un Variant, y este se debe almacenar
-            # data: list[dict] | dict = self._extract_products_from_source_code(response.text, product_url)
-            data, extraction_strategy_used = self._extract_product_info(response.text, product_url)
+                if response is None:
+                    continue
 
+                if response.status_code != 200:
+                    self.logger.error("No se pudieron extraer los datos de la URL (%s). Error %d", product_url, response.status_code)
+                    continue
+
+                yield product_url, (response.content, product_url, response.encoding)
+
+        # Cada producto puede tener más de un Variant, y este se debe almacenar
+        # data: list[dict] | dict = self._extract_products_from_source_code(response.text, product_url)
+        for product_url, (data, extraction_strategy_used) in iter_parse(
+            self.parse_pool, self, "_extract_product_info", iter_parse_jobs()
+        ):
             # If there is a non-empty response, url and JSON object to dictionary
             if data:
-                product_json_contents.append({
+                extracted_count += 1
+                item = {
                     "url": product_url, 
                     "data": data, 
                     "extraction_strategy_used": extraction_strategy_used
-                })
-
+                }
+                if self.crawl_state is not None:
+                    self.crawl_state.record(url, item, product_urls.get(item["url"]))
+                if self.checkpoint is not None:
+                    self.checkpoint.record(url, self.__class__.__name__, item)
+                yield item
 
-        self.logger.info("Número total de ítems de producto recuperados: %d", len(product_json_contents))
 
-        return product_json_contents
+        self.logger.info("Número total de ítems de producto recuperados: %d", extracted_count)
         
     
 
-    def _extract_product_info(self, html_source_string: str, product_url: str):
-        html_doc = BeautifulSoup(html_source_string, "html.parser")
+    def _extract_product_info(self, html_source: bytes | str, product_url: str, encoding: str = "utf-8"):
+        # Escaneo rápido de los bloques de datos estructurados (BeautifulSoup solo como último recurso)
+        structured_data = extract_structured_data(html_source, encoding)
 
     
         def from_jsonld():
 
-            ld_json_script = html_doc.find("script", type="application/ld+json")
-
-            if not ld_json_script:
+            if not structured_data.ld_json:
                 self.logger.error("No existe un objeto <script type=application/ld+json> en la URL '%s'", product_url)
                 return None
             
-            unescaped_content = html.unescape(ld_json_script.text)
+            unescaped_content = html.unescape(structured_data.ld_json[0].text)
 
             try:
                 ld_json_list = [json.loads(unescaped_content)]
@@ -171,40 +190,3 @@ class WixSitemapSingleProductStrategy:
         
         # Si falla, no devolver datos
         return None, ""
-
-
-
-
-    def _get_product_urls(self, sitemap_urls: set[str]) -> set[str]:
-        product_urls = set()
-
-        # There may be more than 1 page of product URLs (if there are a lot of products)
-        for sitemap_url in sitemap_urls:
-            response = self.session.get(sitemap_url)
-
-            if response.status_code != 200:
-                self.logger.error("Error HTTP %s navegado por el sitemap '%s'", response.status_code, sitemap_url)
-                continue
-
-            try:
-                root = ET.fromstring(response.text)
-            except ET.ParseError as e:
-                self.logger.error("Error parseando XML de %s: %s", sitemap_url, e)
-                raise Exception(f"Error parseando XML de {sitemap_url}: {e}")
-
-            # urls_in_sitemap = {
-            #     loc.text
-            #     for loc in root.findall(".//ns:loc", namespaces=self.NAMESPACES)
-            #     if '/en/' in loc.text
-            # }
-
-            urls_in_sitemap = {
-                loc.text
-                for loc in root.findall(".//ns:loc", namespaces=self.NAMESPACES)
-                if loc.text
-            }
-
-            product_urls.update(urls_in_sitemap)
-
-        return product_urls
-
@@ -1,99 +1,138 @@
-import curl_cffi.requests
-import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
 import json
 import logging
 import html
-import os
 
-proxy_host = os.getenv("PROXY_HOST", "localhost")
+from scraper.async_fetcher import AsyncFetcher, FetchRequest
+from scraper.checkpoint import CrawlCheckpoint
+from scraper.crawl_state import CrawlState
+from scraper.parse_pool import ParsePool, iter_parse
+from scraper.sitemap import iter_sitemap_urls
+from scraper.strategy_stats import StrategyStats, ordered
+from scraper.structured_data import extract_structured_data
 
 
 class WooCommerceSitemapSingleProductStrategy:
 
-    NAMESPACES = {"ns": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-
-    def __init__(self):
-        self.session = curl_cffi.requests.Session(
-            impersonate="chrome", 
-            proxies={
-                "http":  f"http://{proxy_host}:8888",
-                "https": f"http://{proxy_host}:8888",
-            }
-        )
+    # Sub-estrategias de `_extract_product_info`, en su orden por defecto
+    PRODUCT_INFO_STRATEGIES = ("from_ld_json", "from_pysoptions_var")
+
+    def __init__(
+        self,
+        fetcher: AsyncFetcher | None = None,
+        crawl_state: CrawlState | None = None,
+        parse_pool: ParsePool | None = None,
+        checkpoint: CrawlCheckpoint | None = None,
+        strategy_stats: StrategyStats | None = None,
+    ):
+        self.fetcher = fetcher or AsyncFetcher()
+        # Si se indica, solo se descargan los productos cuyo `lastmod` ha avanzado
+        self.crawl_state = crawl_state
+        # Si se indica, el parseo de las respuestas se hace en procesos separados
+        self.parse_pool = parse_pool
+        # Diario de URLs completadas, para poder reanudar una extracción interrumpida
+        self.checkpoint = checkpoint
+        # Si se indica, el orden de las sub-estrategias de parseo se adapta a lo que funciona en cada tienda
+        self.strategy_stats = strategy_stats
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def extract(self, url):
-        base_sitemap_url = f"https://{url}/sitemap.xml"
+        return list(self.iter_extract(url))
 
-        response = self.session.get(base_sitemap_url)
 
-        if response.status_code != 200:
-            self.logger.error("Error al obtener sitemap: %s (status '%s')", base_sitemap_url, response.status_code)
-            raise Exception(f"Error al obtener sitemap: {base_sitemap_url} (status {response.status_code})")
+    def iter_extract(self, url):
+        "Versión en streaming de `extract`: devuelve cada producto en cuanto se ha extraído"
+        product_urls = self.find_product_urls(url)
 
-        try:
-            root = ET.fromstring(response.text)
-        except ET.ParseError as e:
-            self.logger.error("Error parseando XML de %s: %s", base_sitemap_url, e)
-            raise Exception(f"Error parseando XML de {base_sitemap_url}: {e}")
+        if self.crawl_state is not None:
+            # Los productos sin cambios se reutilizan desde el estado guardado, sin volver a descargarlos
+            product_urls, unchanged_items = self.crawl_state.split(url, product_urls)
+            yield from unchanged_items
 
+        if self.checkpoint is not None:
+            # Los productos ya extraídos antes de una interrupción se leen del diario
+            product_urls, completed_items = self.checkpoint.split(url, self.__class__.__name__, product_urls)
+            yield from completed_items
 
-        sitemap_urls: set[str] = {
-            loc.text
-            for loc in root.findall('.//ns:loc', self.NAMESPACES)
-            if "product" in loc.text 
-        }
+        yield from self.iter_extract_products(url, product_urls)
 
-        self.logger.info("WooCommerceSitemap: Encontradas %d posibles URLs de Sitemap de Producto", len(sitemap_urls))
-        
-        product_urls = self._get_product_urls(sitemap_urls)
+    def find_product_urls(self, url) -> dict[str, str | None]:
+        "Product URLs of the store (URL -> lastmod), from its product sitemaps"
+        base_sitemap_url = f"https://{url}/sitemap.xml"
+
+        # URLs de producto (URL -> lastmod), leídas de forma incremental de los sitemaps de productos
+        product_urls = dict(
+            iter_sitemap_urls(
+                self.fetcher,
+                base_sitemap_url,
+                sitemap_filter=lambda loc: "product" in loc,
+            )
+        )
         self.logger.info("Número total de URLs de producto encontradas: %s", len(product_urls))
 
+        return product_urls
 
+    def iter_extract_products(self, url, product_urls: dict[str, str | None]):
+        "Fetches and parses the given product URLs, yielding one item per product"
         # We exclude the records where no response was found
-        product_json_contents: list[dict] = []
+        extracted_count = 0
 
-        for index, product_url in enumerate(product_urls, start=1):
-            self.logger.info("Solicitando JSON para URL de producto: '%s' (%d de %d)", product_url, index, len(product_urls))
-            response = self.session.get(product_url)
+        product_requests = (FetchRequest(url=product_url) for product_url in product_urls)
 
-            if response.status_code != 200:
-                self.logger.error("No se pudo recuperar el código fuente para extraer los datos de la URL (%s)", product_url)
-                continue
+        def iter_parse_jobs():
+            for index, result in enumerate(self.fetcher.iter_fetch(product_requests), start=1):
+                product_url, response = result.request.url, result.response
+                self.logger.info("Recibida respuesta para URL de producto: '%s' (%d de %d)", product_url, index, len(product_urls))
+
+                if response is None or response.status_code != 200:
+                    self.logger.error("No se pudo recuperar el código fuente para extraer los datos de la URL (%s)", product_url)
+                    continue
+
+                order = (
+                    self.strategy_stats.order(url, "_extract_product_info", self.PRODUCT_INFO_STRATEGIES)
+                    if self.strategy_stats is not None
+                    else None
+                )
+                yield (product_url, order), (response.content, response.encoding, order)
 
-            # Cada producto puede tener más de un Variant, y este se debe almacenar
-            data, extraction_strategy_used = self._extract_product_info(response.text)
+        # Cada producto puede tener más de un Variant, y este se debe almacenar
+        for (product_url, order), (data, extraction_strategy_used) in iter_parse(
+            self.parse_pool, self, "_extract_product_info", iter_parse_jobs()
+        ):
+            if order is not None:
+                self.strategy_stats.record(url, "_extract_product_info", order, extraction_strategy_used or None)
 
             # If there is a non-empty response, url and JSON object to dictionary
             if data:
-                product_json_contents.append({
+                extracted_count += 1
+                item = {
                     "url": product_url, 
                     "data": data, 
                     "extraction_strategy_used": extraction_strategy_used
-                })
+                }
+                if self.crawl_state is not None:
+                    self.crawl_state.record(url, item, product_urls.get(item["url"]))
+                if self.checkpoint is not None:
+                    self.checkpoint.record(url, self.__class__.__name__, item)
+                yield item
 
             
-        self.logger.info("Número total de ítems de producto recuperados: %d", len(product_json_contents))
+        self.logger.info("Número total de ítems de producto recuperados: %d", extracted_count)
 
-        return product_json_contents
 
 
 
+    def _extract_product_info(self, html_source: bytes | str, encoding: str = "utf-8", order: list[str] | None = None):
 
-    def _extract_product_info(self, html_source: str):
-
-        soup = BeautifulSoup(html_source, "html.parser")
+        # Escaneo rápido de los bloques de datos estructurados (BeautifulSoup solo como último recurso)
+        structured_data = extract_structured_data(html_source, encoding)
 
         # Estrategia 1
         def from_pysoptions_var():
 
-            script = soup.find("script", {"id": "pys-js-extra"})
+            script_content = structured_data.pys_js_extra
 
-            if not script:
+            if script_content is None:
                 raise Exception("No se encontró un script con id='pys-js-extra'")
-            
-            script_content = script.text
 
             unescaped_content = html.unescape(script_content)
 
@@ -116,7 +155,10 @@ class WooCommerceSitemapSingleProductStrategy:
         # Estrategia 2
         def from_ld_json():
 
-            script = soup.find("script", {"type": "application/ld+json", "class": "y-rich-snippet-script"})
+            script = next(
+                (script for script in structured_data.ld_json if "y-rich-snippet-script" in script.classes),
+                None,
+            )
 
             if not script:
                 raise Exception("No se encontró un script con id=application/ld+json y class=y-rich-snippet-script")
@@ -130,7 +172,7 @@ class WooCommerceSitemapSingleProductStrategy:
 
 
         # List of strategies
-        strategies = [from_ld_json, from_pysoptions_var]
+        strategies = ordered([from_ld_json, from_pysoptions_var], order)
 
         for strategy in strategies:
             self.logger.info(
@@ -149,33 +191,3 @@ class WooCommerceSitemapSingleProductStrategy:
         
         # Si falla, no devolver datos
         return None, ""
-
-
-
-
-    def _get_product_urls(self, sitemap_urls: set[str]) -> set[str]:
-        product_urls = set()
-
-        # There may be more than 1 page of product URLs (if there are a lot of products)
-        for sitemap_url in sitemap_urls:
-            response = self.session.get(sitemap_url)
-
-            if response.status_code != 200:
-                self.logger.error("Error HTTP %s navegado por el sitemap '%s'", response.status_code, sitemap_url)
-                continue
-
-            try:
-                root = ET.fromstring(response.text)
-            except ET.ParseError as e:
-                self.logger.error("Error parseando XML de %s: %s", sitemap_url, e)
-                raise Exception(f"Error parseando XML de {sitemap_url}: {e}")
-
-            urls_in_sitemap = {
-                loc.text
-                for loc in root.findall(".//ns:loc", namespaces=self.NAMESPACES)
-                if loc.text
-            }
-
-            product_urls.update(urls_in_sitemap)
-
-        return product_urls
\ No newline at end of file
@@ -0,0 +1,186 @@
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Sequence
+
+# Número de intentos recientes de cada estrategia que se tienen en cuenta para ordenarlas
+RECENT_WINDOW = 20
+# Fallos seguidos (sin ningún acierto en la ventana reciente) a partir de los que se deja de probar
+MIN_FAILURES_TO_SKIP = 5
+# Tiempo (en segundos) tras el que se vuelve a probar una estrategia descartada
+DEFAULT_REPROBE_INTERVAL = 24 * 3600
+
+
+@dataclass
+class StrategyRecord:
+    successes: int = 0
+    failures: int = 0
+    # Resultado de los últimos intentos, del más antiguo al más reciente ("1": acierto, "0": fallo)
+    recent: str = ""
+    last_attempt_at: float = 0.0
+
+    @property
+    def recent_hit_rate(self) -> float | None:
+        return self.recent.count("1") / len(self.recent) if self.recent else None
+
+    @property
+    def exhausted(self) -> bool:
+        "No success in the last `MIN_FAILURES_TO_SKIP` (or more) attempts"
+        return len(self.recent) >= MIN_FAILURES_TO_SKIP and "1" not in self.recent
+
+
+def ordered(strategies: list[Callable], order: Sequence[str] | None) -> list[Callable]:
+    "The sub-strategy functions named in `order`, in that order (all of them as declared if there is no order)"
+    if order is None:
+        return strategies
+    by_name = {strategy.__name__: strategy for strategy in strategies}
+    return [by_name[name] for name in order if name in by_name]
+
+
+class StrategyStats:
+    """
+    Estadísticas persistentes (fichero SQLite) de aciertos y fallos de cada estrategia de extracción,
+    por dominio y por ámbito: la cadena de estrategias del vendor o las sub-estrategias de un método
+    de parseo (`_extract_product_info`, `_get_product_id`...).
+
+    A partir de ellas se decide el orden en que se prueban: primero la que ha funcionado en los
+    últimos productos de la tienda, y las que no han acertado en sus últimos intentos se descartan
+    hasta que toque volver a probarlas (`reprobe_interval`).
+    """
+
+    FLUSH_EVERY = 50
+
+    def __init__(self, path: str | Path, reprobe_interval: float = DEFAULT_REPROBE_INTERVAL) -> None:
+        self.path = Path(path)
+        self.reprobe_interval = reprobe_interval
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Estadísticas ya leídas, por (dominio, ámbito), y las que faltan por guardar
+        self._records: dict[tuple[str, str], dict[str, StrategyRecord]] = {}
+        self._dirty: set[tuple[str, str, str]] = set()
+        self._pending_writes = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS strategy_stats (
+                domain TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                successes INTEGER NOT NULL,
+                failures INTEGER NOT NULL,
+                recent TEXT NOT NULL,
+                last_attempt_at REAL NOT NULL,
+                PRIMARY KEY (domain, scope, strategy)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _load(self, domain: str, scope: str) -> dict[str, StrategyRecord]:
+        records = self._records.get((domain, scope))
+        if records is None:
+            records = self._records[(domain, scope)] = {
+                strategy: StrategyRecord(successes, failures, recent, last_attempt_at)
+                for strategy, successes, failures, recent, last_attempt_at in self._conn.execute(
+                    "SELECT strategy, successes, failures, recent, last_attempt_at FROM strategy_stats WHERE domain = ? AND scope = ?",
+                    (domain, scope),
+                )
+            }
+        return records
+
+    def order(self, domain: str, scope: str, names: Sequence[str]) -> list[str]:
+        """
+        Names of the strategies to try, in order: best recent hit rate first (untried ones count as
+        50%, ties keep the declared order), discarded ones left out unless their re-probe is due
+        (then they go first, once). If every strategy is discarded, all of them are tried.
+        """
+        now = time.time()
+        reprobe, skipped = [], []
+
+        with self._lock:
+            records = self._load(domain, scope)
+
+            def rank(name: str) -> float:
+                rate = records[name].recent_hit_rate if name in records else None
+                return -(0.5 if rate is None else rate)
+
+            ranked = sorted(names, key=rank)
+
+            for name in ranked:
+                record = records.get(name)
+                if record is None or not record.exhausted:
+                    continue
+                if now - record.last_attempt_at >= self.reprobe_interval:
+                    # Se marca ya como intentada, para que solo un producto haga la nueva prueba
+                    record.last_attempt_at = now
+                    self._dirty.add((domain, scope, name))
+                    reprobe.append(name)
+                else:
+                    skipped.append(name)
+
+        for name in reprobe:
+            self.logger.info("Se vuelve a probar la estrategia descartada '%s' (%s) en '%s'", name, scope, domain)
+
+        order = reprobe + [name for name in ranked if name not in reprobe and name not in skipped]
+        return order or ranked
+
+    def record(self, domain: str, scope: str, attempted: Sequence[str], used: str | None) -> None:
+        "Records one outcome: the strategies in `attempted` before `used` failed (all of them, if `used` is None)"
+        now = time.time()
+        newly_exhausted = []
+
+        with self._lock:
+            records = self._load(domain, scope)
+
+            for name in attempted:
+                record = records.setdefault(name, StrategyRecord())
+                success = name == used
+                was_exhausted = record.exhausted
+
+                if success:
+                    record.successes += 1
+                else:
+                    record.failures += 1
+                record.recent = (record.recent + ("1" if success else "0"))[-RECENT_WINDOW:]
+                record.last_attempt_at = now
+                self._dirty.add((domain, scope, name))
+
+                if record.exhausted and not was_exhausted:
+                    newly_exhausted.append(name)
+                if success:
+                    break
+
+            self._pending_writes += 1
+            if self._pending_writes >= self.FLUSH_EVERY:
+                self._flush()
+
+        for name in newly_exhausted:
+            self.logger.warning(
+                "La estrategia '%s' (%s) no ha acertado en sus últimos intentos en '%s'. Se descarta durante %.1f horas",
+                name,
+                scope,
+                domain,
+                self.reprobe_interval / 3600,
+            )
+
+    def _flush(self) -> None:
+        rows = []
+        for domain, scope, name in self._dirty:
+            record = self._records[(domain, scope)][name]
+            rows.append(
+                (domain, scope, name, record.successes, record.failures, record.recent, record.last_attempt_at)
+            )
+        self._conn.executemany("INSERT OR REPLACE INTO strategy_stats VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self._conn.commit()
+        self._dirty.clear()
+        self._pending_writes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._conn.close()
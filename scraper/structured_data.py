@@ -0,0 +1,134 @@
+import codecs
+import html
+import re
+from dataclasses import dataclass, field
+
+from bs4 import BeautifulSoup
+
+# Una sola pasada sobre los bytes: cada <script> y los <div class="product-page-container">. Los
+# comentarios HTML se reconocen (y se saltan) como un bloque más, igual que hace BeautifulSoup con los
+# <script> comentados que dejan muchos temas
+_TAG_PATTERN = re.compile(
+    rb"<!--.*?-->"
+    rb"|<script\b(?P<script_attrs>[^>]*)>(?P<script_body>.*?)</script\s*>"
+    rb"|<div\b(?P<div_attrs>[^>]*\bproduct-page-container\b[^>]*)>",
+    re.DOTALL | re.IGNORECASE,
+)
+_ATTR_PATTERN = re.compile(rb"""([\w:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+_VAR_ITEM_PATTERN = re.compile(r"var item\s*=\s*(\{.*?\})\s*;", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class LdJsonScript:
+    classes: tuple[str, ...]
+    text: str
+
+
+@dataclass
+class StructuredData:
+    """
+    Bloques de datos estructurados de una página de producto que usan las estrategias:
+    scripts `application/ld+json`, el script `pys-js-extra` (WooCommerce), el literal de
+    `var item = {...}` y el `data-product-id` del contenedor de producto (BigCommerce).
+    """
+
+    ld_json: list[LdJsonScript] = field(default_factory=list)
+    pys_js_extra: str | None = None
+    var_item: str | None = None
+    product_page_product_id: str | None = None
+
+    def is_empty(self) -> bool:
+        return not (self.ld_json or self.pys_js_extra or self.var_item or self.product_page_product_id)
+
+
+def _codec(encoding: str | None) -> str:
+    "The response's charset if Python knows it, otherwise utf-8 (bogus or missing `charset=`)"
+    try:
+        return codecs.lookup(encoding).name if encoding else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+def _parse_attrs(raw_attrs: bytes, encoding: str) -> dict[str, str]:
+    attrs = {}
+    for name, double_quoted, single_quoted, unquoted in _ATTR_PATTERN.findall(raw_attrs):
+        value = double_quoted or single_quoted or unquoted
+        attrs[name.decode("ascii", "replace").lower()] = html.unescape(value.decode(encoding, "replace"))
+    return attrs
+
+
+def scan_structured_data(source: bytes | str, encoding: str | None = "utf-8") -> StructuredData:
+    "Fast path: extracts the structured data blocks with a single regex scan over the raw bytes"
+    if isinstance(source, str):
+        source, encoding = source.encode("utf-8"), "utf-8"
+    encoding = _codec(encoding)
+
+    data = StructuredData()
+
+    for match in _TAG_PATTERN.finditer(source):
+        if match.group("script_attrs") is None and match.group("div_attrs") is None:
+            # Comentario HTML
+            continue
+
+        if match.group("div_attrs") is not None:
+            attrs = _parse_attrs(match.group("div_attrs"), encoding)
+            if (
+                data.product_page_product_id is None
+                and "product-page-container" in attrs.get("class", "").split()
+                and "data-product-id" in attrs
+            ):
+                data.product_page_product_id = attrs["data-product-id"]
+            continue
+
+        attrs = _parse_attrs(match.group("script_attrs"), encoding)
+        body = match.group("script_body")
+
+        if "application/ld+json" in attrs.get("type", "").lower():
+            data.ld_json.append(
+                LdJsonScript(classes=tuple(attrs.get("class", "").split()), text=body.decode(encoding, "replace"))
+            )
+        elif attrs.get("id") == "pys-js-extra":
+            data.pys_js_extra = body.decode(encoding, "replace")
+        elif data.var_item is None and b"var item" in body:
+            var_item = _VAR_ITEM_PATTERN.search(body.decode(encoding, "replace"))
+            if var_item:
+                data.var_item = var_item.group(1)
+
+    return data
+
+
+def parse_structured_data_with_soup(source: bytes | str, encoding: str | None = "utf-8") -> StructuredData:
+    "Slow path: same extraction on a full BeautifulSoup tree, for markup the fast scan cannot handle"
+    if isinstance(source, bytes):
+        source = source.decode(_codec(encoding), "replace")
+
+    soup = BeautifulSoup(source, "html.parser")
+    data = StructuredData()
+
+    for script in soup.find_all("script"):
+        script_type = script.get("type") or ""
+        if "application/ld+json" in script_type.lower():
+            data.ld_json.append(LdJsonScript(classes=tuple(script.get("class") or ()), text=script.text))
+        elif script.get("id") == "pys-js-extra":
+            data.pys_js_extra = script.text
+        elif data.var_item is None and script.string:
+            var_item = _VAR_ITEM_PATTERN.search(script.string)
+            if var_item:
+                data.var_item = var_item.group(1)
+
+    container = soup.find("div", class_="product-page-container")
+    if container and container.has_attr("data-product-id"):
+        data.product_page_product_id = container["data-product-id"]
+
+    return data
+
+
+def extract_structured_data(source: bytes | str, encoding: str | None = "utf-8") -> StructuredData:
+    """
+    Extrae los datos estructurados de una página con el escaneo rápido, y solo si este no encuentra
+    nada recurre al parseo completo con BeautifulSoup.
+    """
+    data = scan_structured_data(source, encoding)
+    if data.is_empty():
+        data = parse_structured_data_with_soup(source, encoding)
+    return data
@@ -0,0 +1,153 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from scraper.async_fetcher import AsyncFetcher
+
+# Tiempo (en segundos) durante el que se da por buena la plataforma detectada de un dominio
+DEFAULT_VENDOR_CACHE_TTL = 30 * 24 * 3600
+
+# Huellas de cada plataforma: cabeceras de respuesta y marcas en el HTML de la portada
+HEADER_FINGERPRINTS: dict[str, tuple[str, ...]] = {
+    "shopify": ("x-shopid", "x-shopify-stage", "x-sorting-hat-shopid", "x-shardid"),
+    "wix": ("x-wix-request-id",),
+    "bigcommerce": ("x-bc-storefront-api",),
+}
+HTML_FINGERPRINTS: dict[str, tuple[bytes, ...]] = {
+    "shopify": (b"cdn.shopify.com", b"shopify.theme", b".myshopify.com"),
+    "woocommerce": (b"wp-content/plugins/woocommerce", b"woocommerce-page", b"wc-block"),
+    "wix": (b"static.wixstatic.com", b"static.parastorage.com"),
+    "bigcommerce": (b"cdn11.bigcommerce.com", b"bcdata", b"stencil-utils"),
+    "prestashop": (b"var prestashop =", b"/modules/ps_"),
+}
+# Contenido de `<meta name="generator">` de cada plataforma
+GENERATOR_FINGERPRINTS: dict[str, str] = {
+    "woocommerce": "woocommerce",
+    "wix": "wix.com",
+    "prestashop": "prestashop",
+    "shopify": "shopify",
+}
+
+_GENERATOR_RE = re.compile(rb"""<meta[^>]+name=["']generator["'][^>]+content=["']([^"']+)""", re.IGNORECASE)
+
+# Puntuación mínima para dar una plataforma por detectada sin más peticiones
+MIN_SCORE = 2
+
+# Plataformas con estrategias de extracción (ver `ExtractionHandler.get_strategy_chain`). El resto
+# se reconoce para avisar de que no están soportadas, pero nunca se devuelve ni se guarda en caché
+SUPPORTED_VENDORS = ("shopify", "bigcommerce", "wix", "woocommerce")
+
+
+class VendorCache:
+    "Persistent domain -> platform index (SQLite file), with a TTL per entry"
+
+    def __init__(self, path: str | Path, ttl: float = DEFAULT_VENDOR_CACHE_TTL) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vendor_cache (domain TEXT PRIMARY KEY, vendor TEXT NOT NULL, detected_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, domain: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vendor FROM vendor_cache WHERE domain = ? AND detected_at >= ?", (domain, time.time() - self.ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, domain: str, vendor: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO vendor_cache VALUES (?, ?, ?)", (domain, vendor, time.time()))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class VendorDetector:
+    """
+    Detecta la plataforma (vendor) de una tienda a partir de una o dos peticiones baratas: la portada
+    (cabeceras, `<meta name="generator">` y marcas de cada plataforma en el HTML) y, si no basta, las
+    rutas propias de Shopify (`/products.json`) y BigCommerce (`/xmlsitemap.php`).
+
+    Con una `VendorCache`, cada dominio se detecta una sola vez mientras su entrada siga vigente.
+    """
+
+    def __init__(self, fetcher: AsyncFetcher, cache: VendorCache | None = None) -> None:
+        self.fetcher = fetcher
+        self.cache = cache
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def detect(self, url: str) -> str:
+        domain = url.lower().removeprefix("www.").rstrip("/")
+
+        if self.cache is not None:
+            vendor = self.cache.get(domain)
+            if vendor in SUPPORTED_VENDORS:
+                self.logger.info("Plataforma de '%s' (caché): '%s'", url, vendor)
+                return vendor
+
+        vendor = self._fingerprint(url)
+        if vendor is None:
+            raise Exception(f"No se ha podido detectar la plataforma de la tienda '{url}'. Indica '--vendor'")
+        if vendor not in SUPPORTED_VENDORS:
+            raise Exception(f"Plataforma '{vendor}' detectada en la tienda '{url}', pero no está soportada")
+
+        self.logger.info("Plataforma detectada de '%s': '%s'", url, vendor)
+        if self.cache is not None:
+            self.cache.put(domain, vendor)
+        return vendor
+
+    def _fingerprint(self, url: str) -> str | None:
+        scores = dict.fromkeys(HTML_FINGERPRINTS, 0)
+
+        try:
+            response = self.fetcher.get(f"https://{url}/")
+        except Exception as e:
+            self.logger.warning("No se pudo obtener la portada de '%s': '%s'", url, e)
+            response = None
+
+        if response is not None:
+            headers = {name.lower() for name in response.headers.keys()}
+            for vendor, names in HEADER_FINGERPRINTS.items():
+                if headers.intersection(names):
+                    scores[vendor] += 3
+            if "shopify" in response.headers.get("powered-by", "").lower():
+                scores["shopify"] += 3
+
+            if response.status_code == 200:
+                html = response.content.lower()
+                for generator in _GENERATOR_RE.findall(html):
+                    for vendor, marker in GENERATOR_FINGERPRINTS.items():
+                        if marker.encode() in generator:
+                            scores[vendor] += 3
+                for vendor, markers in HTML_FINGERPRINTS.items():
+                    scores[vendor] += sum(marker in html for marker in markers)
+
+        vendor, score = max(scores.items(), key=lambda item: item[1])
+        self.logger.debug("Puntuación de plataformas de '%s': %s", url, scores)
+        if score >= MIN_SCORE:
+            return vendor
+
+        # Portada poco concluyente: se prueban las rutas propias de cada plataforma
+        if self._probe(f"https://{url}/products.json?limit=1", b'"products"'):
+            return "shopify"
+        if self._probe(f"https://{url}/xmlsitemap.php", b"<sitemapindex"):
+            return "bigcommerce"
+
+        return vendor if score > 0 else None
+
+    def _probe(self, url: str, marker: bytes) -> bool:
+        try:
+            response = self.fetcher.get(url)
+        except Exception:
+            return False
+        return response.status_code == 200 and marker in response.content[:4096]
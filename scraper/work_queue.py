@@ -0,0 +1,273 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+# Intentos de una URL antes de darla por fallida (p.ej. un worker que se cae siempre con ella)
+MAX_ATTEMPTS = 3
+
+
+@dataclass
+class WorkItem:
+    id: int
+    job: str
+    url: str
+    lastmod: str | None
+    attempts: int
+
+
+@dataclass
+class JobInfo:
+    job: str
+    vendor: str
+    strategy: str
+
+
+class WorkQueue(ABC):
+    """
+    Cola de trabajo para repartir la extracción de una tienda entre varios workers (procesos).
+
+    El coordinador publica un "job" por tienda con sus URLs de producto. Cada worker toma prestado
+    (`lease`) un lote de URLs durante un tiempo de visibilidad: si no lo completa a tiempo (p.ej. se
+    ha caído), las URLs vuelven a estar disponibles para otro worker. Los ítems extraídos se dejan en
+    la propia cola, de donde los recoge el coordinador para transformarlos y cargarlos.
+
+    `SQLiteWorkQueue` es la implementación por defecto, limitada a una sola máquina; para workers en
+    otros nodos, un backend en red (tipo Redis) implementaría estos mismos métodos.
+    """
+
+    @abstractmethod
+    def create_job(self, job: str, vendor: str, strategy: str, product_urls: dict[str, str | None]) -> None:
+        "Publishes a job with its product URLs (URL -> lastmod), replacing any previous job with the same name"
+
+    @abstractmethod
+    def open_jobs(self) -> list[JobInfo]:
+        "Jobs that are still accepting workers"
+
+    @abstractmethod
+    def close_job(self, job: str) -> None:
+        "Marks a job as finished, so idle workers stop polling it"
+
+    @abstractmethod
+    def lease(self, job: str, worker: str, max_items: int, visibility_timeout: float) -> list[WorkItem]:
+        "Leases up to `max_items` URLs that are pending (or whose lease has expired)"
+
+    @abstractmethod
+    def extend(self, items: list[WorkItem], worker: str, seconds: float) -> int:
+        "Pushes the lease of `items` to `seconds` from now; returns how many are still leased by `worker`"
+
+    @abstractmethod
+    def complete(self, item: WorkItem, worker: str, result: dict | None) -> bool:
+        "Stores the result of a leased URL (None: no data); False if the lease was lost to another worker"
+
+    @abstractmethod
+    def release(self, items: list[WorkItem], worker: str, error: str) -> None:
+        "Returns leased URLs to the queue after a failure (they fail for good after `MAX_ATTEMPTS`)"
+
+    @abstractmethod
+    def reap(self, job: str) -> int:
+        "Fails the URLs whose lease expired after `MAX_ATTEMPTS` attempts (their worker keeps dying); returns how many"
+
+    @abstractmethod
+    def abandon(self, job: str, error: str) -> int:
+        "Fails every URL of a job that is not done yet (no worker left to process it); returns how many"
+
+    @abstractmethod
+    def pop_results(self, job: str, limit: int) -> list[dict]:
+        "Removes and returns up to `limit` extracted items of a job, in completion order"
+
+    @abstractmethod
+    def progress(self, job: str) -> dict[str, int]:
+        "Number of URLs of a job per status (pending, leased, done, failed)"
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Cola de trabajo sobre un fichero SQLite (en modo WAL), compartido por el coordinador y los
+    workers de la misma máquina. El modo WAL necesita memoria compartida entre los procesos, así que
+    el fichero no puede estar en un disco en red (NFS, SMB) para workers de otras máquinas.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Transacciones explícitas: `BEGIN IMMEDIATE` reserva la escritura antes de leer qué URLs prestar
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job TEXT PRIMARY KEY,
+                vendor TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                url TEXT NOT NULL,
+                lastmod TEXT,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                UNIQUE (job, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_job_status ON tasks (job, status);
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                payload BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_job ON results (job, id);
+            """
+        )
+
+    def _write(self, statements: Callable[[sqlite3.Connection], Any]) -> Any:
+        "Runs `statements(conn)` inside one write transaction"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def create_job(self, job: str, vendor: str, strategy: str, product_urls: dict[str, str | None]) -> None:
+        def statements(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM tasks WHERE job = ?", (job,))
+            conn.execute("DELETE FROM results WHERE job = ?", (job,))
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, 'open', ?)", (job, vendor, strategy, time.time())
+            )
+            conn.executemany(
+                "INSERT INTO tasks (job, url, lastmod, status) VALUES (?, ?, ?, 'pending')",
+                ((job, url, lastmod) for url, lastmod in product_urls.items()),
+            )
+
+        self._write(statements)
+
+    def open_jobs(self) -> list[JobInfo]:
+        with self._lock:
+            rows = self._conn.execute("SELECT job, vendor, strategy FROM jobs WHERE status = 'open' ORDER BY created_at").fetchall()
+        return [JobInfo(*row) for row in rows]
+
+    def close_job(self, job: str) -> None:
+        self._write(lambda conn: conn.execute("UPDATE jobs SET status = 'closed' WHERE job = ?", (job,)))
+
+    @staticmethod
+    def _reap(conn: sqlite3.Connection, job: str, now: float) -> int:
+        # Préstamos caducados demasiadas veces: el worker se cae siempre con esa URL
+        return conn.execute(
+            """
+            UPDATE tasks SET status = 'failed', worker = NULL, lease_expires_at = NULL, error = 'Préstamo caducado'
+            WHERE job = ? AND status = 'leased' AND lease_expires_at < ? AND attempts >= ?
+            """,
+            (job, now, MAX_ATTEMPTS),
+        ).rowcount
+
+    def lease(self, job: str, worker: str, max_items: int, visibility_timeout: float) -> list[WorkItem]:
+        def statements(conn: sqlite3.Connection) -> list[WorkItem]:
+            now = time.time()
+            self._reap(conn, job, now)
+            rows = conn.execute(
+                """
+                SELECT id, url, lastmod, attempts FROM tasks
+                WHERE job = ? AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < ?))
+                ORDER BY id LIMIT ?
+                """,
+                (job, now, max_items),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires_at = ?, attempts = attempts + 1 WHERE id = ?",
+                ((worker, now + visibility_timeout, task_id) for task_id, *_ in rows),
+            )
+            return [WorkItem(task_id, job, url, lastmod, attempts + 1) for task_id, url, lastmod, attempts in rows]
+
+        return self._write(statements)
+
+    def extend(self, items: list[WorkItem], worker: str, seconds: float) -> int:
+        def statements(conn: sqlite3.Connection) -> int:
+            lease_expires_at = time.time() + seconds
+            return sum(
+                conn.execute(
+                    "UPDATE tasks SET lease_expires_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                    (lease_expires_at, item.id, worker),
+                ).rowcount
+                for item in items
+            )
+
+        return self._write(statements)
+
+    def complete(self, item: WorkItem, worker: str, result: dict | None) -> bool:
+        payload = zlib.compress(json.dumps(result, default=str).encode()) if result is not None else None
+
+        def statements(conn: sqlite3.Connection) -> bool:
+            # Solo cuenta el resultado de quien tiene el préstamo: si caducó y otro worker tomó la URL, se descarta
+            updated = conn.execute(
+                "UPDATE tasks SET status = 'done', lease_expires_at = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+                (item.id, worker),
+            ).rowcount
+            if updated and payload is not None:
+                conn.execute("INSERT INTO results (job, payload) VALUES (?, ?)", (item.job, payload))
+            return bool(updated)
+
+        return self._write(statements)
+
+    def release(self, items: list[WorkItem], worker: str, error: str) -> None:
+        def statements(conn: sqlite3.Connection) -> None:
+            conn.executemany(
+                """
+                UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    worker = NULL, lease_expires_at = NULL, error = ?
+                WHERE id = ? AND worker = ? AND status = 'leased'
+                """,
+                ((MAX_ATTEMPTS, error, item.id, worker) for item in items),
+            )
+
+        self._write(statements)
+
+    def reap(self, job: str) -> int:
+        return self._write(lambda conn: self._reap(conn, job, time.time()))
+
+    def abandon(self, job: str, error: str) -> int:
+        return self._write(
+            lambda conn: conn.execute(
+                """
+                UPDATE tasks SET status = 'failed', worker = NULL, lease_expires_at = NULL, error = ?
+                WHERE job = ? AND status IN ('pending', 'leased')
+                """,
+                (error, job),
+            ).rowcount
+        )
+
+    def pop_results(self, job: str, limit: int) -> list[dict]:
+        def statements(conn: sqlite3.Connection) -> list[tuple[int, bytes]]:
+            rows = conn.execute("SELECT id, payload FROM results WHERE job = ? ORDER BY id LIMIT ?", (job, limit)).fetchall()
+            conn.executemany("DELETE FROM results WHERE id = ?", ((result_id,) for result_id, _ in rows))
+            return rows
+
+        return [json.loads(zlib.decompress(payload)) for _, payload in self._write(statements)]
+
+    def progress(self, job: str) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks WHERE job = ? GROUP BY status", (job,)).fetchall()
+        return {"pending": 0, "leased": 0, "done": 0, "failed": 0, **dict(rows)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import ClassVar, Optional
 
 
 class BigCommerceProduct(BaseModel):
@@ -18,11 +18,19 @@ class BigCommerceProduct(BaseModel):
     stock_message: Optional[str]
     purchasable: bool
     out_of_stock_behavior: Optional[str]
+    product_url: str = ""
 
     model_config = ConfigDict(frozen=True)
 
+    # Clave natural del registro para la carga incremental (upsert)
+    natural_key: ClassVar[str] = "sku"
+    # Clave alternativa si la natural está vacía
+    fallback_key: ClassVar[tuple[str, ...]] = ("product_url",)
+    # Índices secundarios por defecto en las BBDD de destino
+    indexed_fields: ClassVar[tuple[str, ...]] = ("price", "in_stock")
+
     @classmethod
-    def from_json(cls, data: dict) -> "Product":
+    def from_json(cls, data: dict, product_url: str = "") -> "Product":
         d = data
 
         price_info = d.get("price", {})
@@ -45,7 +53,8 @@ class BigCommerceProduct(BaseModel):
             purchasing_message=d.get("purchasing_message", ""),
             stock_message=d.get("stock_message", ""),
             purchasable=d.get("purchasable", False),
-            out_of_stock_behavior=d.get("out_of_stock_behavior", "")
+            out_of_stock_behavior=d.get("out_of_stock_behavior", ""),
+            product_url=product_url,
         )
     
 #     @classmethod
@@ -1,5 +1,5 @@
 from datetime import date
-from typing import Optional
+from typing import ClassVar, Optional
 
 from pydantic import BaseModel, HttpUrl, ConfigDict
 
@@ -22,6 +22,11 @@ class PrestashopProduct(BaseModel):
 
     model_config = ConfigDict(frozen=True)
 
+    # Clave natural del registro para la carga incremental (upsert)
+    natural_key: ClassVar[str] = "url"
+    # Índices secundarios por defecto en las BBDD de destino
+    indexed_fields: ClassVar[tuple[str, ...]] = ("price", "brand", "category")
+
     @classmethod
     def from_jsonld(cls, data: dict) -> "PrestashopProduct":
         offers = data.get("offers", {})
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 from pydantic import BaseModel, ConfigDict
 
 
@@ -23,6 +23,11 @@ class ShopifyProductVariant(BaseModel):
 
     model_config = ConfigDict(frozen=True)
 
+    # Clave natural del registro para la carga incremental (upsert)
+    natural_key: ClassVar[str] = "variant_id"
+    # Índices secundarios por defecto en las BBDD de destino
+    indexed_fields: ClassVar[tuple[str, ...]] = ("product_id", "price", "vendor", "product_type")
+
     @classmethod
     def from_json(
         cls, product: dict, variant: dict, image_url: Optional[str] = ""
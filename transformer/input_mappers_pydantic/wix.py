@@ -1,3 +1,4 @@
+from typing import ClassVar
 from pydantic import BaseModel, ConfigDict
 
 
@@ -12,11 +13,19 @@ class WixProduct(BaseModel):
     availability: str
     price: float
     price_currency: str
+    product_url: str = ""
 
     model_config = ConfigDict(frozen=True)
 
+    # Clave natural del registro para la carga incremental (upsert)
+    natural_key: ClassVar[str] = "sku"
+    # Clave alternativa si la natural está vacía (un producto puede tener varias variantes sin SKU)
+    fallback_key: ClassVar[tuple[str, ...]] = ("product_url", "product_name")
+    # Índices secundarios por defecto en las BBDD de destino
+    indexed_fields: ClassVar[tuple[str, ...]] = ("price", "brand_name", "availability")
+
     @classmethod
-    def from_jsonld(cls, data: dict) -> "WixProduct":
+    def from_jsonld(cls, data: dict, product_url: str = "") -> "WixProduct":
         return cls(
             asset_type=data.get("@type", ""),
             sku=data.get("sku", ""),
@@ -28,4 +37,5 @@ class WixProduct(BaseModel):
             availability=data.get("Offers", {}).get("Availability", "").split("/")[-1],
             price=float(data.get("Offers", {}).get("price", 0)),
             price_currency=data.get("Offers", {}).get("priceCurrency", ""),
+            product_url=product_url,
         )
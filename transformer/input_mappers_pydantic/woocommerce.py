@@ -1,3 +1,4 @@
+from typing import ClassVar
 from pydantic import BaseModel, ConfigDict
 import html
 
@@ -20,6 +21,11 @@ class WooCommerceProduct(BaseModel):
 
     model_config = ConfigDict(frozen=True)
 
+    # Clave natural del registro para la carga incremental (upsert)
+    natural_key: ClassVar[str] = "product_url"
+    # Índices secundarios por defecto en las BBDD de destino
+    indexed_fields: ClassVar[tuple[str, ...]] = ("price", "brand_name", "availability")
+
     @classmethod
     def from_jsonld(cls, data: dict):
         return cls(
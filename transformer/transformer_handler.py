@@ -1,7 +1,5 @@
 
-from typing import Any, Union, Iterable, Dict
-
-import itertools
+from typing import Any, Union, Iterable, Iterator, Dict
 
 from transformer.input_mappers_pydantic.shopify import ShopifyProduct
 from transformer.input_mappers_pydantic.bigcommerce import BigCommerceProduct
@@ -19,56 +17,46 @@ class TransformerHandler:
 
 
     def transform(self, raw_products: Iterable[Dict[str, Any]]) -> Iterable[Product]:
+        return list(self.iter_transform(raw_products))
+
+
+    def iter_transform(self, raw_products: Iterable[Dict[str, Any]]) -> Iterator[Product]:
+        "Versión perezosa de `transform`: valida y devuelve cada modelo según se consume la entrada"
         if self.vendor == "shopify":
-            if self.used_extraction_strategy == "ShopifyAPIStrategy":
-                """Can be used as-is, does not need transformation"""
-                pass
+            if self.used_extraction_strategy == "ShopifyAPIBulkStategy":
+                # Cada ítem es una página de /products.json, que se aplana directamente en variantes
+                for item in raw_products:
+                    if item.get("extraction_strategy_used") == "from_products_json":
+                        yield from ShopifyProduct.from_json_bulk_api(item.get("data"))
 
             elif self.used_extraction_strategy == "ShopifySitemapSingleProductStrategy":
-                product_list = []
-
                 for item in raw_products:
                     extraction_strategy_used = item.get("extraction_strategy_used")
                     data = item.get("data")
                     
                     for single_product in data:
                         if extraction_strategy_used == "from_json_product_endpoint":
-                            product_list.append(ShopifyProduct.from_json(single_product))
-
-
-                # We need to flatten the list, as many products have variants (that are captured as a list
-                # of different products, and thus each "variant" is its own product), and they should be
-                # processed and stored as different products
-                product_list_flattened = list(itertools.chain(*product_list))
-
-                return product_list_flattened
+                            # Many products have variants (each "variant" is its own product), and they
+                            # should be processed and stored as different products
+                            yield from ShopifyProduct.from_json(single_product)
 
         elif self.vendor == "wix":
-            product_list = []
-
             for item in raw_products:
 
                 extraction_strategy_used = item.get("extraction_strategy_used")
-                # Create a flat list, as there may be more than 1 variant parsed a single product, and 
+                # There may be more than 1 variant parsed a single product, and 
                 # they should be processed as differnt products
                 product_data_list: list = item.get("data")
-                raw_products_flattened = list(itertools.chain(*[product_data_list]))
             
-                for x in raw_products_flattened:
+                for x in product_data_list:
                     if extraction_strategy_used == "from_jsonld":
-                        product_list.append(WixProduct.from_jsonld(x))
-            
-            return product_list
+                        yield WixProduct.from_jsonld(x, product_url=item.get("url", ""))
 
         # elif self.vendor == "prestashop":
-        #     product_list = []
         #     for x in raw_products:
-        #         product_list.append(PrestashopProduct.from_jsonld(x))
-        #     return product_list
+        #         yield PrestashopProduct.from_jsonld(x)
 
         elif self.vendor == "bigcommerce":
-            product_list = []
-
             for item in raw_products:
                 extraction_strategy_used = item.get("extraction_strategy_used")
                 data: dict = item.get("data")
@@ -76,9 +64,7 @@ class TransformerHandler:
                 for single_product in data:
                     single_product_data = single_product.get("data")
                     if extraction_strategy_used == "from_hidden_api_post_request":
-                        product_list.append(BigCommerceProduct.from_json(single_product_data))
-
-            return product_list
+                        yield BigCommerceProduct.from_json(single_product_data, product_url=item.get("url", ""))
 
 
         elif self.vendor == "woocommerce":
@@ -87,8 +73,6 @@ class TransformerHandler:
             # para así hacer el mapping adecuado con los modelos de Pydantic)
             # Ejemplo: {"url_de_producto": "from_ld_json", "url_de_producto_2": "from_pysoptions_var"}
 
-            product_list = []
-
             # Cada producto (item) es un diccionario con una lista 
             for item in raw_products:
 
@@ -96,16 +80,11 @@ class TransformerHandler:
                 data = item.get("data")
 
                 if extraction_strategy_used == "from_ld_json":
-                    product_list.append(WooCommerceProduct.from_jsonld(data))
+                    yield WooCommerceProduct.from_jsonld(data)
                 elif extraction_strategy_used == "from_pysoptions_var":
-                    product_list.append(WooCommerceProduct.from_pysoptions_var(data))
-
-            return product_list
+                    yield WooCommerceProduct.from_pysoptions_var(data)
             
         else:
             raise ValueError(
                 "Transformation Strategy not Supported!! / No transformation strategy was defined"
             )
-
-    def write_to_file(self):
-        "Writes the list of Pydantic-validated objects as pickle or any other standard format (jsonl, for example)"